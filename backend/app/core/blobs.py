@@ -0,0 +1,334 @@
+"""
+Content-addressed blob store.
+
+Uploaded content is stored once per SHA-256 at uploads/blobs/<ab>/<sha256>
+and shared by every record that holds the same bytes: board documents,
+archive files, email attachments and ZSSPD files reference it through
+their `blob_sha256` column, and `blobs.ref_count` counts those records.
+Copying a record only adds a reference.
+
+The reference count changes in the caller's session, so it commits or
+rolls back together with the record. Content is placed on disk after the
+reference is taken and removed by the collector only inside the
+transaction that deletes the zero-count row, so a concurrent upload of the
+same content never ends up without its file.
+
+Blobs released in this process are collected as soon as the releasing
+transaction commits; every BLOB_GC_INTERVAL seconds (and at startup) a
+full sweep also collects zero-count rows left by other processes and
+removes files without a row (uploads whose transaction rolled back).
+The same loop deletes files outside the store handed to `retire`
+(content of records from before the store), off the request path.
+
+The `file_path` of a blob-backed record keeps its original form and is
+used for names and extensions only. Records created before the store
+existed have no blob and keep their content at `file_path`.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Iterable, List, Optional, Set
+
+from fastapi import UploadFile
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.uploads import CHUNK_SIZE, StoredUpload, stream_upload
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = "uploads/blobs"
+INCOMING = "incoming"
+
+# Files without a row are only removed after this many seconds
+ORPHAN_GRACE = 3600
+
+# Session.info keys: blobs released and files moved into the store in the current transaction
+_RELEASED_KEY = "released_blobs"
+_RETIRED_KEY = "retired_files"
+
+
+def _copy_hashed(source: str, tmp_path: str) -> StoredUpload:
+    digest = hashlib.sha256()
+    size = 0
+    with open(source, "rb") as src, open(tmp_path, "wb") as dst:
+        while chunk := src.read(CHUNK_SIZE):
+            dst.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+        dst.flush()
+        os.fsync(dst.fileno())
+    return StoredUpload(path=tmp_path, size=size, sha256=digest.hexdigest())
+
+
+def _write_hashed(content: bytes, tmp_path: str) -> StoredUpload:
+    with open(tmp_path, "wb") as dst:
+        dst.write(content)
+        dst.flush()
+        os.fsync(dst.fileno())
+    return StoredUpload(path=tmp_path, size=len(content), sha256=hashlib.sha256(content).hexdigest())
+
+
+def _place(tmp_path: str, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Same content as any file already there: replacing is harmless
+    os.replace(tmp_path, path)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class BlobStore:
+    """Stores content by SHA-256 and collects blobs nobody references"""
+
+    def __init__(
+        self,
+        root: str = BLOB_DIR,
+        gc_interval: Optional[float] = None,
+        session_factory: Optional[Callable] = None
+    ) -> None:
+        self.root = root
+        self.gc_interval = gc_interval or get_settings().blob_gc_interval_seconds
+        self._session_factory = session_factory
+        self._released: Set[str] = set()
+        self._retired: List[str] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _get_session_factory(self) -> Callable:
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            return AsyncSessionLocal
+        return self._session_factory
+
+    def _get_wake(self) -> asyncio.Event:
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        return self._wake
+
+    def path(self, sha256: str) -> str:
+        """Location of a blob on disk"""
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def _incoming_path(self) -> str:
+        return os.path.join(self.root, INCOMING, uuid.uuid4().hex)
+
+    # ---- references ----
+
+    async def add_ref(self, db: AsyncSession, sha256: str, size: Optional[int] = None, count: int = 1) -> None:
+        """Take `count` references; `size` is required when the blob may not exist yet"""
+        from app.core.models import Blob
+
+        if size is None:
+            result = await db.execute(
+                update(Blob).where(Blob.sha256 == sha256).values(ref_count=Blob.ref_count + count)
+            )
+            if result.rowcount == 0:
+                raise ValueError(f"Unknown blob {sha256}")
+            return
+
+        # One upsert, so two uploads of the same new content cannot both insert
+        values = {"sha256": sha256, "size": size, "ref_count": count}
+        dialect = db.get_bind().dialect.name
+        if dialect == "mysql":
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+            stmt = mysql_insert(Blob).values(**values).on_duplicate_key_update(ref_count=Blob.ref_count + count)
+        else:
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as conflict_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as conflict_insert
+            stmt = conflict_insert(Blob).values(**values).on_conflict_do_update(
+                index_elements=[Blob.sha256], set_={"ref_count": Blob.ref_count + count}
+            )
+        await db.execute(stmt)
+
+    async def release(self, db: AsyncSession, sha256: Optional[str]) -> None:
+        """Drop one reference; the blob is collected once the transaction commits"""
+        if sha256:
+            await self.release_all(db, [sha256])
+
+    async def release_all(self, db: AsyncSession, sha256s: Iterable[Optional[str]]) -> None:
+        """Drop one reference per item (bulk deletes)"""
+        from app.core.models import Blob
+
+        counts = Counter(sha for sha in sha256s if sha)
+        for sha256, count in counts.items():
+            await db.execute(
+                update(Blob).where(Blob.sha256 == sha256).values(ref_count=Blob.ref_count - count)
+            )
+        if counts:
+            db.sync_session.info.setdefault(_RELEASED_KEY, set()).update(counts)
+
+    def retire(self, db: AsyncSession, paths: Iterable[str]) -> None:
+        """Remove files outside the store in the background once the transaction commits"""
+        paths = list(paths)
+        if paths:
+            db.sync_session.info.setdefault(_RETIRED_KEY, []).extend(paths)
+
+    def _committed(self, released: Set[str], retired: List[str]) -> None:
+        self._released.update(released)
+        self._retired.extend(retired)
+        self._get_wake().set()
+
+    # ---- writes ----
+
+    async def _store(self, db: AsyncSession, stored: StoredUpload) -> StoredUpload:
+        # Reference first: a concurrent collection of the same blob either
+        # finished before (and the file is placed again) or sees the new count
+        await self.add_ref(db, stored.sha256, size=stored.size)
+        path = self.path(stored.sha256)
+        try:
+            await asyncio.to_thread(_place, stored.path, path)
+        except BaseException:
+            await asyncio.to_thread(_remove, stored.path)
+            raise
+        return StoredUpload(path=path, size=stored.size, sha256=stored.sha256)
+
+    async def put(self, db: AsyncSession, upload: UploadFile, max_bytes: Optional[int] = None) -> StoredUpload:
+        """Stream an upload into the store and take a reference to it"""
+        stored = await stream_upload(upload, self._incoming_path(), max_bytes)
+        return await self._store(db, stored)
+
+    async def put_bytes(self, db: AsyncSession, content: bytes) -> StoredUpload:
+        """Store content already in memory (e.g. parsed email attachments)"""
+        tmp_path = self._incoming_path()
+        await asyncio.to_thread(os.makedirs, os.path.dirname(tmp_path), exist_ok=True)
+        stored = await asyncio.to_thread(_write_hashed, content, tmp_path)
+        return await self._store(db, stored)
+
+    async def put_file(self, db: AsyncSession, source: str) -> StoredUpload:
+        """
+        Move an existing file into the store (records from before the store).
+        `source` is copied and only removed once the transaction commits.
+        """
+        tmp_path = self._incoming_path()
+        await asyncio.to_thread(os.makedirs, os.path.dirname(tmp_path), exist_ok=True)
+        try:
+            stored = await asyncio.to_thread(_copy_hashed, source, tmp_path)
+        except BaseException:
+            await asyncio.to_thread(_remove, tmp_path)
+            raise
+        stored = await self._store(db, stored)
+        self.retire(db, [source])
+        return stored
+
+    # ---- garbage collection ----
+
+    async def collect(self, sha256s: Optional[Iterable[str]] = None) -> int:
+        """Delete zero-count blobs (all of them, or only `sha256s`); returns how many"""
+        from app.core.models import Blob
+
+        removed = 0
+        async with self._get_session_factory()() as db:
+            if sha256s is None:
+                sha256s = (await db.execute(select(Blob.sha256).where(Blob.ref_count <= 0))).scalars().all()
+            for sha256 in sha256s:
+                # Waits for an uncommitted reference change on the same row
+                result = await db.execute(delete(Blob).where(Blob.sha256 == sha256, Blob.ref_count <= 0))
+                if result.rowcount:
+                    # Removed before the row: an upload taking a new reference
+                    # after the commit places the file again
+                    await asyncio.to_thread(_remove, self.path(sha256))
+                    removed += 1
+            await db.commit()
+        if removed:
+            logger.info(f"Removed {removed} unreferenced blobs")
+        return removed
+
+    def _files_older_than(self, cutoff: float) -> List[str]:
+        paths = []
+        if not os.path.isdir(self.root):
+            return paths
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        paths.append(path)
+                except OSError:
+                    continue
+        return paths
+
+    async def sweep_orphans(self, grace: float = ORPHAN_GRACE) -> int:
+        """Remove old files that no blob row refers to"""
+        from app.core.models import Blob
+
+        paths = await asyncio.to_thread(self._files_older_than, time.time() - grace)
+        incoming = os.path.join(self.root, INCOMING)
+        orphans = [path for path in paths if os.path.dirname(path) == incoming]
+        candidates = {os.path.basename(path): path for path in paths if os.path.dirname(path) != incoming}
+
+        names = list(candidates)
+        async with self._get_session_factory()() as db:
+            for i in range(0, len(names), 500):
+                batch = names[i:i + 500]
+                known = set((await db.execute(select(Blob.sha256).where(Blob.sha256.in_(batch)))).scalars())
+                orphans.extend(candidates[name] for name in batch if name not in known)
+
+        for path in orphans:
+            await asyncio.to_thread(_remove, path)
+        if orphans:
+            logger.info(f"Removed {len(orphans)} orphaned blob files")
+        return len(orphans)
+
+    async def run(self) -> None:
+        """Collection loop, started from the application lifespan"""
+        full_sweep = True
+        while True:
+            try:
+                if full_sweep:
+                    await self.collect()
+                    await self.sweep_orphans()
+                else:
+                    released, self._released = self._released, set()
+                    await self.collect(released)
+                retired, self._retired = self._retired, []
+                for path in retired:
+                    await asyncio.to_thread(_remove, path)
+            except Exception as e:
+                logger.error(f"Blob garbage collection failed: {e}")
+            wake = self._get_wake()
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=self.gc_interval)
+                full_sweep = False
+            except asyncio.TimeoutError:
+                full_sweep = True
+            wake.clear()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# Global instance
+blob_store = BlobStore()
+
+
+@event.listens_for(Session, "after_commit")
+def _collect_released(session: Session) -> None:
+    released = session.info.pop(_RELEASED_KEY, None)
+    retired = session.info.pop(_RETIRED_KEY, None)
+    if released or retired:
+        blob_store._committed(released or set(), retired or [])
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_released(session: Session) -> None:
+    session.info.pop(_RELEASED_KEY, None)
+    session.info.pop(_RETIRED_KEY, None)
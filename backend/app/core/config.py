@@ -31,6 +31,8 @@ class Settings(BaseSettings):
     debug: bool = os.getenv("DEBUG", "false").lower() == "true"
     use_https: bool = os.getenv("USE_HTTPS", "false").lower() == "true"
     server_domain: str = os.getenv("SERVER_DOMAIN", "") # e.g., backend_coord.40919.com
+    # Production restarts: skip create_all/seeding when the schema marker is current
+    fast_startup: bool = os.getenv("FAST_STARTUP", "false").lower() == "true"
     
     # Error handling - expose details only in debug mode
     expose_error_details: bool = False  # Will be set based on debug mode
@@ -47,14 +49,49 @@ class Settings(BaseSettings):
     db_pool_timeout: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
     db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
     
+    # SQLite: small persistent pool, per-connection pragmas, one writer at a time
+    sqlite_pool_size: int = int(os.getenv("SQLITE_POOL_SIZE", "5"))
+    sqlite_busy_timeout_ms: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    sqlite_cache_size_mb: int = int(os.getenv("SQLITE_CACHE_SIZE_MB", "32"))
+    sqlite_mmap_size_mb: int = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+    sqlite_write_queue: bool = os.getenv("SQLITE_WRITE_QUEUE", "true").lower() == "true"
+    
+    # Read replicas (comma-separated URLs) for read-only endpoints; a replica whose
+    # heartbeat is older than the allowed lag is skipped in favour of the primary
+    database_replica_urls: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    replica_max_lag_seconds: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "2"))
+    replica_check_interval_seconds: float = float(os.getenv("REPLICA_CHECK_INTERVAL", "1"))
+    
     # Redis (optional, for scaling)
     redis_url: str = os.getenv("REDIS_URL", "")
     
+    # WebSocket outbound queues (per connection)
+    ws_send_queue_size: int = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+    ws_max_send_lag_seconds: float = float(os.getenv("WS_MAX_SEND_LAG_SECONDS", "15"))
+    
+    # Presence: interval of coalesced presence broadcasts
+    presence_flush_interval_seconds: float = float(os.getenv("PRESENCE_FLUSH_INTERVAL", "1.5"))
+    # Write-behind buffer for users.last_seen: one bulk UPDATE per interval
+    last_seen_flush_interval_seconds: float = float(os.getenv("LAST_SEEN_FLUSH_INTERVAL", "10"))
+    # Admin dashboard statistics: counter deltas are written every flush interval,
+    # everything is recomputed from the source tables every reconcile interval
+    stats_flush_interval_seconds: float = float(os.getenv("STATS_FLUSH_INTERVAL", "5"))
+    stats_reconcile_interval_seconds: float = float(os.getenv("STATS_RECONCILE_INTERVAL", "3600"))
+    blob_gc_interval_seconds: float = float(os.getenv("BLOB_GC_INTERVAL", "3600"))
+    archive_job_inline_max: int = int(os.getenv("ARCHIVE_JOB_INLINE_MAX", "20"))
+    archive_job_lease_seconds: float = float(os.getenv("ARCHIVE_JOB_LEASE", "600"))
+    
     # Security
     secret_key: str = os.getenv("SECRET_KEY", "")
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 480  # 8 hours for better UX
     refresh_token_expire_days: int = 30
+    # Verified access tokens are cached per worker for a short time
+    auth_cache_ttl_seconds: float = float(os.getenv("AUTH_CACHE_TTL", "30"))
+    auth_cache_max_size: int = int(os.getenv("AUTH_CACHE_MAX_SIZE", "10000"))
+    # bcrypt runs in a dedicated thread pool; calls beyond max pending are rejected with 503
+    password_hash_workers: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    password_hash_max_pending: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
     
     # CORS - requires explicit configuration, no wildcards by default
     cors_origins: list[str] = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()] if os.getenv("CORS_ORIGINS") else []
@@ -135,6 +172,11 @@ class Settings(BaseSettings):
         """Check if using SQLite database"""
         return "sqlite" in self.database_url.lower()
     
+    @property
+    def replica_urls(self) -> list[str]:
+        """Configured read replica URLs"""
+        return [url.strip() for url in self.database_replica_urls.split(",") if url.strip()]
+    
     @property
     def is_mysql(self) -> bool:
         """Check if using MySQL database"""
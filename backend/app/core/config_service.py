@@ -1,29 +1,101 @@
+import json
+import logging
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.core.models import SystemSetting
-from typing import Any, Optional
+from app.core.redis_manager import redis_manager
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub topic used to keep every worker's settings cache in sync
+CONFIG_INVALIDATION_CHANNEL = "config:invalidate"
+
+# Process-wide settings cache: key -> (raw value, type).
+# Holds every row of system_settings once loaded, so a missing key is a known miss.
+_cache: Dict[str, Tuple[str, str]] = {}
+_loaded = False
+
+
+def _cast(value: str, value_type: Optional[str]) -> Any:
+    """Convert a stored string to its declared type"""
+    if value_type == "int":
+        return int(value)
+    if value_type == "bool":
+        return value.lower() == "true"
+    if value_type == "json":
+        return json.loads(value)
+    return value
+
 
 class ConfigService:
-    """Centralized configuration service (moved from admin)"""
+    """
+    Centralized configuration service (moved from admin).
+
+    All system settings are loaded into memory at startup and served from
+    there; writes update the cache and notify other workers via pub/sub,
+    so reading configuration on hot paths costs no database round-trips.
+    """
+
+    @staticmethod
+    async def load(db: AsyncSession) -> None:
+        """(Re)load every setting into the process cache"""
+        global _cache, _loaded
+        result = await db.execute(select(SystemSetting.key, SystemSetting.value, SystemSetting.type))
+        _cache = {key: (value, value_type) for key, value, value_type in result.all()}
+        _loaded = True
+        logger.info(f"Loaded {len(_cache)} system settings into cache")
+
+    @staticmethod
+    async def _lookup(db: AsyncSession, key: str) -> Optional[Tuple[str, str]]:
+        if not _loaded:
+            await ConfigService.load(db)
+        return _cache.get(key)
 
     @staticmethod
     async def get_value(
         db: AsyncSession,
         key: str,
         default: Any = None,
-        group: str = "general"
+        group: Optional[str] = None
     ) -> Any:
-        """Get configuration value with default"""
-        result = await db.execute(
-            select(SystemSetting).where(
-                (SystemSetting.key == key) &
-                (SystemSetting.group == group)
-            )
-        )
-        setting = result.scalar_one_or_none()
-        if setting is None:
+        """
+        Get raw (string) configuration value with default.
+        Keys are unique across groups, `group` is kept for backward compatibility.
+        """
+        entry = await ConfigService._lookup(db, key)
+        if entry is None:
+            return default
+        return entry[0]
+
+    @staticmethod
+    async def get_typed(db: AsyncSession, key: str, default: Any = None) -> Any:
+        """Get value converted according to the setting's stored type"""
+        entry = await ConfigService._lookup(db, key)
+        if entry is None:
+            return default
+        try:
+            return _cast(*entry)
+        except (ValueError, TypeError, AttributeError):
+            logger.warning(f"Setting {key} has invalid value {entry[0]!r} for type {entry[1]}")
             return default
-        return setting.value
+
+    @staticmethod
+    async def get_int(db: AsyncSession, key: str, default: int) -> int:
+        """Get integer setting, falling back to default on missing or malformed values"""
+        value = await ConfigService.get_value(db, key)
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            return default
+
+    @staticmethod
+    async def get_bool(db: AsyncSession, key: str, default: bool = False) -> bool:
+        """Get boolean setting ("true"/"false" strings as stored by the admin panel)"""
+        value = await ConfigService.get_value(db, key)
+        if value is None:
+            return default
+        return str(value).lower() == "true"
 
     @staticmethod
     async def set_value(
@@ -34,10 +106,7 @@ class ConfigService:
     ):
         """Set configuration value"""
         result = await db.execute(
-            select(SystemSetting).where(
-                (SystemSetting.key == key) &
-                (SystemSetting.group == group)
-            )
+            select(SystemSetting).where(SystemSetting.key == key)
         )
         setting = result.scalar_one_or_none()
 
@@ -48,3 +117,41 @@ class ConfigService:
             db.add(setting)
 
         await db.commit()
+        await ConfigService.publish_update(key, setting.value, setting.type)
+
+    @staticmethod
+    def apply_update(key: str, value: Optional[str], value_type: Optional[str] = "str") -> None:
+        """Apply a single setting change to the local cache (value None removes it)"""
+        if value is None:
+            _cache.pop(key, None)
+        else:
+            _cache[key] = (value, value_type or "str")
+
+    @staticmethod
+    def invalidate() -> None:
+        """Mark the cache stale; it is reloaded in one query on next access"""
+        global _loaded
+        _loaded = False
+
+    @staticmethod
+    async def publish_update(key: str, value: Optional[str], value_type: Optional[str] = "str") -> None:
+        """Update the local cache and propagate the change to other workers"""
+        ConfigService.apply_update(key, value, value_type)
+        await redis_manager.publish(CONFIG_INVALIDATION_CHANNEL, {
+            "key": key,
+            "value": value,
+            "type": value_type
+        })
+
+    @staticmethod
+    async def _handle_invalidation(message: dict) -> None:
+        key = message.get("key")
+        if key is None:
+            ConfigService.invalidate()
+        else:
+            ConfigService.apply_update(key, message.get("value"), message.get("type"))
+
+    @staticmethod
+    async def subscribe_invalidations(redis=None) -> None:
+        """Listen for setting changes made by other workers"""
+        await (redis or redis_manager).subscribe(CONFIG_INVALIDATION_CHANNEL, ConfigService._handle_invalidation)
@@ -1,9 +1,12 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker, AsyncEngine
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.pool import NullPool
-from sqlalchemy import select, delete, func
+from sqlalchemy.pool import NullPool, AsyncAdaptedQueuePool
+from sqlalchemy import select, delete, func, event
 from app.core.config import get_settings
-from typing import AsyncGenerator
+from app.core.sqlite_writer import SerializedWriteSession, apply_sqlite_pragmas
+from app.core.read_replica import ReplicaRouter
+from typing import AsyncGenerator, Optional
+import hashlib
 
 
 import logging
@@ -13,27 +16,40 @@ logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
-def create_engine_with_pool() -> AsyncEngine:
+def _is_memory_sqlite(database_url: str) -> bool:
+    return ":memory:" in database_url or "mode=memory" in database_url
+
+
+def create_engine_with_pool(database_url: Optional[str] = None) -> AsyncEngine:
     """
     Create database engine with appropriate connection pooling.
     
-    - SQLite: Uses NullPool (no pooling, single connection)
+    - SQLite file: small persistent pool, WAL and tuned pragmas on every connection
+    - SQLite in-memory: NullPool (each connection is its own database anyway)
     - MySQL/PostgreSQL: Uses QueuePool with configurable size
     """
+    database_url = database_url or settings.database_url
     common_args = {
         "echo": settings.debug,
         "future": True,
     }
     
-    if settings.is_sqlite:
-        # SQLite doesn't support connection pooling well
-        # Use NullPool to create new connection each time
-        logger.info("Database: Using SQLite with NullPool")
-        return create_async_engine(
-            settings.database_url,
-            poolclass=NullPool,
+    if "sqlite" in database_url.lower():
+        if _is_memory_sqlite(database_url):
+            logger.info("Database: Using in-memory SQLite with NullPool")
+            return create_async_engine(database_url, poolclass=NullPool, **common_args)
+        
+        logger.info(f"Database: Using SQLite with WAL (pool size={settings.sqlite_pool_size})")
+        sqlite_engine = create_async_engine(
+            database_url,
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=settings.sqlite_pool_size,
+            max_overflow=0,
+            pool_timeout=settings.db_pool_timeout,
             **common_args
         )
+        event.listen(sqlite_engine.sync_engine, "connect", apply_sqlite_pragmas)
+        return sqlite_engine
     else:
         # MySQL/PostgreSQL - use connection pooling
         logger.info(
@@ -41,7 +57,7 @@ def create_engine_with_pool() -> AsyncEngine:
             f"(size={settings.db_pool_size}, overflow={settings.db_max_overflow})"
         )
         return create_async_engine(
-            settings.database_url,
+            database_url,
             pool_size=settings.db_pool_size,
             max_overflow=settings.db_max_overflow,
             pool_timeout=settings.db_pool_timeout,
@@ -51,16 +67,32 @@ def create_engine_with_pool() -> AsyncEngine:
         )
 
 
+def create_session_factory(db_engine: AsyncEngine) -> async_sessionmaker:
+    """Session factory; pooled SQLite sessions go through the single-writer queue"""
+    serialize_writes = (
+        db_engine.dialect.name == "sqlite"
+        and not _is_memory_sqlite(str(db_engine.url))
+        and settings.sqlite_write_queue
+    )
+    return async_sessionmaker(
+        db_engine,
+        class_=SerializedWriteSession if serialize_writes else AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+
+
 # Create async engine with appropriate pooling
 engine = create_engine_with_pool()
 
 # Create async session factory
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
+AsyncSessionLocal = create_session_factory(engine)
+
+# Read-only endpoints: lag-checked replicas, falling back to the primary
+read_router = ReplicaRouter(
+    AsyncSessionLocal,
+    [create_engine_with_pool(url) for url in settings.replica_urls]
 )
 
 
@@ -79,9 +111,55 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
-async def init_db() -> None:
-    """Initialize database - create all tables"""
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for read-only endpoints. Yields a replica session when a
+    replica is within the allowed lag, otherwise a primary session.
+    """
+    async with read_router.session_factory()() as session:
+        yield session
+
+
+def schema_fingerprint() -> str:
+    """Hash of all tables, columns and indexes registered in Base.metadata"""
+    parts = []
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        parts.append(table.name)
+        parts.extend(f"{col.name}:{col.type!r}:{col.nullable}" for col in table.columns)
+        parts.extend(sorted(index.name or "" for index in table.indexes))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+async def _read_schema_marker() -> Optional[str]:
+    from app.core.models import SchemaMarker
+    try:
+        async with AsyncSessionLocal() as session:
+            return await session.scalar(select(SchemaMarker.fingerprint).where(SchemaMarker.id == 1))
+    except Exception:
+        # Table missing on a database that predates the marker
+        return None
+
+
+async def _write_schema_marker(session: AsyncSession, fingerprint: str) -> None:
+    from app.core.models import SchemaMarker
+    marker = await session.get(SchemaMarker, 1)
+    if marker is None:
+        session.add(SchemaMarker(id=1, fingerprint=fingerprint))
+    else:
+        marker.fingerprint = fingerprint
+    await session.commit()
+
+
+async def init_db(fast: bool = False) -> bool:
+    """
+    Initialize database - create all tables and seed default data.
+
+    With `fast=True` the schema marker is checked first: if the database was
+    already initialized with the current models, nothing else is done.
+    Returns True if the full initialization ran.
+    """
     # Import all models here so they register with Base.metadata
+    import app.core.models
     import app.modules.auth.models
     import app.modules.chat.models
     import app.modules.board.models
@@ -89,6 +167,12 @@ async def init_db() -> None:
     import app.modules.admin.models
     import app.modules.tasks.models
     import app.modules.email.models
+    import app.modules.zsspd.models
+
+    fingerprint = schema_fingerprint()
+    if fast and await _read_schema_marker() == fingerprint:
+        logger.info("Database: schema marker is current, skipping create_all and seeding")
+        return False
 
     try:
         async with engine.begin() as conn:
@@ -97,18 +181,17 @@ async def init_db() -> None:
         logger.error(f"Failed to create database tables: {e}")
         raise
 
-
-
-    
     try:
         async with AsyncSessionLocal() as session:
             await cleanup_duplicate_channel_memberships(session)
             await seed_system_settings(session)
             units_map = await seed_default_units(session)
             await seed_test_users(session, units_map)
+            await _write_schema_marker(session, fingerprint)
     except Exception as e:
         logger.error(f"Failed to seed database with default data: {e}")
         raise
+    return True
 
 
 async def cleanup_duplicate_channel_memberships(session: AsyncSession) -> None:
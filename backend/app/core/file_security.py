@@ -2,12 +2,10 @@
 File security utilities for safe file operations and serving.
 """
 import os
-import magic
-from PIL import Image
 import io
 from typing import Tuple, Optional, Set
-from fastapi import UploadFile, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import UploadFile, HTTPException, Request
+from fastapi.responses import FileResponse, Response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -69,8 +67,12 @@ def safe_file_operation(file_path: str, base_dir: str) -> str:
     
     # Remove leading slash and resolve
     clean_path = file_path.lstrip("/")
-    full_path = os.path.abspath(os.path.join(base_abs, clean_path))
-    
+    if os.path.abspath(clean_path).startswith(base_abs + os.sep):
+        # Stored paths usually start with the base directory already
+        full_path = os.path.abspath(clean_path)
+    else:
+        full_path = os.path.abspath(os.path.join(base_abs, clean_path))
+
     # Verify path is within base directory
     if not full_path.startswith(base_abs + os.sep):
         logger.error(f"Path traversal detected in file operation: {file_path}")
@@ -79,46 +81,80 @@ def safe_file_operation(file_path: str, base_dir: str) -> str:
     return full_path
 
 
+def file_etag(stat_result: os.stat_result, content_hash: Optional[str] = None) -> str:
+    """
+    Strong ETag of a served file: the content hash when it is known (blob
+    store), otherwise inode, mtime and size, which change whenever the file
+    is rewritten or replaced.
+    """
+    if content_hash:
+        return f'"{content_hash}"'
+    return f'"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison: a W/ prefix is ignored
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
 def secure_file_response(
     path: str,
     filename: Optional[str] = None,
     media_type: Optional[str] = None,
-    content_disposition: str = "attachment"
-) -> FileResponse:
+    content_disposition: str = "attachment",
+    request: Optional[Request] = None,
+    content_hash: Optional[str] = None
+) -> Response:
     """
-    Create a FileResponse with security headers.
+    Create a FileResponse with security and caching headers.
+
+    Range requests (also with If-Range) are answered with 206 Partial
+    Content, so previews can seek and interrupted downloads resume. Clients
+    may keep a private copy and revalidate it: when `request` carries an
+    If-None-Match matching the ETag, 304 Not Modified is returned instead.
     
     Args:
         path: Path to the file
         filename: Optional filename for download
         media_type: Optional MIME type
         content_disposition: "attachment" or "inline"
+        request: The incoming request, for conditional GET
+        content_hash: SHA-256 of the content, used as ETag when known
         
     Returns:
-        FileResponse with security headers
+        FileResponse with security headers, or an empty 304 response
     """
-    response = FileResponse(
+    stat_result = os.stat(path)
+    headers = {
+        "ETag": file_etag(stat_result, content_hash),
+        "Accept-Ranges": "bytes",
+        # Prevent content sniffing
+        "X-Content-Type-Options": "nosniff",
+        # Prevent embedding in iframes (clickjacking)
+        "X-Frame-Options": "DENY",
+        # Only the user's own client may cache the file, and it revalidates every use
+        "Cache-Control": "private, no-cache",
+    }
+    
+    # Content Security Policy for inline viewing
+    if content_disposition == "inline":
+        headers["Content-Security-Policy"] = "default-src 'none'; style-src 'unsafe-inline'; sandbox"
+
+    if request is not None:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+    return FileResponse(
         path,
         filename=filename,
         media_type=media_type,
-        content_disposition_type=content_disposition
+        content_disposition_type=content_disposition,
+        headers=headers,
+        stat_result=stat_result
     )
-    
-    # Prevent content sniffing
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    
-    # Prevent embedding in iframes (clickjacking)
-    response.headers["X-Frame-Options"] = "DENY"
-    
-    # Content Security Policy for inline viewing
-    if content_disposition == "inline":
-        response.headers["Content-Security-Policy"] = "default-src 'none'; style-src 'unsafe-inline'; sandbox"
-    
-    # Prevent caching of sensitive files
-    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, private"
-    response.headers["Pragma"] = "no-cache"
-    
-    return response
 
 
 # Extension to MIME type mapping for validation
@@ -184,6 +220,7 @@ def validate_file_upload(
     
     # 4. Verify magic bytes if requested
     if check_magic_bytes and extension in EXTENSION_MIME_MAP:
+        import magic  # libmagic is loaded on first upload, not at startup
         try:
             mime = magic.from_buffer(file_content, mime=True)
             expected_mimes = EXTENSION_MIME_MAP[extension]
@@ -197,6 +234,7 @@ def validate_file_upload(
     
     # 5. For images, verify they can be opened
     if extension in {'.jpg', '.jpeg', '.png', '.gif', '.webp'}:
+        from PIL import Image
         try:
             img = Image.open(io.BytesIO(file_content))
             img.verify()
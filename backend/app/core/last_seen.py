@@ -0,0 +1,132 @@
+"""
+Write-behind buffer for `users.last_seen`.
+
+Connection events only record a timestamp in memory; a background loop
+writes all pending timestamps with one bulk UPDATE every
+LAST_SEEN_FLUSH_INTERVAL seconds and once more at shutdown. A reconnect
+storm thus costs one write transaction per interval instead of one per
+connect/disconnect, which matters under SQLite's single writer.
+
+Exposed metrics (default Prometheus registry, served at /metrics):
+- last_seen_flush_size: users written per flush
+- last_seen_flush_lag_seconds: age of the oldest timestamp at flush time
+- last_seen_pending_users: users waiting for the next flush
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import update
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = Histogram(
+    "last_seen_flush_size",
+    "Number of users written by one last_seen flush",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+FLUSH_LAG = Histogram(
+    "last_seen_flush_lag_seconds",
+    "Age of the oldest buffered last_seen timestamp when it was written",
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120),
+)
+PENDING = Gauge("last_seen_pending_users", "Users with a last_seen timestamp not yet written")
+FLUSH_ERRORS = Counter("last_seen_flush_errors_total", "Failed last_seen flushes")
+
+
+class LastSeenBuffer:
+    """Collects last_seen timestamps and writes them in bulk"""
+
+    def __init__(self, interval: Optional[float] = None, session_factory: Optional[Callable] = None) -> None:
+        self.interval = interval or get_settings().last_seen_flush_interval_seconds
+        self._session_factory = session_factory
+        # user_id -> newest timestamp not yet written
+        self._pending: Dict[int, datetime] = {}
+        # monotonic time of the oldest pending entry
+        self._oldest: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.last_flush_size = 0
+        self.last_flush_lag = 0.0
+
+    def touch(self, user_id: int, seen: Optional[datetime] = None) -> None:
+        """Record activity of a user (written on the next flush)"""
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        self._pending[int(user_id)] = seen or datetime.utcnow()
+        PENDING.set(len(self._pending))
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def flush(self) -> int:
+        """Write all pending timestamps in one UPDATE; returns the number of users written"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        oldest, self._oldest = self._oldest, None
+
+        session_factory = self._session_factory
+        if session_factory is None:
+            from app.core.database import AsyncSessionLocal as session_factory
+        from app.modules.auth.models import User
+
+        try:
+            async with session_factory() as db:
+                await db.execute(
+                    update(User),
+                    [{"id": user_id, "last_seen": seen} for user_id, seen in pending.items()]
+                )
+                await db.commit()
+        except Exception as e:
+            FLUSH_ERRORS.inc()
+            logger.error(f"Failed to write last_seen for {len(pending)} users: {e}")
+            # Put the batch back; timestamps recorded meanwhile are newer and win
+            for user_id, seen in pending.items():
+                self._pending.setdefault(user_id, seen)
+            if oldest is not None:
+                self._oldest = min(oldest, self._oldest or oldest)
+            PENDING.set(len(self._pending))
+            return 0
+
+        self.last_flush_size = len(pending)
+        self.last_flush_lag = time.monotonic() - oldest if oldest is not None else 0.0
+        FLUSH_SIZE.observe(self.last_flush_size)
+        FLUSH_LAG.observe(self.last_flush_lag)
+        PENDING.set(len(self._pending))
+        logger.debug(f"Wrote last_seen for {self.last_flush_size} users (lag {self.last_flush_lag:.1f}s)")
+        return self.last_flush_size
+
+    def stats(self) -> dict:
+        """Snapshot for the health endpoint"""
+        return {
+            "pending": len(self._pending),
+            "last_flush_size": self.last_flush_size,
+            "last_flush_lag_seconds": round(self.last_flush_lag, 3),
+        }
+
+    async def run(self) -> None:
+        """Flush loop, started from the application lifespan"""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the loop and write whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+# Global instance
+last_seen_buffer = LastSeenBuffer()
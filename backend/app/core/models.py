@@ -6,7 +6,7 @@ These are not domain-specific models, but rather system-level entities.
 """
 
 from datetime import datetime
-from sqlalchemy import String, Boolean, Text
+from sqlalchemy import String, Boolean, Text, Integer, BigInteger, DateTime
 from sqlalchemy.orm import Mapped, mapped_column
 from app.core.database import Base
 
@@ -26,3 +26,48 @@ class SystemSetting(Base):
     description: Mapped[str] = mapped_column(String(255), nullable=True)
     is_public: Mapped[bool] = mapped_column(Boolean, default=False)
     group: Mapped[str] = mapped_column(String(50), default="general")  # general, security, email, storage
+
+
+class SchemaMarker(Base):
+    """
+    Fingerprint of the model metadata the database was last initialized with.
+
+    Single row (id=1). In fast startup mode a matching fingerprint means tables
+    and seed data are already in place, so create_all and seeding are skipped.
+    """
+    __tablename__ = "schema_marker"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ReplicaHeartbeat(Base):
+    """
+    Replication heartbeat (single row, id=1).
+
+    The primary rewrites `beat_ms` every REPLICA_CHECK_INTERVAL seconds while
+    read replicas are configured; the age of the value a replica returns is
+    its replication lag.
+    """
+    __tablename__ = "replica_heartbeat"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # Unix time in milliseconds (integer keeps sub-second precision on every backend)
+    beat_ms: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class Blob(Base):
+    """
+    Content-addressed file content, stored once under uploads/blobs.
+
+    Documents, archive files, email attachments and ZSSPD files reference
+    their content by `blob_sha256`; `ref_count` is the number of such
+    records. A blob whose count dropped to zero is garbage collected.
+    """
+    __tablename__ = "blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ref_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,180 @@
+"""
+Cluster-wide presence tracking with debounced broadcasts.
+
+Connection events only mark state dirty. A periodic flush (every
+PRESENCE_FLUSH_INTERVAL seconds) does all the work in bulk:
+- stores this worker's set of connected users in Redis (one key per worker
+  with a TTL, so users of a crashed worker expire on their own),
+- rebuilds the cluster-wide online set from all live workers,
+- sends a single `presence_diff` frame to local user streams with the users
+  that came online / went offline since the previous flush,
+- sends one `presence` frame to the local listeners of each channel whose
+  online count may have changed. The count is the number of channel members
+  in the cluster-wide online set (as in GET /chat/channels), so every worker
+  computes the same value and only delivers it to its own sockets.
+
+`last_seen` is handed to the write-behind buffer in app.core.last_seen.
+
+A reconnect within one interval therefore produces no frames at all.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func, select
+
+from app.core.config import get_settings
+from app.core.last_seen import LastSeenBuffer, last_seen_buffer
+from app.core.redis_manager import RedisManager
+
+if TYPE_CHECKING:
+    from app.core.websocket_manager import WebSocketManager
+
+logger = logging.getLogger(__name__)
+
+WORKERS_KEY = "presence:workers"
+WORKER_KEY_PREFIX = "presence:worker:"
+
+
+class PresenceService:
+    """Presence state of one worker plus its view of the whole cluster"""
+
+    def __init__(
+        self,
+        manager: "WebSocketManager",
+        redis: RedisManager,
+        interval: Optional[float] = None,
+        last_seen: Optional[LastSeenBuffer] = None,
+        session_factory: Optional[Callable] = None,
+    ) -> None:
+        self.manager = manager
+        self._redis = redis
+        self._session_factory = session_factory
+        self.interval = interval or get_settings().presence_flush_interval_seconds
+        # A worker missing this many flushes is considered dead
+        self.worker_ttl = max(10, int(self.interval * 5))
+        self.last_seen = last_seen or last_seen_buffer
+        # Cluster-wide online users as of the last flush
+        self._online: Set[int] = set()
+        # Online users as last announced to local clients
+        self._announced: Set[int] = set()
+        # Channels that gained or lost a local listener since the last flush
+        self._dirty_channels: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def _worker_key(self) -> str:
+        return f"{WORKER_KEY_PREFIX}{self.manager.worker_id}"
+
+    # ==================== Events (cheap, no I/O) ====================
+
+    def touch(self, user_id: int) -> None:
+        """Record a connect/disconnect of a user stream (last_seen is written behind)"""
+        self.last_seen.touch(user_id)
+
+    def channel_changed(self, channel_id: int) -> None:
+        """Mark a channel whose local listener set changed"""
+        self._dirty_channels.add(int(channel_id))
+
+    def online_user_ids(self) -> Set[int]:
+        """Cluster-wide online users; local connections are always up to date"""
+        return self._online | set(self.manager.user_connections)
+
+    # ==================== Flush ====================
+
+    async def flush(self) -> None:
+        """Publish local state, refresh the cluster view and send coalesced diffs"""
+        local_users = sorted(self.manager.user_connections)
+        await self._publish_local(local_users)
+        self._online = await self._collect_online() | set(local_users)
+
+        came_online = self._online - self._announced
+        went_offline = self._announced - self._online
+        self._announced = set(self._online)
+        if came_online or went_offline:
+            await self.manager._local_broadcast_to_all_users({
+                "type": "presence_diff",
+                "online": sorted(came_online),
+                "offline": sorted(went_offline)
+            })
+            for user_id in went_offline:
+                self.manager.session_starts.pop(user_id, None)
+                await self._redis.clear_session_start(user_id)
+
+        dirty, self._dirty_channels = self._dirty_channels, set()
+        if came_online or went_offline:
+            # Any channel with local listeners may have gained or lost an online member
+            dirty.update(self.manager.active_connections)
+        channel_ids = [cid for cid in dirty if cid in self.manager.active_connections]
+        if not channel_ids:
+            return
+        counts = await self._online_member_counts(channel_ids)
+        for channel_id in channel_ids:
+            # Every worker sends the same cluster-wide count to its own listeners
+            await self.manager._local_broadcast_to_channel(channel_id, {
+                "type": "presence",
+                "online_count": counts.get(channel_id, 0)
+            })
+
+    async def _online_member_counts(self, channel_ids: Iterable[int]) -> Dict[int, int]:
+        """Number of online members per channel, in one grouped query"""
+        if not self._online:
+            return {}
+        session_factory = self._session_factory
+        if session_factory is None:
+            from app.core.database import AsyncSessionLocal as session_factory
+        from app.modules.chat.models import ChannelMember
+
+        async with session_factory() as db:
+            result = await db.execute(
+                select(ChannelMember.channel_id, func.count(func.distinct(ChannelMember.user_id)))
+                .where(
+                    ChannelMember.channel_id.in_(list(channel_ids)),
+                    ChannelMember.user_id.in_(sorted(self._online))
+                )
+                .group_by(ChannelMember.channel_id)
+            )
+            return {row[0]: row[1] for row in result}
+
+    async def _publish_local(self, local_users: List[int]) -> None:
+        await self._redis.set(self._worker_key, json.dumps(local_users), ex=self.worker_ttl)
+        await self._redis.hset(WORKERS_KEY, self.manager.worker_id, str(time.time()))
+
+    async def _collect_online(self) -> Set[int]:
+        """Union of the connected users of every live worker"""
+        online: Set[int] = set()
+        workers = await self._redis.hgetall(WORKERS_KEY)
+        deadline = time.time() - self.worker_ttl
+        for worker_id, heartbeat in list(workers.items()):
+            if float(heartbeat) < deadline:
+                await self._redis.hdel(WORKERS_KEY, worker_id)
+                continue
+            raw = await self._redis.get(f"{WORKER_KEY_PREFIX}{worker_id}")
+            if raw:
+                online.update(json.loads(raw))
+        return online
+
+    # ==================== Lifecycle ====================
+
+    async def run(self) -> None:
+        """Flush loop, started from the application lifespan"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Presence flush failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the loop and withdraw this worker from the shared online set"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self._redis.hdel(WORKERS_KEY, self.manager.worker_id)
+        await self._redis.delete(self._worker_key)
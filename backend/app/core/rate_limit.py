@@ -156,11 +156,7 @@ async def rate_limit_chat_message(user_id: int, db: AsyncSession) -> bool:
         True if message is allowed, False if rate limited
     """
     # Get limit from system settings
-    limit = await ConfigService.get_value(db, "chat_rate_limit")
-    try:
-        max_messages = int(limit)
-    except (ValueError, TypeError):
-        max_messages = 60  # Default
+    max_messages = await ConfigService.get_int(db, "chat_rate_limit", 60)
     
     key = f"chat:{user_id}"
     return await RateLimiter.check_limit(key, max_requests=max_messages, window_seconds=60)
@@ -0,0 +1,195 @@
+"""
+Read replica routing.
+
+Read-only endpoints take their session from `get_read_db`, which asks the
+global ReplicaRouter for a session factory: a replica whose measured lag is
+within REPLICA_MAX_LAG_SECONDS (round robin), otherwise the primary.
+
+Lag is measured with a heartbeat row. Every REPLICA_CHECK_INTERVAL seconds
+the router writes the current time to `replica_heartbeat` on the primary and
+reads it back from each replica: a replica that already returns the value
+just written has no lag, otherwise the lag is the age of the value it
+returns. A replica that cannot be reached, has no heartbeat yet or was not
+checked recently is not used. Without DATABASE_REPLICA_URLS nothing runs and
+every read goes to the primary.
+
+Replica sessions refuse writes, so an endpoint moved to `get_read_db` by
+mistake fails loudly instead of writing to a replica.
+
+Exposed metrics (default Prometheus registry, served at /metrics):
+- db_replica_lag_seconds: last measured lag per replica
+- db_read_sessions_total: read sessions by target (replica/primary)
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+REPLICA_LAG = Gauge("db_replica_lag_seconds", "Last measured replication lag", ["replica"])
+READ_SESSIONS = Counter("db_read_sessions_total", "Sessions opened for read-only endpoints", ["target"])
+
+
+class ReadOnlySession(AsyncSession):
+    """Session bound to a replica; any write is a programming error"""
+
+    def _refuse(self) -> None:
+        raise RuntimeError("Write attempted on a read replica session")
+
+    async def execute(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        if isinstance(statement, UpdateBase):
+            self._refuse()
+        return await super().execute(statement, *args, **kwargs)
+
+    async def flush(self, objects: Any = None) -> None:
+        if self.new or self.dirty or self.deleted:
+            self._refuse()
+        await super().flush(objects)
+
+    async def commit(self) -> None:
+        if self.new or self.dirty or self.deleted:
+            self._refuse()
+        await super().commit()
+
+
+class _Replica:
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.session_factory = async_sessionmaker(
+            engine, class_=ReadOnlySession, expire_on_commit=False, autoflush=False
+        )
+        self.lag: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+
+class ReplicaRouter:
+    """Chooses the session factory for read-only work and tracks replica lag"""
+
+    def __init__(
+        self,
+        primary_factory: async_sessionmaker,
+        replica_engines: Optional[List[AsyncEngine]] = None,
+        max_lag: Optional[float] = None,
+        interval: Optional[float] = None,
+    ) -> None:
+        settings = get_settings()
+        self.primary_factory = primary_factory
+        self.replicas = [_Replica(engine) for engine in replica_engines or []]
+        self.max_lag = max_lag if max_lag is not None else settings.replica_max_lag_seconds
+        self.interval = interval or settings.replica_check_interval_seconds
+        self._round_robin = itertools.count()
+        self._last_beat_ms: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _is_usable(self, replica: _Replica, now: float) -> bool:
+        return (
+            replica.lag is not None
+            and replica.lag <= self.max_lag
+            # A stalled check loop must not pin reads to a stale measurement
+            and replica.checked_at is not None
+            and now - replica.checked_at <= 3 * self.interval
+        )
+
+    def session_factory(self) -> async_sessionmaker:
+        """Factory of the replica to read from, or of the primary"""
+        now = time.monotonic()
+        usable = [replica for replica in self.replicas if self._is_usable(replica, now)]
+        if not usable:
+            READ_SESSIONS.labels(target="primary").inc()
+            return self.primary_factory
+        READ_SESSIONS.labels(target="replica").inc()
+        return usable[next(self._round_robin) % len(usable)].session_factory
+
+    async def _write_heartbeat(self) -> int:
+        from app.core.models import ReplicaHeartbeat
+
+        beat_ms = int(time.time() * 1000)
+        async with self.primary_factory() as db:
+            result = await db.execute(
+                update(ReplicaHeartbeat).where(ReplicaHeartbeat.id == 1).values(beat_ms=beat_ms)
+            )
+            if result.rowcount == 0:
+                db.add(ReplicaHeartbeat(id=1, beat_ms=beat_ms))
+            await db.commit()
+        return beat_ms
+
+    async def _measure(self, replica: _Replica) -> None:
+        from app.core.models import ReplicaHeartbeat
+
+        try:
+            async with replica.session_factory() as db:
+                replica_beat = await db.scalar(
+                    select(ReplicaHeartbeat.beat_ms).where(ReplicaHeartbeat.id == 1)
+                )
+        except Exception as e:
+            replica.lag, replica.error = None, str(e)
+        else:
+            if replica_beat is None:
+                replica.lag, replica.error = None, "no heartbeat"
+            elif self._last_beat_ms is not None and replica_beat >= self._last_beat_ms:
+                replica.lag, replica.error = 0.0, None
+            else:
+                replica.lag = max(0.0, time.time() - replica_beat / 1000)
+                replica.error = None
+        replica.checked_at = time.monotonic()
+        if replica.lag is not None:
+            REPLICA_LAG.labels(replica=replica.name).set(replica.lag)
+
+    async def check(self) -> None:
+        """Write a heartbeat on the primary and measure the lag of every replica"""
+        if not self.replicas:
+            return
+        try:
+            self._last_beat_ms = await self._write_heartbeat()
+        except Exception as e:
+            # Lag is still measured against the last successful beat
+            logger.error(f"Failed to write replica heartbeat: {e}")
+        await asyncio.gather(*(self._measure(replica) for replica in self.replicas))
+        for replica in self.replicas:
+            if replica.lag is None or replica.lag > self.max_lag:
+                logger.debug(f"Replica {replica.name} not used: lag={replica.lag} error={replica.error}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot for the health endpoint"""
+        now = time.monotonic()
+        return {
+            "max_lag_seconds": self.max_lag,
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "usable": self._is_usable(replica, now),
+                    "lag_seconds": round(replica.lag, 3) if replica.lag is not None else None,
+                    "error": replica.error,
+                }
+                for replica in self.replicas
+            ],
+        }
+
+    async def run(self) -> None:
+        """Heartbeat loop, started from the application lifespan"""
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the loop and close replica connections"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
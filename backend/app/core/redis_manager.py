@@ -19,9 +19,13 @@ class RedisManager:
     - Pub/Sub falls back to local asyncio events (single-process only)
     - Rate limiting works per-process only
     - Session data stays in memory
+    
+    Several managers can share one in-memory subscriber table (see
+    create_local_cluster) to simulate multiple workers talking through
+    a single Redis server.
     """
     
-    def __init__(self) -> None:
+    def __init__(self, shared_bus: Optional[Dict[str, List[Callable]]] = None) -> None:
         self._redis = None
         self._pubsub = None
         self._is_connected = False
@@ -30,7 +34,28 @@ class RedisManager:
         # In-memory fallback storage
         self._memory_cache: Dict[str, Any] = {}
         self._memory_expiry: Dict[str, datetime] = {}
-        self._local_subscribers: Dict[str, List[Callable]] = {}
+        self._local_subscribers: Dict[str, List[Callable]] = shared_bus if shared_bus is not None else {}
+        self._shared_bus = shared_bus is not None
+    
+    @classmethod
+    def create_local_cluster(cls, size: int) -> List["RedisManager"]:
+        """
+        Create managers that behave like separate workers connected to one Redis.
+        Pub/sub messages published by any of them reach subscribers of all of them,
+        and keys written by one are visible to the others.
+        Intended for tests and local simulations.
+        """
+        bus: Dict[str, List[Callable]] = {}
+        store: Dict[str, Any] = {}
+        expiry: Dict[str, datetime] = {}
+        managers = []
+        for _ in range(size):
+            manager = cls(shared_bus=bus)
+            manager._fallback_mode = True
+            manager._memory_cache = store
+            manager._memory_expiry = expiry
+            managers.append(manager)
+        return managers
         
     async def connect(self, redis_url: Optional[str] = None) -> None:
         """Initialize Redis connection or fallback to in-memory mode"""
@@ -69,6 +94,11 @@ class RedisManager:
         """Check if Redis is connected and available"""
         return self._is_connected and not self._fallback_mode
     
+    @property
+    def supports_fanout(self) -> bool:
+        """Check if published messages can reach other workers"""
+        return self.is_available or self._shared_bus
+    
     # ==================== Key-Value Operations ====================
     
     async def get(self, key: str) -> Optional[str]:
@@ -206,12 +236,7 @@ class RedisManager:
         
         if self._fallback_mode:
             # Local event dispatch
-            if channel in self._local_subscribers:
-                for callback in self._local_subscribers[channel]:
-                    try:
-                        asyncio.create_task(callback(message))
-                    except Exception as e:
-                        logger.error(f"Local pub/sub callback error: {e}")
+            self._dispatch_local(channel, msg_str)
             return
             
         try:
@@ -219,9 +244,16 @@ class RedisManager:
         except Exception as e:
             logger.error(f"Redis PUBLISH error: {e}")
             # Fallback to local
-            if channel in self._local_subscribers:
-                for callback in self._local_subscribers[channel]:
-                    asyncio.create_task(callback(message))
+            self._dispatch_local(channel, msg_str)
+    
+    def _dispatch_local(self, channel: str, msg_str: str):
+        """Deliver a published message to in-process subscribers.
+        Each callback gets its own decoded copy, as it would from Redis."""
+        for callback in list(self._local_subscribers.get(channel, [])):
+            try:
+                asyncio.create_task(callback(json.loads(msg_str)))
+            except Exception as e:
+                logger.error(f"Local pub/sub callback error: {e}")
                     
     async def subscribe(self, channel: str, callback: Callable):
         """Subscribe to channel with callback"""
@@ -243,6 +275,22 @@ class RedisManager:
             self._local_subscribers[channel].append(callback)
         except Exception as e:
             logger.error(f"Redis SUBSCRIBE error: {e}")
+    
+    async def unsubscribe(self, channel: str, callback: Callable):
+        """Remove a callback; drops the Redis subscription once no callbacks remain"""
+        callbacks = self._local_subscribers.get(channel)
+        if callbacks and callback in callbacks:
+            callbacks.remove(callback)
+        if callbacks is not None and not callbacks:
+            del self._local_subscribers[channel]
+            
+        if self._fallback_mode or not self._pubsub or channel in self._local_subscribers:
+            return
+            
+        try:
+            await self._pubsub.unsubscribe(channel)
+        except Exception as e:
+            logger.error(f"Redis UNSUBSCRIBE error: {e}")
             
     async def start_listener(self):
         """Start Redis pub/sub listener loop"""
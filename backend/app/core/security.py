@@ -1,12 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Optional
+import asyncio
 import hashlib
+import time
 import bcrypt
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
+from prometheus_client import Counter, Gauge, Histogram
 from app.core.config import get_settings
 
 settings = get_settings()
 
+HASH_PENDING = Gauge("password_hash_pending", "bcrypt calls queued or running in the password pool")
+HASH_WAIT = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time a bcrypt call waited for a free pool thread",
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent inside bcrypt",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 1, 2),
+)
+HASH_REJECTED = Counter("password_hash_rejected_total", "bcrypt calls rejected because the pool queue was full")
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password using SHA-256 raw digest pre-hashing"""
@@ -27,6 +45,70 @@ def get_password_hash(password: str) -> str:
     return hashed.decode('utf-8')
 
 
+class PasswordHasherPool:
+    """
+    Runs bcrypt off the event loop in a small dedicated thread pool.
+
+    bcrypt releases the GIL, so while a login is being verified the loop keeps
+    serving WebSockets and other requests. At most `max_pending` calls may be
+    queued or running; further calls fail fast with 503 instead of building an
+    unbounded backlog of ~250 ms jobs.
+    """
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.max_pending:
+            HASH_REJECTED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервер перегружен. Пожалуйста, повторите попытку через несколько секунд.",
+                headers={"Retry-After": "5"}
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+
+        submitted = time.perf_counter()
+
+        def job() -> Any:
+            started = time.perf_counter()
+            HASH_WAIT.observe(started - submitted)
+            try:
+                return func(*args)
+            finally:
+                HASH_DURATION.observe(time.perf_counter() - started)
+
+        self.pending += 1
+        HASH_PENDING.set(self.pending)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            self.pending -= 1
+            HASH_PENDING.set(self.pending)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_pool = PasswordHasherPool(settings.password_hash_workers, settings.password_hash_max_pending)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password for request handlers: runs in the password pool"""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash for request handlers: runs in the password pool"""
+    return await password_pool.run(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -0,0 +1,155 @@
+"""
+SQLite connection tuning and write serialization.
+
+SQLite allows a single writer per database file. With several pooled
+connections, concurrent write transactions otherwise fight over the file
+lock and fail with "database is locked" once busy_timeout runs out (or
+immediately, when a read transaction tries to upgrade to a write).
+
+SerializedWriteSession queues write transactions of this process in FIFO
+order: a session takes the writer slot on its first INSERT/UPDATE/DELETE
+(or flush with pending changes) and gives it back on commit, rollback or
+close. Reads never wait. Other processes are still coordinated by SQLite's
+own busy_timeout.
+
+Limits:
+- One write transaction per task. Opening a second write session while the
+  task's first one holds the slot raises RuntimeError: the second session
+  would need the database lock the first one holds, and the first cannot
+  commit while the task waits on the second.
+- The queue does not make read-then-write transactions safe. A session that
+  read before its first write runs on a WAL snapshot from that read; if
+  another writer committed in between, SQLite refuses the upgrade with
+  SQLITE_BUSY ("database is locked") without waiting for busy_timeout.
+  Such transactions should write first or be retried.
+"""
+import asyncio
+import logging
+import re
+from typing import Any, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_WRITE_SQL = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b", re.IGNORECASE)
+
+
+def apply_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    """Per-connection pragmas, registered as a `connect` event listener"""
+    settings = get_settings()
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        # Negative cache_size is in KiB
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_mb) * 1024}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size_mb) * 1024 * 1024}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+class SQLiteWriteQueue:
+    """
+    Process-wide writer slot. asyncio.Lock wakes waiters in FIFO order.
+    Not re-entrant: a task that asks for the slot while it already holds it
+    gets a RuntimeError instead of deadlocking on itself.
+    """
+
+    def __init__(self) -> None:
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._owner: Optional[asyncio.Task] = None
+        self.waiting = 0
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+            self._owner = None
+        return self._lock
+
+    async def acquire(self) -> None:
+        lock = self._get_lock()
+        task = asyncio.current_task()
+        if self._owner is task and task is not None:
+            raise RuntimeError(
+                "Nested write transaction: this task already holds the SQLite writer slot "
+                "with another session; commit it first or reuse that session"
+            )
+        self.waiting += 1
+        try:
+            await lock.acquire()
+        finally:
+            self.waiting -= 1
+        self._owner = task
+
+    def release(self) -> None:
+        self._owner = None
+        if self._lock is not None and self._lock.locked():
+            self._lock.release()
+
+
+sqlite_write_queue = SQLiteWriteQueue()
+
+
+class SerializedWriteSession(AsyncSession):
+    """AsyncSession that holds the process writer slot for the span of a write transaction"""
+
+    write_queue = sqlite_write_queue
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._holds_writer = False
+
+    async def _begin_write(self) -> None:
+        if not self._holds_writer:
+            await self.write_queue.acquire()
+            self._holds_writer = True
+
+    def _end_write(self) -> None:
+        if self._holds_writer:
+            self._holds_writer = False
+            self.write_queue.release()
+
+    def _has_pending_changes(self) -> bool:
+        return bool(self.new or self.dirty or self.deleted)
+
+    async def execute(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        if isinstance(statement, UpdateBase) or (
+            isinstance(statement, TextClause) and _WRITE_SQL.match(statement.text)
+        ):
+            await self._begin_write()
+        return await super().execute(statement, *args, **kwargs)
+
+    async def flush(self, objects: Any = None) -> None:
+        if self._has_pending_changes():
+            await self._begin_write()
+        await super().flush(objects)
+
+    async def commit(self) -> None:
+        if self._has_pending_changes():
+            await self._begin_write()
+        try:
+            await super().commit()
+        finally:
+            self._end_write()
+
+    async def rollback(self) -> None:
+        try:
+            await super().rollback()
+        finally:
+            self._end_write()
+
+    async def close(self) -> None:
+        try:
+            await super().close()
+        finally:
+            self._end_write()
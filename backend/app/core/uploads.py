@@ -0,0 +1,94 @@
+"""
+Streaming upload sink shared by the upload endpoints.
+
+`stream_upload` copies an UploadFile to disk chunk by chunk:
+- file I/O and hashing run in worker threads, so a large upload never
+  blocks the event loop and is never held in memory as a whole
+- the size limit is enforced on the bytes actually received, not on the
+  client supplied size
+- data goes to a temporary file next to the destination, which is
+  renamed into place only when complete, so readers never see a partial
+  file and a failed upload leaves nothing behind
+- the SHA-256 of the content is computed on the way
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+
+from fastapi import HTTPException, UploadFile
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+class UploadTooLarge(HTTPException):
+    """Upload exceeded its size limit (413)"""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        super().__init__(status_code=413, detail=f"File too large (max {max_bytes // (1024 * 1024)}MB)")
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    path: str
+    size: int
+    sha256: str
+
+
+def _write_chunk(buffer: BinaryIO, digest, chunk: bytes) -> None:
+    buffer.write(chunk)
+    digest.update(chunk)
+
+
+def _finish(buffer: BinaryIO, tmp_path: str, path: str) -> None:
+    buffer.flush()
+    os.fsync(buffer.fileno())
+    buffer.close()
+    os.replace(tmp_path, path)
+
+
+def _discard(buffer: BinaryIO, tmp_path: str) -> None:
+    buffer.close()
+    try:
+        os.remove(tmp_path)
+    except OSError as e:
+        logger.error(f"Failed to remove partial upload {tmp_path}: {e}")
+
+
+async def stream_upload(
+    upload: UploadFile,
+    path: str,
+    max_bytes: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> StoredUpload:
+    """
+    Write `upload` to `path` and return its size and SHA-256.
+
+    Raises UploadTooLarge as soon as more than `max_bytes` were received;
+    the destination is left untouched on any error.
+    """
+    directory = os.path.dirname(path) or "."
+    await asyncio.to_thread(os.makedirs, directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{uuid.uuid4().hex}.part")
+
+    buffer = await asyncio.to_thread(open, tmp_path, "wb")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while chunk := await upload.read(chunk_size):
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise UploadTooLarge(max_bytes)
+            await asyncio.to_thread(_write_chunk, buffer, digest, chunk)
+        await asyncio.to_thread(_finish, buffer, tmp_path, path)
+    except BaseException:
+        # Also on cancellation (client went away)
+        await asyncio.shield(asyncio.to_thread(_discard, buffer, tmp_path))
+        raise
+    return StoredUpload(path=path, size=size, sha256=digest.hexdigest())
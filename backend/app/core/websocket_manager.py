@@ -1,13 +1,24 @@
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Deque, Dict, Iterable, List, Set, Tuple, Optional
+from collections import deque
 from datetime import datetime
 from fastapi import WebSocket
+import json
 import logging
 import asyncio
+import time
+import uuid
 
-from app.core.redis_manager import redis_manager
+from app.core.config import get_settings
+from app.core.redis_manager import RedisManager, redis_manager
+from app.core.presence import PresenceService
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
 # WebSocket compression settings
 # Note: Actual compression support depends on the client and Starlette version
 WS_COMPRESSION_OPTIONS = {
@@ -16,6 +27,137 @@ WS_COMPRESSION_OPTIONS = {
 }
 
 
+def encode_message(message: dict) -> str:
+    """
+    Serialize a message into a text frame once, so broadcasts can reuse it
+    for every recipient. Uses orjson when installed, stdlib json otherwise.
+    """
+    if orjson is not None:
+        return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+PING_FRAME = encode_message({"type": "ping"})
+
+# State-like events where only the latest pending frame matters
+EPHEMERAL_EVENT_TYPES = {"typing", "presence", "user_presence", "ping"}
+
+# Close code used when a client cannot keep up with its outbound queue
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+def coalesce_key(message: dict) -> Optional[tuple]:
+    """Key under which pending ephemeral frames replace each other (None = never coalesce)"""
+    msg_type = message.get("type")
+    if msg_type not in EPHEMERAL_EVENT_TYPES:
+        return None
+    return (msg_type, message.get("channel_id"), message.get("user_id"))
+
+
+class ConnectionWriter:
+    """
+    Outbound queue of a single websocket, drained by its own writer task.
+    
+    - Enqueueing never blocks the broadcaster
+    - Ephemeral frames (typing, presence, ping) replace an older pending frame
+      with the same coalesce key and are dropped when the queue is full
+    - A client whose oldest pending frame is older than max_lag seconds, or
+      whose queue overflows with regular frames, is disconnected
+    """
+    
+    def __init__(self, websocket: WebSocket, max_queue: int, max_lag: float) -> None:
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.max_lag = max_lag
+        # Pending entries are [frame, coalesce_key, enqueued_at]
+        self._pending: Deque[list] = deque()
+        self._coalesce: Dict[tuple, list] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.dropped = 0
+    
+    @property
+    def lag(self) -> float:
+        """Age in seconds of the oldest frame still waiting to be sent"""
+        if not self._pending:
+            return 0.0
+        return time.monotonic() - self._pending[0][2]
+    
+    def enqueue(self, frame: str, key: Optional[tuple] = None) -> bool:
+        """Queue a frame for sending. Returns False if the client was evicted."""
+        if self.closed:
+            return False
+        
+        if key is not None:
+            pending = self._coalesce.get(key)
+            if pending is not None:
+                pending[0] = frame
+                return True
+        
+        if self.lag > self.max_lag:
+            self.evict(f"lagging {self.lag:.1f}s behind")
+            return False
+        
+        if len(self._pending) >= self.max_queue:
+            if key is not None:
+                self.dropped += 1
+                return True
+            self.evict(f"send queue overflow ({self.max_queue} frames)")
+            return False
+        
+        entry = [frame, key, time.monotonic()]
+        self._pending.append(entry)
+        if key is not None:
+            self._coalesce[key] = entry
+        
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+        return True
+    
+    async def _run(self) -> None:
+        while not self.closed:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            
+            entry = self._pending.popleft()
+            frame, key, _ = entry
+            if key is not None and self._coalesce.get(key) is entry:
+                del self._coalesce[key]
+            
+            try:
+                await self.websocket.send_text(frame)
+            except Exception as e:
+                logger.debug(f"Error sending message: {e}")
+                self.stop()
+    
+    def stop(self) -> None:
+        """Stop the writer task and discard pending frames"""
+        if self.closed:
+            return
+        self.closed = True
+        self._pending.clear()
+        self._coalesce.clear()
+        self._wakeup.set()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+    
+    def evict(self, reason: str) -> None:
+        """Disconnect a slow consumer without waiting on its socket"""
+        logger.warning(f"Evicting slow WebSocket consumer: {reason}")
+        self.stop()
+        asyncio.create_task(self._close())
+    
+    async def _close(self) -> None:
+        try:
+            await self.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="Slow consumer")
+        except Exception:
+            pass
+
+
 class WebSocketManager:
     """
     Manage WebSocket connections with Redis pub/sub support.
@@ -23,20 +165,49 @@ class WebSocketManager:
     In multi-worker mode (with Redis):
     - Messages are published to Redis channels
     - Each worker subscribes and delivers to local connections
+    - Channel and user broadcasts use one Redis channel per chat channel
+      (ws:channel:{id}) and per user (ws:user:{id}); a worker subscribes
+      to a topic only while it holds a local listener for it
     
     In single-worker mode (without Redis):
     - Direct local delivery (original behavior)
+    
+    Multiplexed sockets are user notification streams that can also be
+    subscribed to any number of channels. Channel frames sent to them carry
+    "channel_id" and "scope": "channel" so the client can route them.
     """
     
-    def __init__(self) -> None:
-        # channel_id -> list of (websocket, user_id) tuples
-        self.active_connections: Dict[int, List[Tuple[WebSocket, int]]] = {}
-        # channel_id -> set of user_ids (for quick unique count)
-        self.channel_users: Dict[int, Set[int]] = {}
-        # user_id -> list of websockets (for global user notifications)
-        self.user_connections: Dict[int, List[WebSocket]] = {}
+    def __init__(
+        self,
+        redis: Optional[RedisManager] = None,
+        send_queue_size: Optional[int] = None,
+        max_send_lag: Optional[float] = None,
+    ) -> None:
+        settings = get_settings()
+        self._redis = redis if redis is not None else redis_manager
+        self.send_queue_size = send_queue_size or settings.ws_send_queue_size
+        self.max_send_lag = max_send_lag or settings.ws_max_send_lag_seconds
+        # websocket -> outbound queue writer
+        self._writers: Dict[WebSocket, ConnectionWriter] = {}
+        # Identifies this worker in pub/sub envelopes so it skips its own echoes
+        self.worker_id = uuid.uuid4().hex
+        # Indexed registry: every connect/disconnect/kick is O(1) per socket
+        # channel_id -> {websocket: user_id}
+        self.active_connections: Dict[int, Dict[WebSocket, int]] = {}
+        # channel_id -> {user_id: number of the user's sockets in the channel}
+        self.channel_users: Dict[int, Dict[int, int]] = {}
+        # channel websocket -> (user_id, channel_ids it is registered in)
+        self._socket_index: Dict[WebSocket, Tuple[int, Set[int]]] = {}
+        # user_id -> channel websockets (for kick)
+        self.user_channel_sockets: Dict[int, Set[WebSocket]] = {}
+        # user_id -> set of websockets (for global user notifications)
+        self.user_connections: Dict[int, Set[WebSocket]] = {}
+        # User notification sockets that also carry channel subscriptions
+        self._multiplexed: Set[WebSocket] = set()
         # Local cache for session starts (synced with Redis)
         self._local_session_starts: Dict[int, datetime] = {}
+        # Debounced presence broadcasts and cluster-wide online set
+        self.presence = PresenceService(self, self._redis)
         
     @property
     def session_starts(self) -> Dict[int, datetime]:
@@ -45,13 +216,12 @@ class WebSocketManager:
         
     async def init_redis(self, redis_url: Optional[str] = None) -> None:
         """Initialize Redis connection and subscribe to channels"""
-        await redis_manager.connect(redis_url)
+        await self._redis.connect(redis_url)
         
-        if redis_manager.is_available:
+        if self._redis.is_available:
             # Subscribe to broadcast channels
-            await redis_manager.subscribe("ws:broadcast:all", self._handle_redis_broadcast_all)
-            await redis_manager.subscribe("ws:broadcast:presence", self._handle_redis_presence)
-            await redis_manager.start_listener()
+            await self._redis.subscribe("ws:broadcast:all", self._handle_redis_broadcast_all)
+            await self._redis.start_listener()
             logger.info("WebSocket manager: Redis pub/sub initialized")
         else:
             logger.info("WebSocket manager: Using local-only mode (no Redis)")
@@ -61,31 +231,86 @@ class WebSocketManager:
         exclude_user_id = message.pop("_exclude_user_id", None)
         await self._local_broadcast_to_all_users(message, exclude_user_id)
         
-    async def _handle_redis_presence(self, message: dict) -> None:
-        """Handle presence updates from other workers"""
-        await self._local_broadcast_to_all_users(message)
+    @staticmethod
+    def _channel_topic(channel_id: int) -> str:
+        return f"ws:channel:{channel_id}"
+    
+    @staticmethod
+    def _user_topic(user_id: int) -> str:
+        return f"ws:user:{user_id}"
+    
+    # Multi-user fan-outs travel as one envelope on a topic shared by every worker
+    # that holds at least one user notification stream
+    USERS_TOPIC = "ws:users"
+    
+    async def _listen(self, topic: str, handler) -> None:
+        """Subscribe this worker to a sharded topic (no-op without fan-out)"""
+        if self._redis.supports_fanout:
+            await self._redis.subscribe(topic, handler)
+    
+    async def _unlisten(self, topic: str, handler) -> None:
+        """Drop this worker's subscription to a sharded topic"""
+        if self._redis.supports_fanout:
+            await self._redis.unsubscribe(topic, handler)
+    
+    async def _handle_redis_channel(self, envelope: dict) -> None:
+        """Deliver a channel broadcast published by another worker"""
+        if envelope.get("origin") == self.worker_id:
+            return
+        await self._local_broadcast_to_channel(int(envelope["channel_id"]), envelope["message"])
+    
+    async def _handle_redis_user(self, envelope: dict) -> None:
+        """Deliver a per-user broadcast published by another worker"""
+        if envelope.get("origin") == self.worker_id:
+            return
+        await self._local_broadcast_to_user(int(envelope["user_id"]), envelope["message"])
+    
+    async def _handle_redis_users(self, envelope: dict) -> None:
+        """Deliver a multi-user fan-out published by another worker"""
+        if envelope.get("origin") == self.worker_id:
+            return
+        await self._local_broadcast_to_users(envelope["user_ids"], envelope["message"])
+    
+    def _writer(self, websocket: WebSocket) -> ConnectionWriter:
+        writer = self._writers.get(websocket)
+        if writer is None:
+            writer = ConnectionWriter(websocket, self.send_queue_size, self.max_send_lag)
+            self._writers[websocket] = writer
+        return writer
+    
+    def _release_writer(self, websocket: WebSocket) -> None:
+        writer = self._writers.pop(websocket, None)
+        if writer is not None:
+            writer.stop()
+    
+    def _enqueue(self, websocket: WebSocket, frame: str, key: Optional[tuple] = None) -> None:
+        """Hand a frame to the websocket's writer task without awaiting the send"""
+        self._writer(websocket).enqueue(frame, key)
+    
+    async def send_personal(self, websocket: WebSocket, message: dict) -> None:
+        """Send a message to one websocket through its outbound queue"""
+        self._enqueue(websocket, encode_message(message), coalesce_key(message))
     
     async def connect(self, websocket: WebSocket, channel_id: int, user_id: int) -> None:
         """
         Connect a websocket to a channel and broadcast presence.
         Accepts with compression support when available.
         """
-        channel_id = int(channel_id)
-        user_id = int(user_id)
         # Accept with default compression if client supports it
         await websocket.accept()
+        await self.join_channel(websocket, channel_id, user_id)
+    
+    async def join_channel(self, websocket: WebSocket, channel_id: int, user_id: int) -> None:
+        """Register an accepted websocket as a listener of a channel and schedule a presence update"""
+        channel_id = int(channel_id)
+        user_id = int(user_id)
+        is_first_listener = self._add_channel_socket(websocket, channel_id, user_id)
         
-        if channel_id not in self.active_connections:
-            self.active_connections[channel_id] = []
-            self.channel_users[channel_id] = set()
-        self.active_connections[channel_id].append((websocket, user_id))
-        self.channel_users[channel_id].add(user_id)
+        if is_first_listener:
+            await self._listen(self._channel_topic(channel_id), self._handle_redis_channel)
         
-        # Broadcast presence update to all users in channel
-        await self.broadcast_to_channel(channel_id, {
-            "type": "presence",
-            "online_count": len(self.channel_users[channel_id])
-        })
+        # Channel presence is broadcast on the next presence flush
+        self.presence.channel_changed(channel_id)
     
     async def connect_user(self, websocket: WebSocket, user_id: int) -> None:
         """Connect a websocket to a user's global notification stream"""
@@ -93,149 +318,265 @@ class WebSocketManager:
         await websocket.accept()
         logger.debug(f"connect_user called for user {user_id}")
         
-        is_first_connection = user_id not in self.user_connections
+        is_first_connection = await self.register_user_connection(websocket, user_id)
         
         if is_first_connection:
-            self.user_connections[user_id] = []
             now = datetime.utcnow()
             self._local_session_starts[user_id] = now
             # Store in Redis for persistence across restarts
-            await redis_manager.set_session_start(user_id, now)
-            
-        self.user_connections[user_id].append(websocket)
+            await self._redis.set_session_start(user_id, now)
+        self.presence.touch(user_id)
+    
+    async def register_user_connection(self, websocket: WebSocket, user_id: int) -> bool:
+        """
+        Register an already accepted websocket as a user notification stream.
+        Returns True if this is the user's first connection on this worker.
+        """
+        user_id = int(user_id)
+        is_first_user = not self.user_connections
+        is_first_connection = user_id not in self.user_connections
+        if is_first_connection:
+            self.user_connections[user_id] = set()
+        self.user_connections[user_id].add(websocket)
         logger.debug(f"User {user_id} connected. Total: {len(self.user_connections[user_id])}")
         
+        if is_first_user:
+            await self._listen(self.USERS_TOPIC, self._handle_redis_users)
         if is_first_connection:
-            await self.broadcast_to_all_users({
-                "type": "user_presence",
-                "user_id": user_id,
-                "status": "online"
-            })
+            await self._listen(self._user_topic(user_id), self._handle_redis_user)
+        return is_first_connection
+    
+    async def connect_multiplexed(self, websocket: WebSocket, user_id: int) -> bool:
+        """
+        Register an accepted websocket as a multiplexed stream: it receives the
+        user's notifications plus frames of every channel it joins.
+        Returns True if this is the user's first connection on this worker.
+        """
+        self._multiplexed.add(websocket)
+        return await self.register_user_connection(websocket, user_id)
+    
+    async def disconnect_multiplexed(self, websocket: WebSocket, user_id: int) -> None:
+        """Leave all channels of a multiplexed stream, then drop the user stream"""
+        indexed = self._socket_index.get(websocket)
+        if indexed is not None:
+            for channel_id in list(indexed[1]):
+                await self.disconnect(websocket, channel_id, user_id)
+        self._multiplexed.discard(websocket)
+        await self.disconnect_user(websocket, user_id)
+    
+    def is_joined(self, websocket: WebSocket, channel_id: int) -> bool:
+        """Check if a websocket listens to a channel"""
+        return websocket in self.active_connections.get(int(channel_id), {})
     
     def get_online_user_ids(self) -> List[int]:
-        """Get list of all online user IDs (users with global WebSocket connections)"""
-        return [int(uid) for uid in self.user_connections.keys()]
+        """Get list of all online user IDs across workers (from the shared presence set)"""
+        return list(self.presence.online_user_ids())
+    
+    def _add_channel_socket(self, websocket: WebSocket, channel_id: int, user_id: int) -> bool:
+        """Index a channel socket. Returns True if it is the channel's first local socket."""
+        sockets = self.active_connections.get(channel_id)
+        is_first = sockets is None
+        if is_first:
+            sockets = self.active_connections[channel_id] = {}
+            self.channel_users[channel_id] = {}
+        if websocket in sockets:
+            return is_first
+        
+        sockets[websocket] = user_id
+        refs = self.channel_users[channel_id]
+        refs[user_id] = refs.get(user_id, 0) + 1
+        
+        _, channels = self._socket_index.setdefault(websocket, (user_id, set()))
+        channels.add(channel_id)
+        self.user_channel_sockets.setdefault(user_id, set()).add(websocket)
+        return is_first
+    
+    def _remove_channel_socket(self, websocket: WebSocket, channel_id: int) -> bool:
+        """Drop a channel socket from the index. Returns False if it was not registered."""
+        sockets = self.active_connections.get(channel_id)
+        if sockets is None or websocket not in sockets:
+            return False
+        
+        user_id = sockets.pop(websocket)
+        refs = self.channel_users.get(channel_id, {})
+        remaining = refs.get(user_id, 0) - 1
+        if remaining > 0:
+            refs[user_id] = remaining
+        else:
+            refs.pop(user_id, None)
+        
+        indexed = self._socket_index.get(websocket)
+        if indexed is not None:
+            _, channels = indexed
+            channels.discard(channel_id)
+            if not channels:
+                del self._socket_index[websocket]
+                user_sockets = self.user_channel_sockets.get(user_id)
+                if user_sockets is not None:
+                    user_sockets.discard(websocket)
+                    if not user_sockets:
+                        del self.user_channel_sockets[user_id]
+        return True
     
     async def disconnect(self, websocket: WebSocket, channel_id: int, user_id: int):
-        """Disconnect a websocket from a channel and broadcast presence"""
+        """Disconnect a websocket from a channel and schedule a presence update"""
         channel_id = int(channel_id)
         user_id = int(user_id)
         
-        if channel_id in self.active_connections:
-            # Remove this specific websocket-user tuple
-            self.active_connections[channel_id] = [
-                (ws, uid) for ws, uid in self.active_connections[channel_id]
-                if ws != websocket
-            ]
-            
-            # Check if this user still has other connections to this channel
-            remaining_user_connections = any(
-                uid == user_id for ws, uid in self.active_connections[channel_id]
-            )
-            if not remaining_user_connections and channel_id in self.channel_users:
-                self.channel_users[channel_id].discard(user_id)
-            
-            # Broadcast presence update
-            online_count = len(self.channel_users.get(channel_id, set()))
-            await self.broadcast_to_channel(channel_id, {
-                "type": "presence",
-                "online_count": online_count
-            })
+        removed = self._remove_channel_socket(websocket, channel_id)
+        if websocket not in self._socket_index and websocket not in self._multiplexed:
+            self._release_writer(websocket)
+        
+        if removed:
+            # Channel presence is broadcast on the next presence flush
+            self.presence.channel_changed(channel_id)
             
             # Clean up empty channel lists
-            if not self.active_connections[channel_id]:
+            if channel_id in self.active_connections and not self.active_connections[channel_id]:
                 del self.active_connections[channel_id]
-                if channel_id in self.channel_users:
-                    del self.channel_users[channel_id]
+                self.channel_users.pop(channel_id, None)
+                await self._unlisten(self._channel_topic(channel_id), self._handle_redis_channel)
     
     async def disconnect_user(self, websocket: WebSocket, user_id: int):
         """Disconnect a global user notification connection"""
         user_id = int(user_id)
+        self._release_writer(websocket)
         
         if user_id in self.user_connections:
-            try:
-                self.user_connections[user_id].remove(websocket)
-                logger.debug(f"User {user_id} disconnected. Remaining: {len(self.user_connections[user_id])}")
-            except ValueError:
-                pass
+            self.user_connections[user_id].discard(websocket)
+            logger.debug(f"User {user_id} disconnected. Remaining: {len(self.user_connections[user_id])}")
             
             # Clean up empty user lists
             if not self.user_connections[user_id]:
                 del self.user_connections[user_id]
-                logger.debug(f"User {user_id} has no more connections. Waiting...")
-                
-                # Wait a short time to allow for reconnection
-                await asyncio.sleep(2.0)
-                
-                # Check again if user is still offline
-                if user_id not in self.user_connections:
-                    logger.debug(f"User {user_id} still offline. Broadcasting...")
-                    await self.broadcast_to_all_users({
-                        "type": "user_presence",
-                        "user_id": user_id,
-                        "status": "offline"
-                    })
-                    # Clear session start
-                    self._local_session_starts.pop(user_id, None)
-                    await redis_manager.clear_session_start(user_id)
+                logger.debug(f"User {user_id} has no more connections on this worker")
+                await self._unlisten(self._user_topic(user_id), self._handle_redis_user)
+                if not self.user_connections:
+                    await self._unlisten(self.USERS_TOPIC, self._handle_redis_users)
+                # Offline diff and session cleanup follow on the next presence flush
+                self.presence.touch(user_id)
 
     async def kick_user(self, user_id: int):
         """Forcefully disconnect all WebSocket connections for a user"""
         user_id = int(user_id)
         
-        # 1. Kick from global connections
-        if user_id in self.user_connections:
-            connections = list(self.user_connections[user_id])
-            for ws in connections:
-                try:
-                    await ws.close(code=4003, reason="Account disabled")
-                except Exception:
-                    pass
-        
-        # 2. Kick from channel connections
-        for channel_id, connections in list(self.active_connections.items()):
-            for ws, uid in list(connections):
-                if uid == user_id:
-                    try:
-                        await ws.close(code=4003, reason="Account disabled")
-                    except Exception:
-                        pass
+        # Global and channel connections are both indexed by user
+        connections = set(self.user_connections.get(user_id, ()))
+        connections |= self.user_channel_sockets.get(user_id, set())
+        
+        for ws in connections:
+            try:
+                await ws.close(code=4003, reason="Account disabled")
+            except Exception:
+                pass
+        
+        # Cached token verifications must not let the user straight back in
+        from app.modules.auth.token_cache import token_cache
+        await token_cache.publish_invalidation(user_id)
     
     def get_online_count(self, channel_id: int) -> int:
         """Get number of unique online users in a channel"""
-        return len(self.channel_users.get(channel_id, set()))
+        return len(self.channel_users.get(channel_id, {}))
     
     async def broadcast_to_channel(self, channel_id: int, message: dict, exclude_websocket: WebSocket = None):
         """
-        Broadcast a message to all connections in a channel.
-        Uses parallel sending with asyncio.gather for performance.
+        Broadcast a message to all connections in a channel across all workers.
+        Local connections are served directly, other workers via ws:channel:{id}.
+        """
+        channel_id = int(channel_id)
+        await self._local_broadcast_to_channel(channel_id, message, exclude_websocket)
+        
+        if self._redis.supports_fanout:
+            await self._redis.publish(self._channel_topic(channel_id), {
+                "origin": self.worker_id,
+                "channel_id": channel_id,
+                "message": message
+            })
+    
+    async def _local_broadcast_to_channel(self, channel_id: int, message: dict, exclude_websocket: WebSocket = None):
+        """
+        Broadcast to LOCAL connections in a channel.
+        Serializes once and enqueues the frame on each connection's writer,
+        so a slow client never delays the broadcaster.
         """
         if channel_id not in self.active_connections:
             return
             
-        # Collect tasks for parallel execution
-        tasks = []
-        for ws, user_id in self.active_connections[channel_id]:
+        frame = encode_message(message)
+        key = coalesce_key(message)
+        mux_frame = mux_key = None
+        for ws in list(self.active_connections[channel_id]):
             if exclude_websocket and ws == exclude_websocket:
                 continue
-            tasks.append(self._safe_send(ws, message))
-        
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+            if ws in self._multiplexed:
+                # Multiplexed sockets need the channel tagged on every frame
+                if mux_frame is None:
+                    mux_message = {**message, "channel_id": channel_id, "scope": "channel"}
+                    mux_frame = encode_message(mux_message)
+                    mux_key = coalesce_key(mux_message)
+                self._enqueue(ws, mux_frame, mux_key)
+            else:
+                self._enqueue(ws, frame, key)
     
     async def broadcast_to_user(self, user_id, message: dict):
-        """Broadcast a message to all of a user's global notification connections"""
+        """Broadcast a message to all of a user's global notification connections on all workers"""
         try:
             uid_int = int(user_id)
         except (ValueError, TypeError):
             logger.error(f"Invalid user_id type for broadcast: {type(user_id)}")
             return
 
-        connections = self.user_connections.get(uid_int, [])
+        await self._local_broadcast_to_user(uid_int, message)
+        
+        if self._redis.supports_fanout:
+            await self._redis.publish(self._user_topic(uid_int), {
+                "origin": self.worker_id,
+                "user_id": uid_int,
+                "message": message
+            })
+    
+    async def broadcast_to_users(self, user_ids: Iterable[int], message: dict) -> None:
+        """
+        Send the same notification to many users on all workers.
+        The payload is serialized once, online filtering is a dict lookup per
+        user, and other workers receive the whole batch in a single publish.
+        """
+        ids = sorted({int(uid) for uid in user_ids})
+        if not ids:
+            return
+        
+        await self._local_broadcast_to_users(ids, message)
+        
+        if self._redis.supports_fanout:
+            await self._redis.publish(self.USERS_TOPIC, {
+                "origin": self.worker_id,
+                "user_ids": ids,
+                "message": message
+            })
+    
+    async def _local_broadcast_to_users(self, user_ids: Iterable[int], message: dict) -> None:
+        """Enqueue one pre-encoded frame on the LOCAL streams of the given users"""
+        frame = None
+        key = None
+        for user_id in user_ids:
+            connections = self.user_connections.get(int(user_id))
+            if not connections:
+                continue
+            if frame is None:
+                frame = encode_message(message)
+                key = coalesce_key(message)
+            for ws in list(connections):
+                self._enqueue(ws, frame, key)
+    
+    async def _local_broadcast_to_user(self, user_id: int, message: dict):
+        """Broadcast to a user's LOCAL notification connections"""
+        connections = self.user_connections.get(user_id, [])
         
         if connections:
-            tasks = [self._safe_send(ws, message) for ws in connections]
-            await asyncio.gather(*tasks, return_exceptions=True)
+            frame = encode_message(message)
+            key = coalesce_key(message)
+            for ws in list(connections):
+                self._enqueue(ws, frame, key)
         else:
             logger.debug(f"No active connections found for user {user_id}")
     
@@ -244,10 +585,10 @@ class WebSocketManager:
         Broadcast a message to ALL connected users across all workers.
         Uses Redis pub/sub for multi-worker support.
         """
-        if redis_manager.is_available:
+        if self._redis.is_available:
             # Publish to Redis for all workers to receive
             msg_with_meta = {**message, "_exclude_user_id": exclude_user_id}
-            await redis_manager.publish("ws:broadcast:all", msg_with_meta)
+            await self._redis.publish("ws:broadcast:all", msg_with_meta)
         else:
             # Direct local broadcast
             await self._local_broadcast_to_all_users(message, exclude_user_id)
@@ -255,7 +596,7 @@ class WebSocketManager:
     async def _local_broadcast_to_all_users(self, message: dict, exclude_user_id=None):
         """
         Broadcast to all LOCAL connections.
-        Uses parallel sending with asyncio.gather.
+        Enqueues one shared frame on every connection's writer.
         """
         exclude_uid = None
         if exclude_user_id is not None:
@@ -266,49 +607,37 @@ class WebSocketManager:
 
         logger.debug(f"Broadcast ALL: {message.get('type')} to {len(self.user_connections)} users")
         
-        tasks = []
+        frame = encode_message(message)
+        key = coalesce_key(message)
         for user_id, connections in list(self.user_connections.items()):
             if exclude_uid is not None and int(user_id) == exclude_uid:
                 continue
-            for ws in connections:
-                tasks.append(self._safe_send(ws, message))
-        
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
-    
-    async def _safe_send(self, websocket: WebSocket, message: dict):
-        """Safely send a message to a websocket, catching exceptions"""
-        try:
-            await websocket.send_json(message)
-        except Exception as e:
-            logger.debug(f"Error sending message: {e}")
+            for ws in list(connections):
+                self._enqueue(ws, frame, key)
     
     async def start_heartbeat(self):
         """Send periodic ping messages to keep connections alive"""
         while True:
             await asyncio.sleep(30)
-            ping_message = {"type": "ping"}
-            
-            # Collect all tasks for parallel execution
-            tasks = []
+            ping_key = ("ping", None, None)
             
             # Ping global connections
             for user_id, connections in list(self.user_connections.items()):
                 for ws in list(connections):
-                    tasks.append(self._safe_send(ws, ping_message))
+                    self._enqueue(ws, PING_FRAME, ping_key)
             
             # Ping channel connections
-            for channel_id, connections in list(self.active_connections.items()):
-                for ws, user_id in list(connections):
-                    tasks.append(self._safe_send(ws, ping_message))
-            
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
+            for ws in list(self._socket_index):
+                if ws not in self._multiplexed:
+                    self._enqueue(ws, PING_FRAME, ping_key)
     
     async def graceful_shutdown(self):
         """Close all connections gracefully on server shutdown"""
         logger.info("WebSocket manager: Initiating graceful shutdown...")
         
+        for ws in list(self._writers):
+            self._release_writer(ws)
+        
         tasks = []
         
         # Close global connections
@@ -317,8 +646,8 @@ class WebSocketManager:
                 tasks.append(self._safe_close(ws, 1001, "Server shutting down"))
         
         # Close channel connections
-        for channel_id, connections in list(self.active_connections.items()):
-            for ws, user_id in connections:
+        for ws in list(self._socket_index):
+            if ws not in self._multiplexed:
                 tasks.append(self._safe_close(ws, 1001, "Server shutting down"))
         
         if tasks:
@@ -9,7 +9,7 @@ from fastapi.staticfiles import StaticFiles
 import os
 import logging
 from app.core.config import get_settings
-from app.core.database import init_db, engine, get_db
+from app.core.database import init_db, engine, get_db, AsyncSessionLocal
 from app.core.events import event_bus
 from app.modules.auth.router import router as auth_router
 from app.modules.chat.router import router as chat_router
@@ -20,8 +20,6 @@ from app.modules.tasks.router import router as tasks_router
 from app.modules.email.router import router as email_router
 from app.modules.zsspd.router import router as zsspd_router
 import socket
-from zeroconf.asyncio import AsyncZeroconf
-from zeroconf import ServiceInfo
 
 settings = get_settings()
 logger = logging.getLogger("uvicorn.error")
@@ -56,13 +54,25 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     
     # ========== STARTUP ==========
     
-    # Initialize database
-    await init_db()
+    # Initialize database (fast mode skips it when the schema marker is current)
+    initialized = await init_db(fast=settings.fast_startup)
     app.state.engine = engine
 
-    # Seed database with default data
-    from scripts import seed_db
-    await seed_db.main()
+    # Seed database with default data (init_db already seeds in fast mode)
+    if not settings.fast_startup:
+        from scripts import seed_db
+        await seed_db.main()
+    elif not initialized:
+        logger.info("Fast startup: database already initialized")
+
+    # Warm the settings cache so hot paths never query system_settings
+    from app.core.config_service import ConfigService
+    async with AsyncSessionLocal() as db:
+        await ConfigService.load(db)
+    
+    # Replica lag monitor (no-op without DATABASE_REPLICA_URLS)
+    from app.core.database import read_router
+    read_router.start()
     
     from datetime import datetime
     app.state.start_time = datetime.utcnow()
@@ -70,10 +80,27 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     # Initialize Redis (optional, for scaling)
     from app.modules.chat.websocket import manager
     await manager.init_redis(settings.redis_url if settings.redis_url else None)
+    await ConfigService.subscribe_invalidations()
+    from app.modules.auth.token_cache import token_cache
+    await token_cache.subscribe()
     
     # Start WebSocket heartbeat
     import asyncio
     asyncio.create_task(manager.start_heartbeat())
+    # Start batched presence broadcasts and write-behind of last_seen
+    from app.core.last_seen import last_seen_buffer
+    manager.presence.start()
+    last_seen_buffer.start()
+    # Materialized admin dashboard statistics (event hooks + reconciliation job)
+    from app.modules.admin.stats import stats_collector
+    await stats_collector.subscribe()
+    stats_collector.start()
+    # Garbage collection of unreferenced upload blobs
+    from app.core.blobs import blob_store
+    blob_store.start()
+    # Background archive batch actions (resumes jobs left by a previous run)
+    from app.modules.archive.jobs import archive_jobs
+    archive_jobs.start()
 
     # Start SMTP Server in background thread
     from app.modules.email.smtp_server import SMTPServerManager
@@ -94,6 +121,8 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     logger.info(f"Server started: Database={db_type}, Redis={redis_status}")
     
     # Register mDNS service for auto-discovery
+    from zeroconf.asyncio import AsyncZeroconf
+    from zeroconf import ServiceInfo
     app.state.zeroconf = AsyncZeroconf()
     try:
         local_hostname = socket.gethostname()
@@ -134,15 +163,25 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     
     # Graceful WebSocket shutdown
     await manager.graceful_shutdown()
+    await manager.presence.stop()
+    await last_seen_buffer.stop()
+    await stats_collector.stop()
+    await blob_store.stop()
+    await archive_jobs.stop()
     
     # Stop SMTP server
     smtp_server.stop()
     
+    # Stop bcrypt threads
+    from app.core.security import password_pool
+    password_pool.shutdown()
+    
     # Close Redis connection
     from app.core.redis_manager import redis_manager
     await redis_manager.disconnect()
     
-    # Dispose database engine
+    # Dispose database engines
+    await read_router.stop()
     await engine.dispose()
     
     # Unregister mDNS service
@@ -182,6 +221,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the client resume downloads and revalidate cached files
+    expose_headers=["Accept-Ranges", "Content-Range", "ETag"],
 )
 
 
@@ -293,6 +334,8 @@ async def health(db: AsyncSession = Depends(get_db)) -> dict[str, Any]:
     Returns detailed status for monitoring systems.
     """
     from app.core.redis_manager import redis_manager
+    from app.core.last_seen import last_seen_buffer
+    from app.core.database import read_router
     
     health_status = {
         "status": "healthy",
@@ -304,7 +347,9 @@ async def health(db: AsyncSession = Depends(get_db)) -> dict[str, Any]:
         "redis": {
             "enabled": bool(settings.redis_url),
             "status": "connected" if redis_manager.is_available else "fallback"
-        }
+        },
+        "last_seen_buffer": last_seen_buffer.stats(),
+        "read_replicas": read_router.stats()
     }
     
     # Test database connection
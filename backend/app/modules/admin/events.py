@@ -0,0 +1,15 @@
+"""
+Domain Events for Admin Module
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class StatsInvalidated:
+    """
+    Event published after a bulk operation (channel, user or unit removal)
+    changed rows without per-row events. Dashboard statistics are
+    recomputed from the source tables shortly afterwards.
+    """
+    reason: str
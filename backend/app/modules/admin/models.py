@@ -1,5 +1,5 @@
-from datetime import datetime
-from sqlalchemy import String, Integer, ForeignKey, DateTime, Text
+from datetime import date, datetime
+from sqlalchemy import String, Integer, BigInteger, ForeignKey, Date, DateTime, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.database import Base
 
@@ -16,3 +16,41 @@ class AuditLog(Base):
 
     # Relationship
     user = relationship("User", backref="audit_actions")
+
+
+class StatCounter(Base):
+    """Running total for the admin dashboard (users, files, bytes, tasks per status...)"""
+    __tablename__ = "stat_counters"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+
+
+class DailyStat(Base):
+    """Per-day rollup of one metric (messages, new_users, new_tasks)"""
+    __tablename__ = "stat_daily"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    metric: Mapped[str] = mapped_column(String(32), primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+
+
+class UserMessageStat(Base):
+    """Messages written per user, for the top users chart"""
+    __tablename__ = "stat_user_messages"
+
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    message_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False, index=True)
+
+
+class StatReconcile(Base):
+    """
+    Cluster-wide lease of the statistics recount (single row, id=1).
+
+    A worker recounts only after moving `reconciled_at` forward with a
+    conditional UPDATE, in the same transaction as the recount itself.
+    """
+    __tablename__ = "stat_reconcile"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    reconciled_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.core.database import get_db
-from app.modules.auth.router import get_admin_user, get_current_user
+from app.core.database import get_db, get_read_db
+from app.modules.auth.router import get_admin_user, get_current_principal
 from app.modules.auth.schemas import UserResponse
 from app.modules.auth.models import User
 from app.modules.admin.service import AdminService, SystemSettingService
@@ -18,7 +18,7 @@ router = APIRouter(prefix="/admin", tags=["Admin"])
 
 @router.get("/stats/overview", response_model=OverviewStats)
 async def get_overview(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     _ = Depends(get_admin_user)
 ):
     """Get high-level dashboard stats"""
@@ -27,7 +27,7 @@ async def get_overview(
 @router.get("/stats/activity", response_model=List[ActivityStat])
 async def get_activity(
     days: int = 7,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     _ = Depends(get_admin_user)
 ):
     """Get activity charts data"""
@@ -35,14 +35,14 @@ async def get_activity(
 
 @router.get("/stats/storage", response_model=List[StorageStat])
 async def get_storage(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     _ = Depends(get_admin_user)
 ):
     """Get storage usage breakdown"""
     return await AdminService.get_storage_stats(db)
 @router.get("/active-sessions", response_model=List[UserResponse])
 async def get_active_sessions(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     _ = Depends(get_admin_user)
 ):
     """Get list of currently active users"""
@@ -50,7 +50,7 @@ async def get_active_sessions(
 
 @router.get("/stats/units", response_model=List[UnitStat])
 async def get_unit_stats(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     _ = Depends(get_admin_user)
 ):
     """Get unit distribution stats"""
@@ -58,7 +58,7 @@ async def get_unit_stats(
 
 @router.get("/stats/top-users", response_model=List[TopUserStat])
 async def get_top_users(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     _ = Depends(get_admin_user)
 ):
     """Get most active users"""
@@ -66,7 +66,7 @@ async def get_top_users(
 
 @router.get("/activity", response_model=List[ActivityLogEvent])
 async def get_recent_activity(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     _ = Depends(get_admin_user)
 ):
     """Get recent system events feed"""
@@ -75,7 +75,7 @@ async def get_recent_activity(
 @router.get("/logs", response_model=List[AuditLogResponse])
 async def get_audit_logs(
     limit: int = 50,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     _ = Depends(get_admin_user)
 ):
     """Get detailed system audit logs"""
@@ -91,7 +91,7 @@ async def get_system_health(
 
 @router.get("/stats/tasks/units", response_model=List[TaskUnitStat])
 async def get_task_unit_stats(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     _ = Depends(get_admin_user)
 ):
     """Get unit task distribution stats"""
@@ -99,7 +99,7 @@ async def get_task_unit_stats(
 
 @router.get("/tasks", response_model=List[TaskResponse])
 async def get_all_tasks(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     _ = Depends(get_admin_user)
 ):
     """Get all tasks for administration"""
@@ -118,7 +118,7 @@ async def get_system_settings(
 @router.get("/public-settings")
 async def get_public_settings(
     db: AsyncSession = Depends(get_db),
-    _ = Depends(get_current_user)
+    _ = Depends(get_current_principal)
 ):
     """Get public system settings for all users"""
     return await SystemSettingService.get_public_settings(db)
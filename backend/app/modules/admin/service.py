@@ -2,11 +2,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, text
 from sqlalchemy.orm import selectinload, defer
 from app.modules.auth.models import User, Unit
-from app.modules.chat.models import Message
 from app.modules.board.models import Document
-from app.modules.archive.models import ArchiveFile
 from app.modules.tasks.models import Task, TaskStatus
-from app.modules.admin.models import AuditLog
+from app.modules.admin.models import AuditLog, UserMessageStat
+from app.modules.admin.stats import stats_collector
 from app.core.models import SystemSetting
 from datetime import datetime, timedelta
 from app.core.websocket_manager import websocket_manager as manager
@@ -16,65 +15,19 @@ from app.core.config_service import ConfigService
 settings = get_settings()
 
 
-# Settings cache with TTL
-_settings_cache: dict = {}
-_cache_ttl_seconds = 60  # Cache for 60 seconds
-
-
 class SystemSettingService:
     @staticmethod
     async def get_value(db: AsyncSession, key: str, default: any = None) -> any:
-        """
-        Get type-casted value from system_settings with caching.
-        Uses in-memory cache with TTL to reduce DB queries.
-        """
-        # Check cache first
-        if key in _settings_cache:
-            value, cached_type, expires = _settings_cache[key]
-            if datetime.utcnow() < expires:
-                # Return cached value with proper type conversion
-                if cached_type == 'int':
-                    return int(value)
-                elif cached_type == 'bool':
-                    return value.lower() == 'true'
-                elif cached_type == 'json':
-                    import json
-                    return json.loads(value)
-                return value
-        
-        # Fetch from DB
-        setting = await db.scalar(select(SystemSetting).where(SystemSetting.key == key))
-        if not setting:
-            return default
-        
-        # Store in cache with expiry
-        _settings_cache[key] = (
-            setting.value,
-            setting.type,
-            datetime.utcnow() + timedelta(seconds=_cache_ttl_seconds)
-        )
-            
-        val = setting.value
-        if setting.type == 'int':
-            return int(val)
-        elif setting.type == 'bool':
-            return val.lower() == 'true'
-        elif setting.type == 'json':
-            import json
-            return json.loads(val)
-        return val
+        """Get type-casted value from the process-wide settings cache"""
+        return await ConfigService.get_typed(db, key, default)
     
     @staticmethod
     def invalidate_cache(key: str = None):
         """
         Invalidate settings cache.
-        If key is None, invalidate all cached settings.
+        The whole table is reloaded on next access, `key` is accepted for compatibility.
         """
-        global _settings_cache
-        if key:
-            _settings_cache.pop(key, None)
-        else:
-            _settings_cache = {}
+        ConfigService.invalidate()
 
     @staticmethod
     async def set_value(db: AsyncSession, key: str, value: any, user_id: int) -> SystemSetting:
@@ -106,6 +59,9 @@ class SystemSettingService:
         
         await db.commit()
         await db.refresh(setting)
+        
+        # Refresh this worker's cache and notify the others
+        await ConfigService.publish_update(setting.key, setting.value, setting.type)
         return setting
 
     @staticmethod
@@ -151,166 +107,75 @@ class AdminService:
 
     @staticmethod
     async def get_overview_stats(db: AsyncSession):
-        """Get high-level counts for the dashboard"""
-        
-        # Count Users
-        user_count = await db.scalar(select(func.count(User.id)))
+        """Get high-level counts for the dashboard (materialized counters, no table scans)"""
+        counters = await stats_collector.get_counters(db)
         
         # Count Online Users from real-time WebSocket manager
         online_count = len(manager.user_connections)
         
-        # Count Messages Today
+        # Messages Today from the daily rollup
         today = datetime.utcnow().date()
-        msg_count = await db.scalar(select(func.count(Message.id)).where(Message.created_at >= today))
-        
-        # Count Total Files (Archive + Documents)
-        archive_count = await db.scalar(select(func.count(ArchiveFile.id)))
-        doc_count = await db.scalar(select(func.count(Document.id)))
+        daily = await stats_collector.get_daily(db, today)
         
-        # Sum Total Size
-        archive_size = await db.scalar(select(func.sum(ArchiveFile.file_size))) or 0
-        doc_size = await db.scalar(select(func.sum(Document.file_size))) or 0
-        
-        # Count Tasks
-        tasks_total = await db.scalar(select(func.count(Task.id)))
-        tasks_completed = await db.scalar(select(func.count(Task.id)).where(Task.status == TaskStatus.COMPLETED))
-        tasks_in_progress = await db.scalar(select(func.count(Task.id)).where(Task.status == TaskStatus.IN_PROGRESS))
-        tasks_on_review = await db.scalar(select(func.count(Task.id)).where(Task.status == TaskStatus.ON_REVIEW))
-        tasks_overdue = await db.scalar(select(func.count(Task.id)).where(Task.status == TaskStatus.OVERDUE))
+        tasks_by_status = {
+            status: counters[f"tasks:{status.value}"] for status in TaskStatus
+        }
         
         return {
-            "total_users": user_count,
+            "total_users": counters["users"],
             "online_users": online_count,
-            "messages_today": msg_count,
-            "total_files": archive_count + doc_count,
-            "total_storage_size": archive_size + doc_size,
-            "tasks_total": tasks_total,
-            "tasks_completed": tasks_completed,
-            "tasks_in_progress": tasks_in_progress,
-            "tasks_on_review": tasks_on_review,
-            "tasks_overdue": tasks_overdue
+            "messages_today": daily[(today, "messages")],
+            "total_files": counters["archive_files"] + counters["documents"],
+            "total_storage_size": counters["archive_files_bytes"] + counters["documents_bytes"],
+            "tasks_total": sum(tasks_by_status.values()),
+            "tasks_completed": tasks_by_status[TaskStatus.COMPLETED],
+            "tasks_in_progress": tasks_by_status[TaskStatus.IN_PROGRESS],
+            "tasks_on_review": tasks_by_status[TaskStatus.ON_REVIEW],
+            "tasks_overdue": tasks_by_status[TaskStatus.OVERDUE]
         }
 
     @staticmethod
     async def get_activity_stats(db: AsyncSession, days: int = 7):
-        """
-        Get daily activity for charts using SQL aggregation.
-        Uses GROUP BY for efficient aggregation instead of loading all records.
-        """
-        from app.core.config import get_settings
-        
-        settings = get_settings()
-        start_date = datetime.utcnow() - timedelta(days=days)
+        """Get daily activity for charts from the daily rollup table (one row per day and metric)"""
+        today = datetime.utcnow().date()
+        start_date = today - timedelta(days=days - 1)
+        daily = await stats_collector.get_daily(db, start_date)
         
-        # Initialize stats dict with all dates
-        stats = {}
+        stats = []
         for i in range(days):
-            date = (datetime.utcnow() - timedelta(days=days-1-i)).date().isoformat()
-            stats[date] = {"date": date, "messages": 0, "new_users": 0, "new_tasks": 0}
-        
-        # SQL aggregation differs between SQLite and MySQL
-        if settings.is_sqlite:
-            # SQLite date() function
-            date_func = func.date(Message.created_at)
-            user_date_func = func.date(User.created_at)
-            task_date_func = func.date(Task.created_at)
-        else:
-            # MySQL DATE() function
-            date_func = func.date(Message.created_at)
-            user_date_func = func.date(User.created_at)
-            task_date_func = func.date(Task.created_at)
-        
-        # Messages - SQL GROUP BY
-        msg_stmt = (
-            select(date_func.label('date'), func.count(Message.id).label('count'))
-            .where(Message.created_at >= start_date)
-            .group_by(date_func)
-        )
-        msg_result = await db.execute(msg_stmt)
-        for row in msg_result.all():
-            date_str = str(row.date)
-            if date_str in stats:
-                stats[date_str]["messages"] = row.count
-        
-        # Users - SQL GROUP BY
-        user_stmt = (
-            select(user_date_func.label('date'), func.count(User.id).label('count'))
-            .where(User.created_at >= start_date)
-            .group_by(user_date_func)
-        )
-        user_result = await db.execute(user_stmt)
-        for row in user_result.all():
-            date_str = str(row.date)
-            if date_str in stats:
-                stats[date_str]["new_users"] = row.count
-        
-        # Tasks - SQL GROUP BY
-        task_stmt = (
-            select(task_date_func.label('date'), func.count(Task.id).label('count'))
-            .where(Task.created_at >= start_date)
-            .group_by(task_date_func)
-        )
-        task_result = await db.execute(task_stmt)
-        for row in task_result.all():
-            date_str = str(row.date)
-            if date_str in stats:
-                stats[date_str]["new_tasks"] = row.count
-                
-        return list(stats.values())
+            day = start_date + timedelta(days=i)
+            stats.append({
+                "date": day.isoformat(),
+                "messages": daily[(day, "messages")],
+                "new_users": daily[(day, "new_users")],
+                "new_tasks": daily[(day, "new_tasks")]
+            })
+        return stats
 
     @staticmethod
     async def get_storage_stats(db: AsyncSession):
-        """Get actual storage usage by file type"""
+        """Get storage usage by file type from the per-category counters"""
+        counters = await stats_collector.get_counters(db)
         
-        # Fetch all files to categorize in Python (safer for cross-DB compatibility)
-        archive_files = (await db.execute(select(ArchiveFile.file_size, ArchiveFile.mime_type, ArchiveFile.file_path))).all()
-        board_docs = (await db.execute(select(Document.file_size, Document.file_path))).all()
-        
-        categories = {
-            "Images": {"value": 0, "count": 0, "color": "#8884d8"},
-            "Videos": {"value": 0, "count": 0, "color": "#82ca9d"},
-            "Documents": {"value": 0, "count": 0, "color": "#ffc658"},
-            "Audio": {"value": 0, "count": 0, "color": "#ff8042"},
-            "Archives": {"value": 0, "count": 0, "color": "#0088fe"},
-            "Other": {"value": 0, "count": 0, "color": "#00c49f"},
+        colors = {
+            "Images": "#8884d8",
+            "Videos": "#82ca9d",
+            "Documents": "#ffc658",
+            "Audio": "#ff8042",
+            "Archives": "#0088fe",
+            "Other": "#00c49f",
         }
 
-        def categorize(mime: str, path: str):
-            if mime:
-                if mime.startswith('image/'): return "Images"
-                if mime.startswith('video/'): return "Videos"
-                if mime.startswith('audio/'): return "Audio"
-                if mime in ('application/pdf', 'application/msword', 'text/plain') or \
-                   mime.startswith('application/vnd.openxmlformats-officedocument'): return "Documents"
-                if mime in ('application/zip', 'application/x-rar-compressed', 'application/x-7z-compressed', 'application/x-tar'): return "Archives"
-            
-            # Fallback to extension
-            ext = path.lower().split('.')[-1] if '.' in path else ''
-            if ext in ('jpg', 'jpeg', 'png', 'gif', 'webp', 'svg'): return "Images"
-            if ext in ('mp4', 'mkv', 'avi', 'mov', 'webm'): return "Videos"
-            if ext in ('mp3', 'wav', 'ogg', 'flac'): return "Audio"
-            if ext in ('pdf', 'doc', 'docx', 'txt', 'rtf', 'odt', 'xls', 'xlsx', 'ppt', 'pptx'): return "Documents"
-            if ext in ('zip', 'rar', '7z', 'tar', 'gz'): return "Archives"
-            
-            return "Other"
-
-        # Process ArchiveFiles
-        for size, mime, path in archive_files:
-            cat = categorize(mime, path)
-            categories[cat]["value"] += size or 0
-            categories[cat]["count"] += 1
-
-        # Process Board Documents
-        for size, path in board_docs:
-            cat = categorize(None, path)
-            categories[cat]["value"] += size or 0
-            categories[cat]["count"] += 1
-
         # Format for response
         return [
-            {"name": name, "value": data["value"], "count": data["count"], "color": data["color"]}
-            for name, data in categories.items()
-            if data["count"] > 0 or name == "Other"
+            {
+                "name": name,
+                "value": counters[f"storage:{name}:bytes"],
+                "count": counters[f"storage:{name}:count"],
+                "color": color
+            }
+            for name, color in colors.items()
+            if counters[f"storage:{name}:count"] > 0 or name == "Other"
         ]
 
     @staticmethod
@@ -354,13 +219,13 @@ class AdminService:
 
     @staticmethod
     async def get_top_active_users(db: AsyncSession, limit: int = 5):
-        """Get users with the most messages"""
+        """Get users with the most messages (indexed per-user counters)"""
         stmt = (
-            select(User, func.count(Message.id).label("message_count"))
-            .join(Message, Message.user_id == User.id)
+            select(User, UserMessageStat.message_count)
+            .join(UserMessageStat, UserMessageStat.user_id == User.id)
+            .where(UserMessageStat.message_count > 0)
             .options(selectinload(User.unit))
-            .group_by(User.id)
-            .order_by(text("message_count DESC"))
+            .order_by(UserMessageStat.message_count.desc())
             .limit(limit)
         )
         result = await db.execute(stmt)
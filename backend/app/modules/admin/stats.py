@@ -0,0 +1,455 @@
+"""
+Materialized statistics for the admin dashboard.
+
+Instead of scanning users, messages, files and tasks on every dashboard
+load, running totals live in three small tables:
+- stat_counters: users, documents/archive files and their bytes, tasks per
+  status, files and bytes per storage category
+- stat_daily: messages, new users and new tasks per day
+- stat_user_messages: messages per user (top users chart)
+
+Create/delete events from the other modules are folded into in-memory
+deltas that are written as `value = value + delta` every
+STATS_FLUSH_INTERVAL seconds, so a chat message costs no extra write
+transaction. Bulk operations without per-row events publish
+StatsInvalidated, and every STATS_RECONCILE_INTERVAL seconds (and once at
+startup) all tables are recomputed from the source data with SQL
+aggregates, which also repairs any drift.
+
+Only one worker recounts per interval: it first moves the `stat_reconcile`
+lease forward with a conditional UPDATE (as archive jobs are claimed) and
+commits, so other workers skip the recount. The aggregates then run in a
+separate read-only session, and only replacing the stat rows takes a
+(short) write transaction, so chat posts and uploads are not held up by
+the scan. Deltas this process buffered before the scan are dropped when
+the rows are replaced, since the scan already includes their rows; deltas
+recorded while it runs are kept for the next flush. Changes other workers
+write during the scan (at most one flush interval's worth plus the scan
+time) may be counted twice or lost until the next recount.
+
+Reads overlay the deltas of this process that are not written yet.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.events import EventBus, event_bus
+from app.modules.admin.events import StatsInvalidated
+from app.modules.admin.models import DailyStat, StatCounter, StatReconcile, UserMessageStat
+from app.modules.archive.events import ArchiveFileCreated, ArchiveFileDeleted
+from app.modules.archive.models import ArchiveFile
+from app.modules.auth.events import UserCreated, UserDeleted
+from app.modules.auth.models import User
+from app.modules.board.events import DocumentCreated, DocumentDeleted
+from app.modules.board.models import Document
+from app.modules.chat.events import MessageCreated, MessageDeleted
+from app.modules.chat.models import Message
+from app.modules.tasks.events import TaskCreated, TaskDeleted, TaskStatusChanged
+from app.modules.tasks.models import Task
+
+logger = logging.getLogger(__name__)
+
+# Requested reconciliations run at most this often (seconds)
+MIN_RECONCILE_GAP = 60
+
+
+def storage_category(mime: Optional[str], path: str) -> str:
+    """Dashboard storage category of a file, by MIME type or extension"""
+    if mime:
+        if mime.startswith('image/'): return "Images"
+        if mime.startswith('video/'): return "Videos"
+        if mime.startswith('audio/'): return "Audio"
+        if mime in ('application/pdf', 'application/msword', 'text/plain') or \
+           mime.startswith('application/vnd.openxmlformats-officedocument'): return "Documents"
+        if mime in ('application/zip', 'application/x-rar-compressed', 'application/x-7z-compressed', 'application/x-tar'): return "Archives"
+
+    # Fallback to extension
+    ext = path.lower().split('.')[-1] if path and '.' in path else ''
+    if ext in ('jpg', 'jpeg', 'png', 'gif', 'webp', 'svg'): return "Images"
+    if ext in ('mp4', 'mkv', 'avi', 'mov', 'webm'): return "Videos"
+    if ext in ('mp3', 'wav', 'ogg', 'flac'): return "Audio"
+    if ext in ('pdf', 'doc', 'docx', 'txt', 'rtf', 'odt', 'xls', 'xlsx', 'ppt', 'pptx'): return "Documents"
+    if ext in ('zip', 'rar', '7z', 'tar', 'gz'): return "Archives"
+
+    return "Other"
+
+
+def storage_category_sql(mime, path):
+    """SQL expression of storage_category(), for GROUP BY in the recount (mime may be None)"""
+    path = func.lower(path)
+
+    def ext_in(*exts):
+        return or_(*(path.like(f"%.{ext}") for ext in exts))
+
+    whens = []
+    if mime is not None:
+        whens += [
+            (mime.like('image/%'), "Images"),
+            (mime.like('video/%'), "Videos"),
+            (mime.like('audio/%'), "Audio"),
+            (or_(
+                mime.in_(('application/pdf', 'application/msword', 'text/plain')),
+                mime.like('application/vnd.openxmlformats-officedocument%')
+            ), "Documents"),
+            (mime.in_(('application/zip', 'application/x-rar-compressed', 'application/x-7z-compressed', 'application/x-tar')), "Archives"),
+        ]
+    # Fallback to extension
+    whens += [
+        (ext_in('jpg', 'jpeg', 'png', 'gif', 'webp', 'svg'), "Images"),
+        (ext_in('mp4', 'mkv', 'avi', 'mov', 'webm'), "Videos"),
+        (ext_in('mp3', 'wav', 'ogg', 'flac'), "Audio"),
+        (ext_in('pdf', 'doc', 'docx', 'txt', 'rtf', 'odt', 'xls', 'xlsx', 'ppt', 'pptx'), "Documents"),
+        (ext_in('zip', 'rar', '7z', 'tar', 'gz'), "Archives"),
+    ]
+    return case(*whens, else_="Other")
+
+
+def _day(iso_timestamp: Optional[str]) -> date:
+    if iso_timestamp:
+        return datetime.fromisoformat(iso_timestamp).date()
+    return datetime.utcnow().date()
+
+
+def _status(value) -> str:
+    return getattr(value, "value", value)
+
+
+class StatsCollector:
+    """Buffers statistic deltas from domain events and maintains the stat tables"""
+
+    def __init__(
+        self,
+        flush_interval: Optional[float] = None,
+        reconcile_interval: Optional[float] = None,
+        session_factory: Optional[Callable] = None
+    ) -> None:
+        settings = get_settings()
+        self.flush_interval = flush_interval or settings.stats_flush_interval_seconds
+        self.reconcile_interval = reconcile_interval or settings.stats_reconcile_interval_seconds
+        self._session_factory = session_factory
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._daily: Dict[Tuple[date, str], int] = defaultdict(int)
+        self._user_messages: Dict[int, int] = defaultdict(int)
+        self._reconcile_requested = False
+        self._last_reconcile: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _get_session_factory(self) -> Callable:
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            return AsyncSessionLocal
+        return self._session_factory
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    # ---- deltas ----
+
+    @staticmethod
+    def _add_file(
+        counters: Dict[str, int], prefix: str, size: Optional[int], mime: Optional[str], path: str, sign: int = 1
+    ) -> None:
+        category = storage_category(mime, path)
+        counters[prefix] += sign
+        counters[f"{prefix}_bytes"] += sign * (size or 0)
+        counters[f"storage:{category}:count"] += sign
+        counters[f"storage:{category}:bytes"] += sign * (size or 0)
+
+    def _file(self, prefix: str, size: Optional[int], mime: Optional[str], path: str, sign: int) -> None:
+        self._add_file(self._counters, prefix, size, mime, path, sign)
+
+    async def on_message_created(self, event: MessageCreated) -> None:
+        self._daily[(_day(event.created_at), "messages")] += 1
+        self._user_messages[event.user_id] += 1
+
+    async def on_message_deleted(self, event: MessageDeleted) -> None:
+        self._daily[(_day(event.created_at), "messages")] -= 1
+        self._user_messages[event.user_id] -= 1
+        if event.reply_count:
+            # Replies went with the message
+            self.request_reconcile()
+
+    async def on_user_created(self, event: UserCreated) -> None:
+        self._counters["users"] += 1
+        self._daily[(_day(None), "new_users")] += 1
+
+    async def on_user_deleted(self, event: UserDeleted) -> None:
+        self._counters["users"] -= 1
+        if event.created_at:
+            self._daily[(_day(event.created_at), "new_users")] -= 1
+        # Messages, documents and channels of the user were removed in bulk
+        self.request_reconcile()
+
+    async def on_document_created(self, event: DocumentCreated) -> None:
+        self._file("documents", event.file_size, None, event.file_path, 1)
+
+    async def on_document_deleted(self, event: DocumentDeleted) -> None:
+        self._file("documents", event.file_size, None, event.file_path, -1)
+
+    async def on_archive_file_created(self, event: ArchiveFileCreated) -> None:
+        self._file("archive_files", event.file_size, event.mime_type, event.file_path, 1)
+
+    async def on_archive_file_deleted(self, event: ArchiveFileDeleted) -> None:
+        self._file("archive_files", event.file_size, event.mime_type, event.file_path, -1)
+
+    async def on_task_created(self, event: TaskCreated) -> None:
+        self._counters[f"tasks:{_status(event.status)}"] += 1
+        self._daily[(_day(event.created_at), "new_tasks")] += 1
+
+    async def on_task_status_changed(self, event: TaskStatusChanged) -> None:
+        self._counters[f"tasks:{_status(event.old_status)}"] -= 1
+        self._counters[f"tasks:{_status(event.new_status)}"] += 1
+
+    async def on_task_deleted(self, event: TaskDeleted) -> None:
+        self._counters[f"tasks:{_status(event.status)}"] -= 1
+        self._daily[(_day(event.created_at), "new_tasks")] -= 1
+
+    async def on_stats_invalidated(self, event: StatsInvalidated) -> None:
+        logger.debug(f"Statistics invalidated: {event.reason}")
+        self.request_reconcile()
+
+    def request_reconcile(self) -> None:
+        self._reconcile_requested = True
+
+    async def subscribe(self, bus: EventBus = event_bus) -> None:
+        """Register the event handlers (called from the application lifespan)"""
+        for event_type, handler in (
+            (MessageCreated, self.on_message_created),
+            (MessageDeleted, self.on_message_deleted),
+            (UserCreated, self.on_user_created),
+            (UserDeleted, self.on_user_deleted),
+            (DocumentCreated, self.on_document_created),
+            (DocumentDeleted, self.on_document_deleted),
+            (ArchiveFileCreated, self.on_archive_file_created),
+            (ArchiveFileDeleted, self.on_archive_file_deleted),
+            (TaskCreated, self.on_task_created),
+            (TaskStatusChanged, self.on_task_status_changed),
+            (TaskDeleted, self.on_task_deleted),
+            (StatsInvalidated, self.on_stats_invalidated),
+        ):
+            await bus.subscribe(event_type, handler)
+
+    # ---- writes ----
+
+    @staticmethod
+    async def _add(db: AsyncSession, model, key: dict, column, delta: int) -> None:
+        conditions = [getattr(model, name) == value for name, value in key.items()]
+        result = await db.execute(
+            update(model).where(*conditions).values({column.key: column + delta})
+        )
+        if result.rowcount == 0:
+            await db.execute(insert(model).values(**key, **{column.key: delta}))
+
+    async def flush(self) -> int:
+        """Write buffered deltas in one transaction; returns the number of rows touched"""
+        async with self._get_lock():
+            counters = {k: v for k, v in self._counters.items() if v}
+            daily = {k: v for k, v in self._daily.items() if v}
+            user_messages = {k: v for k, v in self._user_messages.items() if v}
+            self._counters, self._daily, self._user_messages = defaultdict(int), defaultdict(int), defaultdict(int)
+            if not (counters or daily or user_messages):
+                return 0
+
+            try:
+                async with self._get_session_factory()() as db:
+                    for key, delta in counters.items():
+                        await self._add(db, StatCounter, {"key": key}, StatCounter.value, delta)
+                    for (day, metric), delta in daily.items():
+                        await self._add(db, DailyStat, {"day": day, "metric": metric}, DailyStat.value, delta)
+                    for user_id, delta in user_messages.items():
+                        await self._add(
+                            db, UserMessageStat, {"user_id": user_id}, UserMessageStat.message_count, delta
+                        )
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"Failed to write dashboard statistics: {e}")
+                # Keep the deltas for the next flush
+                for key, delta in counters.items():
+                    self._counters[key] += delta
+                for key, delta in daily.items():
+                    self._daily[key] += delta
+                for key, delta in user_messages.items():
+                    self._user_messages[key] += delta
+                return 0
+            return len(counters) + len(daily) + len(user_messages)
+
+    async def _claim_reconcile(self, min_age: float) -> bool:
+        """Take the recount lease if nobody recounted in the last `min_age` seconds"""
+        now = datetime.utcnow()
+        async with self._get_session_factory()() as db:
+            result = await db.execute(
+                update(StatReconcile)
+                .where(StatReconcile.id == 1, StatReconcile.reconciled_at <= now - timedelta(seconds=min_age))
+                .values(reconciled_at=now)
+            )
+            if not result.rowcount:
+                if await db.scalar(select(StatReconcile.id).where(StatReconcile.id == 1)) is not None:
+                    await db.rollback()
+                    return False
+                try:
+                    await db.execute(insert(StatReconcile).values(id=1, reconciled_at=now))
+                except IntegrityError:
+                    # Another worker created the lease first
+                    await db.rollback()
+                    return False
+            await db.commit()
+        return True
+
+    @staticmethod
+    async def _count_files(db: AsyncSession, counters: Dict[str, int], prefix: str, size, mime, path) -> None:
+        category = storage_category_sql(mime, path)
+        rows = await db.execute(
+            select(category, func.count(), func.coalesce(func.sum(size), 0)).group_by(category)
+        )
+        for name, count, total in rows.all():
+            counters[prefix] += count
+            counters[f"{prefix}_bytes"] += total
+            counters[f"storage:{name}:count"] += count
+            counters[f"storage:{name}:bytes"] += total
+
+    async def reconcile(self, min_age: float = 0) -> bool:
+        """
+        Recompute every stat table from the source tables, unless another
+        worker did so in the last `min_age` seconds (then only flush).
+        Returns True if this call recounted.
+        """
+        async with self._get_lock():
+            self._reconcile_requested = False
+            self._last_reconcile = time.monotonic()
+            claimed = await self._claim_reconcile(min_age)
+            if claimed:
+                # Rows behind the buffered deltas are committed, so the scan includes them
+                pending = self._counters, self._daily, self._user_messages
+                self._counters, self._daily, self._user_messages = defaultdict(int), defaultdict(int), defaultdict(int)
+                try:
+                    async with self._get_session_factory()() as db:
+                        counters, daily, user_messages = await self._recount(db)
+                    async with self._get_session_factory()() as db:
+                        await self._replace(db, counters, daily, user_messages)
+                        await db.commit()
+                except Exception:
+                    # Keep the dropped deltas for the next flush
+                    for buffered, dropped in zip((self._counters, self._daily, self._user_messages), pending):
+                        for key, delta in dropped.items():
+                            buffered[key] += delta
+                    raise
+        if not claimed:
+            await self.flush()
+            return False
+        logger.info("Dashboard statistics reconciled")
+        return True
+
+    async def _recount(self, db: AsyncSession) -> Tuple[Dict[str, int], List[dict], List[dict]]:
+        """Aggregate the source tables (read-only)"""
+        counters: Dict[str, int] = defaultdict(int)
+        counters["users"] = await db.scalar(select(func.count(User.id))) or 0
+        for status, count in (await db.execute(select(Task.status, func.count(Task.id)).group_by(Task.status))).all():
+            counters[f"tasks:{_status(status)}"] = count
+        await self._count_files(db, counters, "documents", Document.file_size, None, Document.file_path)
+        await self._count_files(
+            db, counters, "archive_files", ArchiveFile.file_size, ArchiveFile.mime_type, ArchiveFile.file_path
+        )
+
+        daily: List[dict] = []
+        for model, metric in ((Message, "messages"), (User, "new_users"), (Task, "new_tasks")):
+            day_expr = func.date(model.created_at)
+            rows = await db.execute(select(day_expr, func.count(model.id)).group_by(day_expr))
+            for day, count in rows.all():
+                if day is not None:
+                    day = day if isinstance(day, date) else date.fromisoformat(str(day))
+                    daily.append({"day": day, "metric": metric, "value": count})
+
+        per_user = await db.execute(
+            select(Message.user_id, func.count(Message.id)).group_by(Message.user_id)
+        )
+        user_messages = [
+            {"user_id": user_id, "message_count": count}
+            for user_id, count in per_user.all() if user_id is not None
+        ]
+        return counters, daily, user_messages
+
+    @staticmethod
+    async def _replace(db: AsyncSession, counters: Dict[str, int], daily: List[dict], user_messages: List[dict]) -> None:
+        """Swap the stat tables' contents for a recount"""
+        await db.execute(delete(StatCounter))
+        await db.execute(delete(DailyStat))
+        await db.execute(delete(UserMessageStat))
+        if counters:
+            await db.execute(insert(StatCounter), [{"key": k, "value": v} for k, v in counters.items()])
+        if daily:
+            await db.execute(insert(DailyStat), daily)
+        if user_messages:
+            await db.execute(insert(UserMessageStat), user_messages)
+
+    # ---- reads ----
+
+    async def get_counters(self, db: AsyncSession) -> Dict[str, int]:
+        """All running totals, including deltas not yet written"""
+        counters: Dict[str, int] = defaultdict(int)
+        for key, value in (await db.execute(select(StatCounter.key, StatCounter.value))).all():
+            counters[key] = value
+        for key, delta in self._counters.items():
+            counters[key] += delta
+        return counters
+
+    async def get_daily(self, db: AsyncSession, start: date) -> Dict[Tuple[date, str], int]:
+        """Daily rollups from `start` on, including deltas not yet written"""
+        values: Dict[Tuple[date, str], int] = defaultdict(int)
+        rows = await db.execute(select(DailyStat.day, DailyStat.metric, DailyStat.value).where(DailyStat.day >= start))
+        for day, metric, value in rows.all():
+            values[(day, metric)] = value
+        for (day, metric), delta in self._daily.items():
+            if day >= start:
+                values[(day, metric)] += delta
+        return values
+
+    # ---- background job ----
+
+    async def run(self) -> None:
+        """Flush loop with periodic reconciliation, started from the application lifespan"""
+        while True:
+            now = time.monotonic()
+            since_last = now - self._last_reconcile if self._last_reconcile is not None else None
+            try:
+                requested = self._reconcile_requested
+                if since_last is None or since_last >= self.reconcile_interval or (
+                    requested and since_last >= MIN_RECONCILE_GAP
+                ):
+                    # A requested recount may follow the last one after the minimum gap
+                    min_age = MIN_RECONCILE_GAP if requested else self.reconcile_interval
+                    if not await self.reconcile(min_age) and requested:
+                        # Another worker recounted just before the request; retry after the gap
+                        self.request_reconcile()
+                else:
+                    await self.flush()
+            except Exception as e:
+                logger.error(f"Dashboard statistics job failed: {e}")
+                # Retry the reconciliation after the minimum gap
+                self.request_reconcile()
+            await asyncio.sleep(self.flush_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the loop and write whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+# Global instance
+stats_collector = StatsCollector()
@@ -0,0 +1,28 @@
+"""
+Domain Events for Archive Module
+
+Events published when archive files are added or removed,
+enabling cross-module communication without direct dependencies.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ArchiveFileCreated:
+    """Event published after a file was uploaded or copied into the archive"""
+    file_id: int
+    unit_id: int
+    file_size: int | None
+    mime_type: str | None
+    file_path: str
+
+
+@dataclass(frozen=True)
+class ArchiveFileDeleted:
+    """Event published after a file was removed from the archive"""
+    file_id: int
+    unit_id: int
+    file_size: int | None
+    mime_type: str | None
+    file_path: str
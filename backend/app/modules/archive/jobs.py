@@ -0,0 +1,235 @@
+"""
+Background jobs for archive batch actions.
+
+Moving or copying many items (or copying folders, which may hold whole
+subtrees) is queued as an ArchiveJob row instead of running inside the
+request. The runner works through a job in chunks of CHUNK_SIZE items;
+each chunk commits together with the job's `done` counter, so a job
+interrupted by a crash resumes at the first uncommitted chunk and no item
+is copied twice. After every chunk the owner receives an "archive_job"
+message on the user WebSocket.
+
+Jobs are claimed with a conditional UPDATE, so with several workers each
+job runs once. A running job not updated for ARCHIVE_JOB_LEASE seconds
+belonged to a worker that died and is claimed again. Every claim writes a
+fresh `claim_token`; a chunk only runs after a conditional UPDATE on that
+token, so a worker whose lease was taken over (e.g. by a chunk copying a
+large subtree for longer than the lease) stops before its next chunk
+instead of repeating the new owner's work.
+
+Before each chunk the target folder is checked again: a job whose target
+was deleted (or moved to another unit) meanwhile fails instead of moving
+items under a folder that no longer exists.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.modules.archive.models import ArchiveFolder, ArchiveJob
+from app.modules.archive.schemas import ArchiveJobResponse
+from app.modules.archive.service import ArchiveService
+
+logger = logging.getLogger(__name__)
+
+# Items committed per transaction
+CHUNK_SIZE = 50
+
+# Seconds between checks for jobs queued by other workers or left by dead ones
+POLL_INTERVAL = 30
+
+
+class ArchiveJobError(Exception):
+    """A job can no longer be applied (reported to the owner as the job error)"""
+
+
+class ArchiveJobRunner:
+    """Runs queued archive batch actions one at a time"""
+
+    def __init__(self, lease: Optional[float] = None, session_factory: Optional[Callable] = None) -> None:
+        self.lease = lease or get_settings().archive_job_lease_seconds
+        self._session_factory = session_factory
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # job id -> claim token of jobs claimed by this runner
+        self._claims: Dict[int, str] = {}
+
+    def _get_session_factory(self) -> Callable:
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            return AsyncSessionLocal
+        return self._session_factory
+
+    def _get_wake(self) -> asyncio.Event:
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        return self._wake
+
+    async def submit(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        action: str,
+        item_ids: List[int],
+        item_types: List[str],
+        target_folder_id: Optional[int],
+        target_unit_id: int,
+        is_private: bool
+    ) -> ArchiveJob:
+        """Queue a batch action; the caller has checked permissions"""
+        job = ArchiveJob(
+            user_id=user_id,
+            action=action,
+            items=[['file' if item_type == 'file' else 'folder', item_id] for item_id, item_type in zip(item_ids, item_types)],
+            target_folder_id=target_folder_id,
+            target_unit_id=target_unit_id,
+            is_private=is_private
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        self._get_wake().set()
+        return job
+
+    def _claimable(self):
+        stale = datetime.utcnow() - timedelta(seconds=self.lease)
+        return or_(
+            ArchiveJob.status == "queued",
+            and_(ArchiveJob.status == "running", ArchiveJob.updated_at < stale)
+        )
+
+    async def claim(self) -> Optional[int]:
+        """Take the oldest job nobody is working on; returns its id"""
+        async with self._get_session_factory()() as db:
+            candidates = (await db.execute(
+                select(ArchiveJob.id).where(self._claimable()).order_by(ArchiveJob.id).limit(10)
+            )).scalars().all()
+            for job_id in candidates:
+                # Another worker may have claimed it since the select
+                token = uuid.uuid4().hex
+                result = await db.execute(
+                    update(ArchiveJob)
+                    .where(ArchiveJob.id == job_id, self._claimable())
+                    .values(status="running", claim_token=token, updated_at=datetime.utcnow())
+                )
+                await db.commit()
+                if result.rowcount:
+                    self._claims[job_id] = token
+                    return job_id
+        return None
+
+    async def _renew(self, db: AsyncSession, job_id: int, token: str, **values) -> bool:
+        """
+        Update the job if this runner still holds its claim. The row stays
+        locked until the caller commits, so the claim cannot be taken over
+        in between. Returns False if another worker has claimed the job.
+        """
+        result = await db.execute(
+            update(ArchiveJob)
+            .where(ArchiveJob.id == job_id, ArchiveJob.claim_token == token)
+            .values(updated_at=datetime.utcnow(), **values)
+        )
+        return bool(result.rowcount)
+
+    async def process(self, job_id: int) -> None:
+        """Run a job claimed by this runner from its first uncommitted item"""
+        token = self._claims.pop(job_id, None)
+        if token is None:
+            return
+        async with self._get_session_factory()() as db:
+            job = await db.get(ArchiveJob, job_id)
+            if job is None:
+                return
+            await self._notify(job)
+            while job.done < job.total:
+                chunk = job.items[job.done:job.done + CHUNK_SIZE]
+                try:
+                    # Committed by the batch action together with its items
+                    if not await self._renew(db, job_id, token, done=job.done + len(chunk)):
+                        await db.rollback()
+                        logger.warning(f"Archive job {job_id} was claimed by another worker, stopping")
+                        return
+                    await self._check_target(db, job)
+                    await self._apply(db, job, chunk)
+                except Exception as e:
+                    logger.error(f"Archive job {job_id} failed: {e}")
+                    await db.rollback()
+                    if await self._renew(db, job_id, token, status="failed", error=str(e)[:500]):
+                        await db.commit()
+                    await db.refresh(job)
+                    await self._notify(job)
+                    return
+                await db.refresh(job)
+                await self._notify(job)
+
+            if await self._renew(db, job_id, token, status="completed"):
+                await db.commit()
+            await db.refresh(job)
+            await self._notify(job)
+
+    @staticmethod
+    async def _check_target(db: AsyncSession, job: ArchiveJob) -> None:
+        """Fail the job if its target folder is gone or no longer in the target unit"""
+        if job.target_folder_id is None:
+            return
+        unit_id = await db.scalar(select(ArchiveFolder.unit_id).where(ArchiveFolder.id == job.target_folder_id))
+        if unit_id is None:
+            raise ArchiveJobError("Целевая папка удалена")
+        if unit_id != job.target_unit_id:
+            raise ArchiveJobError("Целевая папка перемещена в другое подразделение")
+
+    @staticmethod
+    async def _apply(db: AsyncSession, job: ArchiveJob, chunk: List[list]) -> None:
+        item_types = [item_type for item_type, _ in chunk]
+        item_ids = [item_id for _, item_id in chunk]
+        if job.action == "move":
+            await ArchiveService.move_items(
+                db, item_ids, item_types, job.target_folder_id, job.target_unit_id, job.is_private
+            )
+        else:
+            await ArchiveService.copy_items(
+                db, item_ids, item_types, job.target_folder_id, job.target_unit_id, job.is_private, job.user_id
+            )
+
+    @staticmethod
+    async def _notify(job: ArchiveJob) -> None:
+        from app.core.websocket_manager import websocket_manager
+
+        message = {"type": "archive_job", **ArchiveJobResponse.model_validate(job).model_dump(mode="json")}
+        try:
+            await websocket_manager.broadcast_to_user(job.user_id, message)
+        except Exception as e:
+            logger.warning(f"Failed to report progress of archive job {job.id}: {e}")
+
+    async def run(self) -> None:
+        """Job loop, started from the application lifespan"""
+        wake = self._get_wake()
+        while True:
+            try:
+                while (job_id := await self.claim()) is not None:
+                    await self.process(job_id)
+            except Exception as e:
+                logger.error(f"Archive job runner failed: {e}")
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            wake.clear()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# Global instance
+archive_jobs = ArchiveJobRunner()
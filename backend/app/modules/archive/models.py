@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import Optional
-from sqlalchemy import String, Integer, ForeignKey, DateTime
+from typing import List, Optional
+from sqlalchemy import String, Integer, ForeignKey, DateTime, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.database import Base
 
@@ -10,6 +10,8 @@ class ArchiveFolder(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     parent_id: Mapped[Optional[int]] = mapped_column(ForeignKey("archive_folders.id"), nullable=True, index=True)
+    # Materialized path: ids from the root down to this folder, e.g. "/1/5/9/"
+    path: Mapped[str] = mapped_column(String(1024), nullable=False, default="", index=True)
     unit_id: Mapped[int] = mapped_column(ForeignKey("units.id"), nullable=False, index=True)
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     is_private: Mapped[bool] = mapped_column(default=False, nullable=False, index=True)
@@ -30,6 +32,7 @@ class ArchiveFile(Base):
     file_path: Mapped[str] = mapped_column(String(512), nullable=False)
     file_size: Mapped[int] = mapped_column(Integer, nullable=True)
     mime_type: Mapped[str] = mapped_column(String(100), nullable=True)
+    blob_sha256: Mapped[Optional[str]] = mapped_column(ForeignKey("blobs.sha256"), nullable=True, index=True)  # Content in the blob store
     
     unit_id: Mapped[int] = mapped_column(ForeignKey("units.id"), nullable=False, index=True)
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
@@ -41,3 +44,25 @@ class ArchiveFile(Base):
     unit = relationship("Unit", backref="archive_files")
     owner = relationship("User", backref="archived_files")
     folder = relationship("ArchiveFolder", back_populates="files")
+
+class ArchiveJob(Base):
+    """Batch move/copy running in the background (see app.modules.archive.jobs)"""
+    __tablename__ = "archive_jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    action: Mapped[str] = mapped_column(String(16), nullable=False)  # move, copy
+    items: Mapped[List[list]] = mapped_column(JSON, nullable=False)  # [[item_type, item_id], ...]
+    target_folder_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    target_unit_id: Mapped[int] = mapped_column(ForeignKey("units.id"), nullable=False)
+    is_private: Mapped[bool] = mapped_column(default=False, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), default="queued", nullable=False, index=True)  # queued, running, completed, failed
+    done: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # Items committed so far
+    error: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    claim_token: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)  # Runner currently holding the job
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    @property
+    def total(self) -> int:
+        return len(self.items)
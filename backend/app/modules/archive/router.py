@@ -1,16 +1,20 @@
 import os
 import logging
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
-from app.core.database import get_db
-from app.modules.auth.router import get_current_user
+from app.core.database import get_db, get_read_db
+from app.modules.auth.router import get_current_principal
+from app.modules.auth.token_cache import AuthPrincipal
 from app.modules.auth.models import User
 from app.modules.archive.service import ArchiveService
+from app.modules.archive.jobs import archive_jobs
+from app.modules.archive.models import ArchiveJob
 from app.core.config_service import ConfigService
+from app.core.config import get_settings
 from app.modules.admin.service import SystemSettingService
 from app.modules.archive.schemas import (
     ArchiveFileResponse, 
@@ -19,9 +23,11 @@ from app.modules.archive.schemas import (
     ArchiveFolderUpdate,
     ArchiveFileUpdate,
     ArchiveContentResponse,
-    ArchiveBatchAction
+    ArchiveBatchAction,
+    ArchiveJobResponse
 )
 from app.core.file_security import secure_file_response, safe_file_operation
+from app.core.blobs import blob_store
 
 router = APIRouter(prefix="/archive", tags=["archive"])
 
@@ -30,8 +36,8 @@ async def get_archive_contents(
     parent_id: Optional[int] = Query(None),
     unit_id: Optional[int] = Query(None),
     is_private: bool = Query(False),
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     """Get contents of a folder (folders and files). Defaults to current user's unit if unit_id not specified."""
     target_unit_id = unit_id if unit_id is not None else current_user.unit_id
@@ -53,7 +59,7 @@ async def get_archive_contents(
 async def create_folder(
     folder_data: ArchiveFolderCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     """Create a new folder"""
     target_unit_id = folder_data.unit_id if folder_data.unit_id else current_user.unit_id
@@ -80,7 +86,7 @@ async def upload_file(
     is_private: bool = Form(False),
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     """Upload a file, optionally into a folder"""
     target_unit_id = unit_id if unit_id else current_user.unit_id
@@ -96,7 +102,7 @@ async def upload_file(
         if extension not in allowed:
             raise HTTPException(status_code=400, detail=f"File type {extension} not allowed")
 
-    # Validate Size (approximate using content-length)
+    # Reject early when the client reports the size; the limit itself is enforced while streaming
     max_mb_str = await ConfigService.get_value(db, "max_upload_size_mb")
     try:
         max_bytes = int(max_mb_str) * 1024 * 1024
@@ -114,15 +120,17 @@ async def upload_file(
         owner_id=current_user.id,
         unit_id=target_unit_id,
         folder_id=folder_id,
-        is_private=is_private
+        is_private=is_private,
+        max_bytes=max_bytes
     )
 
 @router.get("/files/{file_id}/view")
 async def view_file(
     file_id: int,
+    request: Request,
     download: Optional[int] = 0,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     """View or download a file with access control"""
     file_record = await ArchiveService.get_file_by_id(db, file_id)
@@ -133,7 +141,10 @@ async def view_file(
     
     # Secure path validation
     try:
-        safe_path = safe_file_operation(file_record.file_path, "uploads/archive")
+        if file_record.blob_sha256:
+            safe_path = blob_store.path(file_record.blob_sha256)
+        else:
+            safe_path = safe_file_operation(file_record.file_path, "uploads/archive")
     except ValueError as e:
         raise HTTPException(status_code=403, detail="Invalid file path")
     
@@ -145,14 +156,16 @@ async def view_file(
         safe_path, 
         media_type=file_record.mime_type,
         filename=os.path.basename(file_record.file_path) if download else None,
-        content_disposition=content_disposition
+        content_disposition=content_disposition,
+        request=request,
+        content_hash=file_record.blob_sha256
     )
 
 @router.delete("/files/{file_id}")
 async def delete_file(
     file_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     """Delete a file with unit-based permissions:
     - Global (is_private=False): Only users from the same unit can delete
@@ -184,7 +197,7 @@ async def delete_file(
 async def delete_folder(
     folder_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     """Delete a folder with unit-based permissions"""
     folder = await ArchiveService.get_folder_by_id(db, folder_id)
@@ -213,7 +226,7 @@ async def update_folder(
     folder_id: int,
     folder_data: ArchiveFolderUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     """Update folder properties (e.g. rename)"""
     folder = await ArchiveService.get_folder_by_id(db, folder_id)
@@ -235,7 +248,7 @@ async def update_file(
     file_id: int,
     file_data: ArchiveFileUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     """Update file properties (e.g. rename)"""
     file_record = await ArchiveService.get_file_by_id(db, file_id)
@@ -257,7 +270,7 @@ async def update_file_content(
     file_id: int = Form(...),
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     """Update file content (Sync back after local edit)"""
     file_record = await ArchiveService.get_file_by_id(db, file_id)
@@ -286,36 +299,60 @@ async def update_file_content(
     if file.size and file.size > max_bytes:
          raise HTTPException(status_code=413, detail=f"File too large (max {max_mb_str}MB)")
 
-    return await ArchiveService.update_file_content(db, file_id, file)
+    return await ArchiveService.update_file_content(db, file_id, file, max_bytes)
 
 @router.post("/batch-action")
 async def batch_action(
     batch_data: ArchiveBatchAction,
+    response: Response,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
-    """Handle batch move or copy actions for files and folders"""
-    
+    """
+    Handle batch move or copy actions for files and folders.
+    Large batches (and folder copies) are queued as a background job: the
+    response is 202 with the job id and progress arrives as "archive_job"
+    messages on the user WebSocket.
+    """
+    if batch_data.action not in ("move", "copy"):
+        raise HTTPException(status_code=400, detail="Invalid action. Use 'move' or 'copy'.")
+
     # Security: verify user has permission to access source items
+    item_units = await ArchiveService.get_item_units(db, batch_data.item_ids, batch_data.item_types)
     for item_id, item_type in zip(batch_data.item_ids, batch_data.item_types):
         if item_type == 'file':
-            file = await ArchiveService.get_file_by_id(db, item_id)
-            if not file:
+            unit_id = item_units.get(('file', item_id))
+            if unit_id is None:
                 raise HTTPException(status_code=404, detail=f"File {item_id} not found")
             # Non-admin users can only access files from their unit
-            if current_user.role != 'admin' and file.unit_id != current_user.unit_id:
+            if current_user.role != 'admin' and unit_id != current_user.unit_id:
                 raise HTTPException(status_code=403, detail="Access denied to source files")
         else:
-            folder = await ArchiveService.get_folder_by_id(db, item_id)
-            if not folder:
+            unit_id = item_units.get(('folder', item_id))
+            if unit_id is None:
                 raise HTTPException(status_code=404, detail=f"Folder {item_id} not found")
             # Non-admin users can only access folders from their unit
-            if current_user.role != 'admin' and folder.unit_id != current_user.unit_id:
+            if current_user.role != 'admin' and unit_id != current_user.unit_id:
                 raise HTTPException(status_code=403, detail="Access denied to source folders")
     
     # Security: verify user has permission to write to target unit
     if batch_data.target_unit_id != current_user.unit_id and current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Cannot move/copy to another unit's archive")
+
+    copies_folders = batch_data.action == "copy" and any(t != 'file' for t in batch_data.item_types)
+    if copies_folders or len(batch_data.item_ids) > get_settings().archive_job_inline_max:
+        job = await archive_jobs.submit(
+            db,
+            user_id=current_user.id,
+            action=batch_data.action,
+            item_ids=batch_data.item_ids,
+            item_types=batch_data.item_types,
+            target_folder_id=batch_data.target_folder_id,
+            target_unit_id=batch_data.target_unit_id,
+            is_private=batch_data.is_private
+        )
+        response.status_code = 202
+        return {"status": "queued", "job_id": job.id}
     
     if batch_data.action == "move":
         success = await ArchiveService.move_items(
@@ -326,7 +363,7 @@ async def batch_action(
             target_unit_id=batch_data.target_unit_id,
             is_private=batch_data.is_private
         )
-    elif batch_data.action == "copy":
+    else:
         success = await ArchiveService.copy_items(
             db,
             item_ids=batch_data.item_ids,
@@ -336,8 +373,6 @@ async def batch_action(
             is_private=batch_data.is_private,
             owner_id=current_user.id
         )
-    else:
-        raise HTTPException(status_code=400, detail="Invalid action. Use 'move' or 'copy'.")
     
     if success:
         return {"status": "success"}
@@ -348,3 +383,14 @@ async def batch_action(
             detail=f"Не удалось выполнить операцию {batch_data.action}. Проверьте права доступа к файлам и папкам."
         )
 
+@router.get("/jobs/{job_id}", response_model=ArchiveJobResponse)
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthPrincipal = Depends(get_current_principal)
+):
+    """State of a background batch action (e.g. after the WebSocket reconnected)"""
+    job = await db.get(ArchiveJob, job_id)
+    if not job or (job.user_id != current_user.id and current_user.role != 'admin'):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
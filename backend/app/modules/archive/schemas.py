@@ -66,3 +66,16 @@ class ArchiveBatchAction(BaseModel):
     target_folder_id: Optional[int] = None
     target_unit_id: int
     is_private: bool = False
+
+class ArchiveJobResponse(BaseModel):
+    id: int
+    action: str
+    status: str
+    done: int
+    total: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
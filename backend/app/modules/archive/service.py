@@ -1,22 +1,42 @@
 import os
 import re
-import shutil
 import unicodedata
 import logging
 from datetime import datetime
-from typing import List, Optional, Dict, Any
-from sqlalchemy import select, and_
+from collections import Counter
+from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy import select, and_, delete, func, literal, union_all, update
 from sqlalchemy.orm import joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import UploadFile
 
-from app.modules.archive.models import ArchiveFile, ArchiveFolder
+from app.modules.archive.models import ArchiveFile, ArchiveFolder, ArchiveJob
+from app.modules.archive.events import ArchiveFileCreated, ArchiveFileDeleted
+from app.core.events import event_bus
 from app.core.file_security import safe_file_operation
+from app.core.blobs import blob_store
 
 logger = logging.getLogger(__name__)
 
 UPLOAD_DIR = "uploads/archive"
 
+
+def _file_event(event_cls, file_record: ArchiveFile):
+    return event_cls(
+        file_id=file_record.id,
+        unit_id=file_record.unit_id,
+        file_size=file_record.file_size,
+        mime_type=file_record.mime_type,
+        file_path=file_record.file_path
+    )
+
+def _subtree(path: str):
+    """Condition matching a folder and all folders below it"""
+    if not path:
+        # An empty prefix would match every folder
+        raise ValueError("Folder has no materialized path")
+    return ArchiveFolder.path.like(f"{path}%")
+
 # Reserved filenames on Windows
 RESERVED_NAMES = {'CON', 'PRN', 'AUX', 'NUL', 'COM1', 'COM2', 'COM3', 'COM4', 
                   'LPT1', 'LPT2', 'LPT3', 'LPT4'}
@@ -74,6 +94,7 @@ class ArchiveService:
         parent_id: Optional[int] = None,
         is_private: bool = False
     ) -> ArchiveFolder:
+        parent_path = await ArchiveService._folder_path(db, parent_id)
         db_folder = ArchiveFolder(
             name=name,
             unit_id=unit_id,
@@ -82,6 +103,8 @@ class ArchiveService:
             is_private=is_private
         )
         db.add(db_folder)
+        await db.flush()  # Get db_folder.id
+        db_folder.path = f"{parent_path}{db_folder.id}/"
         await db.commit()
         await db.refresh(db_folder)
         return db_folder
@@ -145,25 +168,22 @@ class ArchiveService:
         owner_id: int,
         unit_id: int,
         folder_id: Optional[int] = None,
-        is_private: bool = False
+        is_private: bool = False,
+        max_bytes: Optional[int] = None
     ) -> ArchiveFile:
-        # Create directory if it doesn't exist
+        # Content goes to the blob store, the sanitized path names the file
         unit_dir = os.path.join(UPLOAD_DIR, str(unit_id))
-        os.makedirs(unit_dir, exist_ok=True)
-        
-        # Save file to disk with sanitized filename
         safe_filename = f"{datetime.now().timestamp()}_{sanitize_filename(file.filename or 'unnamed')}"
         file_path = os.path.join(unit_dir, safe_filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        stored = await blob_store.put(db, file, max_bytes)
             
         # Create DB record
         db_file = ArchiveFile(
             title=title,
             description=description,
             file_path=f"/{file_path}",
-            file_size=file.size,
+            file_size=stored.size,
+            blob_sha256=stored.sha256,
             mime_type=file.content_type,
             owner_id=owner_id,
             unit_id=unit_id,
@@ -174,6 +194,7 @@ class ArchiveService:
         db.add(db_file)
         await db.commit()
         await db.refresh(db_file)
+        await event_bus.publish(_file_event(ArchiveFileCreated, db_file))
         return db_file
 
     @staticmethod
@@ -192,26 +213,86 @@ class ArchiveService:
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
 
+    @staticmethod
+    async def get_item_units(
+        db: AsyncSession, item_ids: List[int], item_types: List[str]
+    ) -> Dict[Tuple[str, int], int]:
+        """Unit of every listed file and folder, keyed by ("file" | "folder", id), in one query"""
+        file_ids = [item_id for item_id, item_type in zip(item_ids, item_types) if item_type == 'file']
+        folder_ids = [item_id for item_id, item_type in zip(item_ids, item_types) if item_type != 'file']
+        stmt = union_all(
+            select(literal('file'), ArchiveFile.id, ArchiveFile.unit_id).where(ArchiveFile.id.in_(file_ids)),
+            select(literal('folder'), ArchiveFolder.id, ArchiveFolder.unit_id).where(ArchiveFolder.id.in_(folder_ids))
+        )
+        result = await db.execute(stmt)
+        return {(item_type, item_id): unit_id for item_type, item_id, unit_id in result.all()}
+
+    @staticmethod
+    async def _folder_path(db: AsyncSession, folder_id: Optional[int]) -> str:
+        """Materialized path of a folder ("/" for the archive root or a missing folder)"""
+        if folder_id is None:
+            return "/"
+        path = await db.scalar(select(ArchiveFolder.path).where(ArchiveFolder.id == folder_id))
+        if path == "":
+            await ArchiveService._repair_paths(db)
+            path = await db.scalar(select(ArchiveFolder.path).where(ArchiveFolder.id == folder_id))
+        return path or "/"
+
+    @staticmethod
+    async def _ensure_paths(db: AsyncSession, folders: List[ArchiveFolder]) -> None:
+        """Make sure loaded folders carry a materialized path before subtree queries use it"""
+        if all(f.path for f in folders):
+            return
+        await ArchiveService._repair_paths(db)
+        for f in folders:
+            await db.refresh(f, ["path"])
+
+    @staticmethod
+    async def _repair_paths(db: AsyncSession) -> None:
+        """
+        Rebuild materialized paths from the parent_id chain, as the migration
+        backfill does. Runs only when a folder without a path turns up; besides
+        empty paths it fixes descendants created below such a folder, which got
+        a path rooted at "/". Changes are committed with the caller's transaction.
+        """
+        rows = (await db.execute(select(ArchiveFolder.id, ArchiveFolder.parent_id, ArchiveFolder.path))).all()
+        known = {folder_id for folder_id, _, _ in rows}
+        children: Dict[Optional[int], List[int]] = {}
+        for folder_id, parent_id, _ in rows:
+            # A folder whose parent row is gone is treated as a root
+            children.setdefault(parent_id if parent_id in known else None, []).append(folder_id)
+
+        paths: Dict[int, str] = {}
+        level = [(folder_id, f"/{folder_id}/") for folder_id in children.get(None, [])]
+        while level:
+            paths.update(level)
+            level = [
+                (child_id, f"{path}{child_id}/")
+                for folder_id, path in level
+                for child_id in children.get(folder_id, [])
+            ]
+
+        stale = [
+            {"id": folder_id, "path": paths[folder_id]}
+            for folder_id, _, path in rows
+            if folder_id in paths and path != paths[folder_id]
+        ]
+        if stale:
+            logger.warning(f"Rebuilt materialized paths of {len(stale)} archive folders")
+            await db.execute(update(ArchiveFolder), stale)
+
     @staticmethod
     async def delete_file(db: AsyncSession, file_id: int) -> bool:
         file_record = await ArchiveService.get_file_by_id(db, file_id)
         if not file_record:
             return False
             
-        # Delete from disk with safe path validation
-        try:
-            safe_path = safe_file_operation(file_record.file_path, UPLOAD_DIR)
-            if os.path.exists(safe_path):
-                os.remove(safe_path)
-        except ValueError as e:
-            logger.error(f"Path traversal detected in delete_file: {e}")
-            # Continue with DB deletion even if file deletion fails
-        except Exception as e:
-            logger.error(f"Error deleting file from disk: {e}")
+        await ArchiveService._discard_content(db, file_record)
             
         # Delete from DB
         await db.delete(file_record)
         await db.commit()
+        await event_bus.publish(_file_event(ArchiveFileDeleted, file_record))
         return True
 
     @staticmethod
@@ -219,22 +300,51 @@ class ArchiveService:
         folder = await ArchiveService.get_folder_by_id(db, folder_id)
         if not folder:
             return False
+        await ArchiveService._ensure_paths(db, [folder])
 
-        # Recursive delete subfolders and files
-        stmt_files = select(ArchiveFile).where(ArchiveFile.folder_id == folder_id)
-        res_files = await db.execute(stmt_files)
-        files = res_files.scalars().all()
-        for f in files:
-            await ArchiveService.delete_file(db, f.id)
+        # The whole subtree goes in one transaction; content is removed from disk in the background
+        subtree_ids = select(ArchiveFolder.id).where(_subtree(folder.path))
+        res_files = await db.execute(
+            select(
+                ArchiveFile.id, ArchiveFile.unit_id, ArchiveFile.file_size,
+                ArchiveFile.mime_type, ArchiveFile.file_path, ArchiveFile.blob_sha256
+            ).where(ArchiveFile.folder_id.in_(subtree_ids))
+        )
+        files = res_files.all()
 
-        stmt_folders = select(ArchiveFolder).where(ArchiveFolder.parent_id == folder_id)
-        res_folders = await db.execute(stmt_folders)
-        subfolders = res_folders.scalars().all()
-        for sub in subfolders:
-            await ArchiveService.delete_folder(db, sub.id)
+        await blob_store.release_all(db, [f.blob_sha256 for f in files])
+        blob_store.retire(db, ArchiveService._legacy_paths(f.file_path for f in files if not f.blob_sha256))
 
-        await db.delete(folder)
+        # Batch actions aimed at the removed folders can no longer be applied
+        await db.execute(
+            update(ArchiveJob)
+            .where(
+                ArchiveJob.target_folder_id.in_(subtree_ids),
+                ArchiveJob.status.in_(["queued", "running"])
+            )
+            .values(status="failed", error="Целевая папка удалена", updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            delete(ArchiveFile)
+            .where(ArchiveFile.folder_id.in_(subtree_ids))
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            delete(ArchiveFolder)
+            .where(_subtree(folder.path))
+            .execution_options(synchronize_session=False)
+        )
         await db.commit()
+
+        for f in files:
+            await event_bus.publish(ArchiveFileDeleted(
+                file_id=f.id,
+                unit_id=f.unit_id,
+                file_size=f.file_size,
+                mime_type=f.mime_type,
+                file_path=f.file_path
+            ))
         return True
 
     @staticmethod
@@ -269,44 +379,125 @@ class ArchiveService:
     async def update_file_content(
         db: AsyncSession,
         file_id: int,
-        file: UploadFile
+        file: UploadFile,
+        max_bytes: Optional[int] = None
     ) -> Optional[ArchiveFile]:
         file_record = await ArchiveService.get_file_by_id(db, file_id)
         if not file_record:
             return None
-            
-        # Delete old file from disk with safe path validation
-        try:
-            old_path = safe_file_operation(file_record.file_path, UPLOAD_DIR)
-            if os.path.exists(old_path):
-                os.remove(old_path)
-        except ValueError as e:
-            logger.error(f"Path traversal detected in update_file_content: {e}")
-        except Exception as e:
-            logger.error(f"Error deleting old file: {e}")
-            
-        # Save new file to disk
+        replaced_event = _file_event(ArchiveFileDeleted, file_record)
+
+        # Store new content first, so a failed upload keeps the old content
         unit_dir = os.path.join(UPLOAD_DIR, str(file_record.unit_id))
-        os.makedirs(unit_dir, exist_ok=True)
-        
-        # Sanitize filename
         sanitized = sanitize_filename(file.filename or 'unnamed')
         safe_filename = f"{datetime.now().timestamp()}_{sanitized}"
         new_path = os.path.join(unit_dir, safe_filename)
-        
-        with open(new_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        stored = await blob_store.put(db, file, max_bytes)
+
+        await ArchiveService._discard_content(db, file_record)
             
         # Update DB record
         file_record.file_path = f"/{new_path}"
-        file_record.file_size = file.size
+        file_record.file_size = stored.size
+        file_record.blob_sha256 = stored.sha256
         # Update title if it changed (usually same)
         file_record.created_at = datetime.now() # Update "last modified" time if needed, though strictly it's "created_at" in our model
         
         await db.commit()
         await db.refresh(file_record)
+        await event_bus.publish(replaced_event)
+        await event_bus.publish(_file_event(ArchiveFileCreated, file_record))
         return file_record
     @staticmethod
+    def _legacy_paths(file_paths) -> List[str]:
+        """Resolve the on-disk paths of files stored before the blob store"""
+        paths = []
+        for file_path in file_paths:
+            try:
+                paths.append(safe_file_operation(file_path, UPLOAD_DIR))
+            except ValueError as e:
+                logger.error(f"Path traversal detected while deleting file content: {e}")
+                # Continue with DB changes even if file deletion fails
+        return paths
+
+    @staticmethod
+    async def _discard_content(db: AsyncSession, file_record: ArchiveFile) -> None:
+        """Release the blob of a file, or have its legacy file removed after the commit"""
+        if file_record.blob_sha256:
+            await blob_store.release(db, file_record.blob_sha256)
+            return
+        blob_store.retire(db, ArchiveService._legacy_paths([file_record.file_path]))
+
+    @staticmethod
+    async def _adopt_content(db: AsyncSession, file: ArchiveFile) -> bool:
+        """
+        Make sure the content of `file` is in the blob store so a copy can
+        reference it (False to skip the file). Legacy files are moved into
+        the store on their first copy, so only that copy touches the disk.
+        """
+        if file.blob_sha256:
+            return True
+        try:
+            old_path = safe_file_operation(file.file_path, UPLOAD_DIR)
+            if not os.path.exists(old_path):
+                logger.warning(f"Source file not found: {old_path}")
+                return False
+            stored = await blob_store.put_file(db, old_path)
+        except ValueError as e:
+            logger.error(f"Path traversal detected in copy operation: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"Error copying file: {e}")
+            return False
+        # put_file took the source's reference; its old file is removed after the commit
+        file.blob_sha256 = stored.sha256
+        return True
+
+    @staticmethod
+    def _copy_path(file: ArchiveFile, target_unit_id: int) -> str:
+        # Sanitize filename and ensure total length is within limits
+        timestamp = datetime.now().timestamp()
+        sanitized = sanitize_filename(os.path.basename(file.file_path))
+        max_name_length = 255 - len(str(timestamp)) - 1
+        if len(sanitized) > max_name_length:
+            name, ext = os.path.splitext(sanitized)
+            sanitized = name[:max_name_length - len(ext)] + ext
+
+        return os.path.join(UPLOAD_DIR, str(target_unit_id), f"{timestamp}_{sanitized}")
+
+    @staticmethod
+    async def _copy_files(
+        db: AsyncSession,
+        placements: List[Tuple[ArchiveFile, Optional[int]]],
+        target_unit_id: int,
+        is_private: bool,
+        owner_id: int
+    ) -> List[ArchiveFile]:
+        """Copy (file, target folder id) pairs; copies share the content and take one reference per blob"""
+        created: List[ArchiveFile] = []
+        refs: Counter = Counter()
+        for file, folder_id in placements:
+            if not await ArchiveService._adopt_content(db, file):
+                continue
+            refs[file.blob_sha256] += 1
+            created.append(ArchiveFile(
+                title=file.title,
+                description=file.description,
+                file_path=f"/{ArchiveService._copy_path(file, target_unit_id)}",
+                file_size=file.file_size,
+                blob_sha256=file.blob_sha256,
+                mime_type=file.mime_type,
+                owner_id=owner_id,
+                unit_id=target_unit_id,
+                folder_id=folder_id,
+                is_private=is_private
+            ))
+        for sha256, count in refs.items():
+            await blob_store.add_ref(db, sha256, count=count)
+        db.add_all(created)
+        return created
+
+    @staticmethod
     async def move_items(
         db: AsyncSession,
         item_ids: List[int],
@@ -332,6 +523,8 @@ class ArchiveService:
             stmt = select(ArchiveFolder).where(ArchiveFolder.id.in_(folder_ids))
             res = await db.execute(stmt)
             folders_dict = {f.id: f for f in res.scalars().all()}
+            await ArchiveService._ensure_paths(db, list(folders_dict.values()))
+        target_path = await ArchiveService._folder_path(db, target_folder_id) if folders_dict else "/"
         
         # Update items
         for item_id, item_type in zip(item_ids, item_types):
@@ -344,33 +537,37 @@ class ArchiveService:
             else:
                 folder = folders_dict.get(item_id)
                 if folder:
+                    if target_path.startswith(folder.path):
+                        logger.warning(f"Refusing to move folder {folder.id} into its own subtree")
+                        continue
                     folder.parent_id = target_folder_id
-                    folder.unit_id = target_unit_id
-                    folder.is_private = is_private
-                    # Recursively update all children unit_id and is_private
-                    await ArchiveService._update_folder_children_context(db, item_id, target_unit_id, is_private)
+                    # Update the path, unit_id and is_private of the whole subtree
+                    await ArchiveService._update_folder_children_context(
+                        db, folder.path, f"{target_path}{folder.id}/", target_unit_id, is_private
+                    )
         
         await db.commit()
         return True
 
     @staticmethod
-    async def _update_folder_children_context(db: AsyncSession, folder_id: int, unit_id: int, is_private: bool):
-        # Update files in this folder
-        from sqlalchemy import update
+    async def _update_folder_children_context(db: AsyncSession, old_path: str, new_path: str, unit_id: int, is_private: bool):
+        # Files first, while the subtree can still be found under its old path
         await db.execute(
             update(ArchiveFile)
-            .where(ArchiveFile.folder_id == folder_id)
+            .where(ArchiveFile.folder_id.in_(select(ArchiveFolder.id).where(_subtree(old_path))))
             .values(unit_id=unit_id, is_private=is_private)
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            update(ArchiveFolder)
+            .where(_subtree(old_path))
+            .values(
+                path=literal(new_path) + func.substr(ArchiveFolder.path, len(old_path) + 1),
+                unit_id=unit_id,
+                is_private=is_private
+            )
+            .execution_options(synchronize_session="fetch")
         )
-        
-        # Get subfolders
-        stmt = select(ArchiveFolder).where(ArchiveFolder.parent_id == folder_id)
-        res = await db.execute(stmt)
-        subfolders = res.scalars().all()
-        for sub in subfolders:
-            sub.unit_id = unit_id
-            sub.is_private = is_private
-            await ArchiveService._update_folder_children_context(db, sub.id, unit_id, is_private)
 
     @staticmethod
     async def copy_items(
@@ -401,124 +598,70 @@ class ArchiveService:
             folders_dict = {f.id: f for f in res.scalars().all()}
         
         # Copy items
-        for item_id, item_type in zip(item_ids, item_types):
-            if item_type == 'file':
-                file = files_dict.get(item_id)
-                if file:
-                    # Copy file on disk with safe path validation
-                    try:
-                        old_path = safe_file_operation(file.file_path, UPLOAD_DIR)
-                        unit_dir = os.path.join(UPLOAD_DIR, str(target_unit_id))
-                        os.makedirs(unit_dir, exist_ok=True)
-                        
-                        # Sanitize filename and ensure total length is within limits
-                        timestamp = datetime.now().timestamp()
-                        sanitized = sanitize_filename(os.path.basename(file.file_path))
-                        max_name_length = 255 - len(str(timestamp)) - 1
-                        if len(sanitized) > max_name_length:
-                            name, ext = os.path.splitext(sanitized)
-                            sanitized = name[:max_name_length - len(ext)] + ext
-                        
-                        new_filename = f"{timestamp}_{sanitized}"
-                        new_path = os.path.join(unit_dir, new_filename)
-                        
-                        if os.path.exists(old_path):
-                            shutil.copy2(old_path, new_path)
-                        else:
-                            logger.warning(f"Source file not found: {old_path}")
-                            continue
-                    except ValueError as e:
-                        logger.error(f"Path traversal detected in copy operation: {e}")
-                        continue
-                    except Exception as e:
-                        logger.error(f"Error copying file: {e}")
-                        continue
-                    
-                    new_file = ArchiveFile(
-                        title=file.title,
-                        description=file.description,
-                        file_path=f"/{new_path}",
-                        file_size=file.file_size,
-                        mime_type=file.mime_type,
-                        owner_id=owner_id,
-                        unit_id=target_unit_id,
-                        folder_id=target_folder_id,
-                        is_private=is_private
-                    )
-                    db.add(new_file)
-            else:
-                await ArchiveService._copy_folder_recursive(db, item_id, target_folder_id, target_unit_id, is_private, owner_id)
+        created = await ArchiveService._copy_files(
+            db,
+            [(files_dict[item_id], target_folder_id) for item_id in file_ids if item_id in files_dict],
+            target_unit_id, is_private, owner_id
+        )
+        if folders_dict:
+            await ArchiveService._ensure_paths(db, list(folders_dict.values()))
+            target_path = await ArchiveService._folder_path(db, target_folder_id)
+            for item_id in folder_ids:
+                folder = folders_dict.get(item_id)
+                if folder:
+                    created.extend(await ArchiveService._copy_subtree(
+                        db, folder, target_folder_id, target_path, target_unit_id, is_private, owner_id
+                    ))
         
         await db.commit()
+        for new_file in created:
+            await event_bus.publish(_file_event(ArchiveFileCreated, new_file))
         return True
 
     @staticmethod
-    async def _copy_folder_recursive(db: AsyncSession, folder_id: int, target_parent_id: Optional[int], target_unit_id: int, is_private: bool, owner_id: int):
-        stmt = select(ArchiveFolder).where(ArchiveFolder.id == folder_id)
-        res = await db.execute(stmt)
-        folder = res.scalar_one_or_none()
-        if not folder: return
-
-        # Create new folder
-        new_folder = ArchiveFolder(
-            name=folder.name,
-            unit_id=target_unit_id,
-            owner_id=owner_id,
-            parent_id=target_parent_id,
-            is_private=is_private
+    async def _copy_subtree(
+        db: AsyncSession,
+        folder: ArchiveFolder,
+        target_parent_id: Optional[int],
+        target_path: str,
+        target_unit_id: int,
+        is_private: bool,
+        owner_id: int
+    ) -> List[ArchiveFile]:
+        """Copy a folder with everything below it; returns the new files"""
+        if target_path.startswith(folder.path):
+            logger.warning(f"Refusing to copy folder {folder.id} into its own subtree")
+            return []
+
+        # Parents sort before their children by path length
+        res_folders = await db.execute(
+            select(ArchiveFolder).where(_subtree(folder.path)).order_by(func.length(ArchiveFolder.path))
         )
-        db.add(new_folder)
-        await db.flush() # Get new_folder.id
+        folders = res_folders.scalars().all()
 
-        # Copy files
-        stmt_files = select(ArchiveFile).where(ArchiveFile.folder_id == folder_id)
-        res_files = await db.execute(stmt_files)
-        files = res_files.scalars().all()
-        for f in files:
-            try:
-                old_path = safe_file_operation(f.file_path, UPLOAD_DIR)
-                unit_dir = os.path.join(UPLOAD_DIR, str(target_unit_id))
-                os.makedirs(unit_dir, exist_ok=True)
-                
-                # Sanitize filename and ensure total length is within limits
-                timestamp = datetime.now().timestamp()
-                sanitized = sanitize_filename(os.path.basename(f.file_path))
-                max_name_length = 255 - len(str(timestamp)) - 1
-                if len(sanitized) > max_name_length:
-                    name, ext = os.path.splitext(sanitized)
-                    sanitized = name[:max_name_length - len(ext)] + ext
-                
-                new_filename = f"{timestamp}_{sanitized}"
-                new_path = os.path.join(unit_dir, new_filename)
-                
-                if os.path.exists(old_path):
-                    shutil.copy2(old_path, new_path)
-                else:
-                    logger.warning(f"Source file not found: {old_path}")
-                    continue
-            except ValueError as e:
-                logger.error(f"Path traversal detected in folder copy: {e}")
-                continue
-            except Exception as e:
-                logger.error(f"Error copying file in folder: {e}")
-                continue
-            
-            new_file = ArchiveFile(
-                title=f.title,
-                description=f.description,
-                file_path=f"/{new_path}",
-                file_size=f.file_size,
-                mime_type=f.mime_type,
-                owner_id=owner_id,
+        copies: Dict[int, ArchiveFolder] = {}
+        for f in folders:
+            copies[f.id] = ArchiveFolder(
+                name=f.name,
                 unit_id=target_unit_id,
-                folder_id=new_folder.id,
+                owner_id=owner_id,
+                parent_id=target_parent_id if f.id == folder.id else None,
                 is_private=is_private
             )
-            db.add(new_file)
-
-        # Copy subfolders
-        stmt_folders = select(ArchiveFolder).where(ArchiveFolder.parent_id == folder_id)
-        res_folders = await db.execute(stmt_folders)
-        subfolders = res_folders.scalars().all()
-        for sub in subfolders:
-            await ArchiveService._copy_folder_recursive(db, sub.id, new_folder.id, target_unit_id, is_private, owner_id)
+            if f.id != folder.id:
+                copies[f.id].parent = copies[f.parent_id]
+        db.add_all(copies.values())
+        await db.flush()  # Get the new ids
+        for f in folders:
+            copy = copies[f.id]
+            parent_path = target_path if f.id == folder.id else copies[f.parent_id].path
+            copy.path = f"{parent_path}{copy.id}/"
+
+        res_files = await db.execute(
+            select(ArchiveFile).where(ArchiveFile.folder_id.in_(list(copies)))
+        )
+        return await ArchiveService._copy_files(
+            db,
+            [(f, copies[f.folder_id].id) for f in res_files.scalars().all()],
+            target_unit_id, is_private, owner_id
+        )
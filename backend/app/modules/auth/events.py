@@ -19,6 +19,7 @@ class UserDeleted(Event):
     user_id: int
     username: str
     email: str
+    created_at: str | None = None
 
 @dataclass(frozen=True)
 class UserUpdated(Event):
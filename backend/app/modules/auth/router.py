@@ -25,7 +25,9 @@ from app.modules.auth.models import User
 from app.core.websocket_manager import websocket_manager
 from app.core.events import event_bus
 from app.modules.auth.events import UserCreated, UserDeleted, UserUpdated
+from app.modules.admin.events import StatsInvalidated
 from app.modules.auth.handlers import UserEventHandlers
+from app.modules.auth.token_cache import AuthPrincipal, token_cache, verify_token
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -59,44 +61,48 @@ settings = get_settings()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 
-async def get_current_user(
-    token: Optional[str] = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
-) -> User:
-    """Get current authenticated user"""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Не удалось проверить учетные данные",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+async def get_current_principal(
+    token: Optional[str] = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> AuthPrincipal:
+    """
+    Get id/role/unit of the authenticated user.
+    Served from the token cache, so endpoints that only need ids skip the user SELECT.
+    """
     if not token:
-        raise credentials_exception
-    
-    payload = decode_access_token(token)
-    if payload is None:
-        raise credentials_exception
-    
-    user_id_str = payload.get("sub")
-    if user_id_str is None:
-        raise credentials_exception
-    
-    try:
-        user_id = int(user_id_str)
-    except (ValueError, TypeError):
-        raise credentials_exception
+        raise _credentials_exception()
     
-    user = await UserService.get_user_by_id(db, user_id=user_id)
-    if user is None:
-        raise credentials_exception
+    principal = await verify_token(db, token)
+    if principal is None:
+        raise _credentials_exception()
     
-    if not user.is_active:
+    if not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Ваша учетная запись заблокирована. Пожалуйста, обратитесь к администратору.",
             headers={"X-Account-Blocked": "true"}
         )
     
+    return principal
+
+
+async def get_current_user(
+    principal: AuthPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Get current authenticated user (full ORM object)"""
+    user = await UserService.get_user_by_id(db, user_id=principal.id)
+    if user is None:
+        token_cache.invalidate_user(principal.id)
+        raise _credentials_exception()
     return user
 
 
@@ -136,15 +142,7 @@ async def register(
         )
 
     user = await UserService.create_user(db, user_data)
-
-    # TODO: Subscribe to UserCreated event when user is created
-    # await event_bus.subscribe(UserCreated, lambda event:
-    #     UserEventHandlers.on_user_created(
-    #         event.user_id,
-    #         event.email,
-    #         event.username
-    #     )
-    # )
+    await event_bus.publish(UserCreated(user_id=user.id, username=user.username, email=user.email))
 
     return user
 
@@ -272,30 +270,26 @@ async def get_me(current_user: User = Depends(get_current_user)):
 async def update_me(
     update_data: UserUpdate,
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
     _csrf: None = Depends(require_csrf_token)
 ):
     """Update current user profile"""
     updated_user = await UserService.update_user_profile(db, current_user.id, update_data)
-
-    # TODO: Subscribe to UserUpdated event when user is updated
-    # await event_bus.subscribe(UserUpdated, lambda event:
-    #     UserEventHandlers.on_user_updated(event.user_id, event.changes)
-    # )
+    await event_bus.publish(UserUpdated(user_id=current_user.id, changes=update_data.model_dump(exclude_unset=True)))
 
     return updated_user
 
 
 @router.get("/users", response_model=List[UserResponse])
-async def get_users(db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_users(db: AsyncSession = Depends(get_db), current_user: AuthPrincipal = Depends(get_current_principal)):
     """Get list of all users"""
     users = await UserService.get_all_users(db)
     return users
 
 
 @router.get("/users/online")
-async def get_online_users(current_user: User = Depends(get_current_user)):
+async def get_online_users(current_user: AuthPrincipal = Depends(get_current_principal)):
     """Get list of online user IDs"""
     from app.modules.chat.websocket import manager
     online_ids = manager.get_online_user_ids()
@@ -306,7 +300,7 @@ async def get_online_users(current_user: User = Depends(get_current_user)):
 async def change_password(
     password_data: UserChangePassword,
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
     _csrf: None = Depends(require_csrf_token),
     _rate_limit: None = Depends(rate_limit_auth)
@@ -325,7 +319,7 @@ async def change_password(
 async def upload_avatar(
     file: UploadFile = File(...),
     request: Request = None,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
     _csrf: None = Depends(require_csrf_token),
     _rate_limit: None = Depends(rate_limit_file_upload)
@@ -394,14 +388,16 @@ async def delete_user(
     _csrf: None = Depends(require_csrf_token)
 ):
     """Delete a user (Admin only)"""
-    success = await UserService.delete_user(db, user_id)
-    if not success:
+    user = await UserService.get_user_by_id(db, user_id)
+    if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
+    event = UserDeleted(
+        user_id=user_id, username=user.username, email=user.email,
+        created_at=user.created_at.isoformat() if user.created_at else None
+    )
 
-    # TODO: Subscribe to UserDeleted event when user is deleted
-    # await event_bus.subscribe(UserDeleted, lambda event:
-    #     UserEventHandlers.on_user_deleted(event.user_id)
-    # )
+    await UserService.delete_user(db, user_id)
+    await event_bus.publish(event)
     
     await AdminService.create_audit_log(
         db, admin.id, "delete_user", "user", user_id,
@@ -421,6 +417,7 @@ async def update_user_role(
     user = await UserService.update_user_role(db, user_id, role_data.role.value)
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
+    await event_bus.publish(UserUpdated(user_id=user_id, changes={"role": role_data.role.value}))
     
     await AdminService.create_audit_log(
         db, admin.id, "update_role", "user", user_id,
@@ -432,7 +429,7 @@ async def update_user_role(
 @router.get("/units", response_model=List[UnitResponse])
 async def get_units(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     """Get all units"""
     return await UnitService.get_all_units(db)
@@ -464,6 +461,10 @@ async def delete_unit(
     success = await UnitService.delete_unit(db, unit_id)
     if not success:
         raise HTTPException(status_code=404, detail="Подразделение не найдено")
+    # Members of the unit were detached; drop every cached token rather than look them up
+    await token_cache.publish_invalidation()
+    # The unit's archive was removed in bulk
+    await event_bus.publish(StatsInvalidated(reason=f"unit {unit_id} deleted"))
     
     await AdminService.create_audit_log(
         db, admin.id, "delete_unit", "unit", unit_id,
@@ -504,6 +505,7 @@ async def update_user_unit(
         raise HTTPException(status_code=404, detail="Пользователь не найден")
     if error == "unit_not_found":
         raise HTTPException(status_code=404, detail="Подразделение не найдено")
+    await event_bus.publish(UserUpdated(user_id=user_id, changes={"unit_id": user.unit_id}))
     
     await AdminService.create_audit_log(
         db, admin.id, "update_user_unit", "user", user_id,
@@ -524,6 +526,7 @@ async def update_user_admin(
     updated_user = await UserService.update_user_profile(db, user_id, update_data)
     if not updated_user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
+    await event_bus.publish(UserUpdated(user_id=user_id, changes=update_data.model_dump(exclude_unset=True)))
     
     # If account was deactivated, kick from all active WebSockets
     if update_data.is_active is False:
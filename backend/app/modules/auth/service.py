@@ -4,7 +4,7 @@ from sqlalchemy.orm import joinedload, defer
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.modules.auth.models import User, Unit
 from app.modules.auth.schemas import UserCreate, UnitCreate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
 from app.modules.email.protocols import EmailAccountServiceProtocol
 
 
@@ -50,7 +50,7 @@ class UserService:
         # Validate password
         await self.validate_password(user_data.password)
 
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
 
         # Generate internal email from database config
         email_domain = await ConfigService.get_value(self.db, "internal_email_domain", "40919.com")
@@ -147,8 +147,10 @@ class UserService:
         """Delete a user and all associated data (cascading cleanup)"""
         from sqlalchemy import delete
         from app.modules.chat.models import Message, ChannelMember, Channel
+        from app.modules.chat.service import ChatService
         from app.modules.board.models import Document, DocumentShare
-        from app.modules.email.models import EmailAccount
+        from app.modules.email.models import EmailAccount, EmailAttachment, EmailMessage
+        from app.core.blobs import blob_store
         import os
         import shutil
 
@@ -168,7 +170,9 @@ class UserService:
         for doc in owned_docs:
             # File cleanup
             file_path = doc.file_path.lstrip("/")
-            if os.path.exists(file_path):
+            if doc.blob_sha256:
+                await blob_store.release(db, doc.blob_sha256)
+            elif os.path.exists(file_path):
                 try:
                     os.remove(file_path)
                 except OSError:
@@ -178,8 +182,17 @@ class UserService:
 
         # 2. Cleanup Chat Module
         # Delete messages sent by user (in all channels)
+        touched_channels = await db.execute(
+            select(Message.channel_id).where(Message.user_id == user_id).distinct()
+        )
+        touched_channel_ids = list(touched_channels.scalars().all())
         await db.execute(delete(Message).where(Message.user_id == user_id))
         
+        # Keep reply counts, last message previews and unread counters of the remaining channels correct
+        await ChatService.refresh_reply_counts(db, touched_channel_ids)
+        await ChatService.refresh_last_messages(db, touched_channel_ids)
+        await ChatService.refresh_unread_counts(db, touched_channel_ids)
+        
         # Delete channel memberships
         await db.execute(delete(ChannelMember).where(ChannelMember.user_id == user_id))
         
@@ -206,8 +219,19 @@ class UserService:
             # but we need to delete physical files.
             # In a full implementation, we'd walk through all messages and delete files.
             # For now, we'll just delete the account from DB (cascades to messages).
+            # Attachments stored as blobs are released here.
+            attachment_blobs = await db.execute(
+                select(EmailAttachment.blob_sha256)
+                .join(EmailMessage, EmailAttachment.message_id == EmailMessage.id)
+                .where(EmailMessage.account_id == email_account.id)
+            )
+            await blob_store.release_all(db, attachment_blobs.scalars().all())
             await db.delete(email_account)
 
+        # Pending archive batch actions of the user
+        from app.modules.archive.models import ArchiveJob
+        await db.execute(delete(ArchiveJob).where(ArchiveJob.user_id == user_id))
+
         # 4. Delete user avatar file if exists
         if user.avatar_url:
             avatar_path = user.avatar_url.lstrip("/")
@@ -246,7 +270,7 @@ class UserService:
         
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        if not await verify_password_async(password, user.hashed_password):
             return None
             
         return user
@@ -306,21 +330,19 @@ class UserService:
 
     @staticmethod
     async def change_password(db: AsyncSession, user_id: int, password_data: "UserChangePassword") -> bool:
-        from app.core.security import verify_password, get_password_hash
-        
         result = await db.execute(select(User).where(User.id == user_id))
         user = result.scalar_one_or_none()
         
         if not user:
             return False
             
-        if not verify_password(password_data.current_password, user.hashed_password):
+        if not await verify_password_async(password_data.current_password, user.hashed_password):
             return False
 
         # Validate new password
         await UserService.validate_password(db, password_data.new_password)
             
-        user.hashed_password = get_password_hash(password_data.new_password)
+        user.hashed_password = await get_password_hash_async(password_data.new_password)
         await db.commit()
         return True
 
@@ -336,7 +358,7 @@ class UserService:
         # Validate new password
         await UserService.validate_password(db, password)
             
-        user.hashed_password = get_password_hash(password)
+        user.hashed_password = await get_password_hash_async(password)
         await db.commit()
         return True
 
@@ -386,7 +408,8 @@ class UnitService:
     async def delete_unit(db: AsyncSession, unit_id: int) -> bool:
         """Delete a unit, reset user associations, and clean up archive"""
         from sqlalchemy import update, delete
-        from app.modules.archive.models import ArchiveFile, ArchiveFolder
+        from app.modules.archive.models import ArchiveFile, ArchiveFolder, ArchiveJob
+        from app.core.blobs import blob_store
         import shutil
         import os
 
@@ -405,8 +428,11 @@ class UnitService:
         
         # 3. Clean up archive records in DB
         # Archive files and folders for this unit should be removed
+        blobs = await db.execute(select(ArchiveFile.blob_sha256).where(ArchiveFile.unit_id == unit_id))
+        await blob_store.release_all(db, blobs.scalars().all())
         await db.execute(delete(ArchiveFile).where(ArchiveFile.unit_id == unit_id))
         await db.execute(delete(ArchiveFolder).where(ArchiveFolder.unit_id == unit_id))
+        await db.execute(delete(ArchiveJob).where(ArchiveJob.target_unit_id == unit_id))
         
         # 4. Clean up physical archive directory
         archive_dir = os.path.join("uploads/archive", str(unit_id))
@@ -0,0 +1,168 @@
+"""
+Cache of verified access tokens.
+
+Maps a JWT to the few user fields authorization needs (id, role, is_active,
+unit_id), so most authenticated requests skip both signature verification
+and the user SELECT. Entries live for AUTH_CACHE_TTL seconds (never past the
+token's own expiry) and the cache is bounded to AUTH_CACHE_MAX_SIZE tokens
+with LRU eviction.
+
+Changes to a user (UserUpdated / UserDeleted on the event bus, kick_user)
+drop all of that user's tokens on every worker via Redis pub/sub.
+"""
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.events import event_bus
+from app.core.redis_manager import redis_manager
+from app.core.security import decode_access_token
+from app.modules.auth.events import UserDeleted, UserUpdated
+from app.modules.auth.models import User
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub topic used to drop cached tokens on every worker
+AUTH_INVALIDATION_CHANNEL = "auth:invalidate"
+
+
+@dataclass(frozen=True)
+class AuthPrincipal:
+    """Authenticated user as seen by authorization checks"""
+    id: int
+    role: str
+    is_active: bool
+    unit_id: Optional[int] = None
+
+
+class TokenCache:
+    """Size-bounded TTL cache: token -> AuthPrincipal"""
+
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None) -> None:
+        settings = get_settings()
+        self.ttl = ttl if ttl is not None else settings.auth_cache_ttl_seconds
+        self.max_size = max_size or settings.auth_cache_max_size
+        # token -> (principal, expires_at monotonic)
+        self._entries: "OrderedDict[str, Tuple[AuthPrincipal, float]]" = OrderedDict()
+        # user_id -> tokens of that user, for invalidation
+        self._by_user: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[AuthPrincipal]:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        principal, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._remove(token)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return principal
+
+    def put(self, token: str, principal: AuthPrincipal, token_exp: Optional[float] = None) -> None:
+        """Cache a verified token; `token_exp` is the JWT `exp` claim (unix time)"""
+        if self.ttl <= 0:
+            return
+        lifetime = self.ttl
+        if token_exp is not None:
+            lifetime = min(lifetime, token_exp - time.time())
+            if lifetime <= 0:
+                return
+        self._remove(token)
+        self._entries[token] = (principal, time.monotonic() + lifetime)
+        self._by_user.setdefault(principal.id, set()).add(token)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._by_user.get(entry[0].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[entry[0].id]
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every cached token of a user on this worker"""
+        for token in list(self._by_user.get(int(user_id), ())):
+            self._remove(token)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_user.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ==================== Cluster-wide invalidation ====================
+
+    async def publish_invalidation(self, user_id: Optional[int] = None) -> None:
+        """Drop a user's tokens (or all tokens when user_id is None) here and on all other workers"""
+        if user_id is None:
+            self.clear()
+        else:
+            user_id = int(user_id)
+            self.invalidate_user(user_id)
+        await redis_manager.publish(AUTH_INVALIDATION_CHANNEL, {"user_id": user_id})
+
+    async def _handle_invalidation(self, message: dict) -> None:
+        user_id = message.get("user_id")
+        if user_id is None:
+            self.clear()
+        else:
+            self.invalidate_user(user_id)
+
+    async def _handle_user_event(self, event) -> None:
+        await self.publish_invalidation(event.user_id)
+
+    async def subscribe(self, redis=None) -> None:
+        """Listen for user changes on the event bus and for invalidations from other workers"""
+        await event_bus.subscribe(UserUpdated, self._handle_user_event)
+        await event_bus.subscribe(UserDeleted, self._handle_user_event)
+        await (redis or redis_manager).subscribe(AUTH_INVALIDATION_CHANNEL, self._handle_invalidation)
+
+
+# Global instance
+token_cache = TokenCache()
+
+
+async def verify_token(db: AsyncSession, token: str) -> Optional[AuthPrincipal]:
+    """
+    Resolve an access token to its user, from cache when possible.
+    Returns None for invalid tokens and unknown users; inactive users are
+    returned (and cached) so callers can tell them apart.
+    """
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
+
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+    try:
+        user_id = int(payload.get("sub"))
+    except (ValueError, TypeError):
+        return None
+
+    result = await db.execute(
+        select(User.id, User.role, User.is_active, User.unit_id).where(User.id == user_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None
+
+    principal = AuthPrincipal(id=row.id, role=row.role, is_active=bool(row.is_active), unit_id=row.unit_id)
+    token_cache.put(token, principal, payload.get("exp"))
+    return principal
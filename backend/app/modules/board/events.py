@@ -6,6 +6,7 @@ enabling cross-module communication without direct dependencies.
 """
 
 from dataclasses import dataclass, field
+from datetime import datetime
 
 
 @dataclass(frozen=True)
@@ -25,4 +26,22 @@ class DocumentSharedEvent:
     sender_avatar_url: str | None
     channel_id: int | None
     message_id: int | None
-    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat)
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+
+@dataclass(frozen=True)
+class DocumentCreated:
+    """Event published after a document was uploaded to the board"""
+    document_id: int
+    owner_id: int
+    file_size: int | None
+    file_path: str
+
+
+@dataclass(frozen=True)
+class DocumentDeleted:
+    """Event published after a document was removed from the board"""
+    document_id: int
+    owner_id: int
+    file_size: int | None
+    file_path: str
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 from sqlalchemy import String, Integer, ForeignKey, DateTime, Enum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.database import Base
@@ -18,6 +19,7 @@ class Document(Base):
     description: Mapped[str] = mapped_column(String(1000), nullable=True)
     file_path: Mapped[str] = mapped_column(String(512), nullable=False)
     file_size: Mapped[int] = mapped_column(Integer, nullable=True)
+    blob_sha256: Mapped[Optional[str]] = mapped_column(ForeignKey("blobs.sha256"), nullable=True, index=True)  # Content in the blob store
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
 
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 import os
 import uuid
 import logging
@@ -8,7 +8,8 @@ import logging
 logger = logging.getLogger(__name__)
 
 from app.core.database import get_db
-from app.modules.auth.router import get_current_user
+from app.modules.auth.router import get_current_user, get_current_principal
+from app.modules.auth.token_cache import AuthPrincipal
 from app.modules.auth.models import User
 from app.modules.board.schemas import (
     DocumentCreate, DocumentResponse, DocumentShareCreate, DocumentShareResponse
@@ -16,6 +17,8 @@ from app.modules.board.schemas import (
 from app.modules.board.service import BoardService
 from app.modules.chat.service import ChatService
 from app.core.config_service import ConfigService
+from app.core.blobs import blob_store
+from app.core.uploads import StoredUpload
 from app.modules.admin.service import SystemSettingService
 
 # Security Constants
@@ -30,7 +33,7 @@ async def upload_document(
     title: str,
     description: str = None,
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Upload a new document"""
@@ -44,17 +47,11 @@ async def upload_document(
     if extension not in allowed_extensions:
         raise HTTPException(status_code=400, detail=f"File type {extension} not allowed")
 
-    # Create directory if not exists
-    if not os.path.exists(UPLOAD_DIR):
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-    # Generate unique filename
+    # Generate unique filename (the content itself goes to the blob store)
     filename = f"{uuid.uuid4()}{extension}"
     file_path = f"{UPLOAD_DIR}/{filename}"
 
     # Save file with size limit check
-    size = 0
-    
     # Get max size from DB
     max_size_mb_str = await ConfigService.get_value(db, "max_upload_size_mb")
     try:
@@ -63,42 +60,21 @@ async def upload_document(
         max_size = MAX_FILE_SIZE
 
     try:
-        with open(file_path, "wb") as buffer:
-            for chunk in iter(lambda: file.file.read(8192), b""):
-                size += len(chunk)
-                if size > max_size:
-                    buffer.close()
-                    try:
-                        os.remove(file_path)
-                    except OSError as cleanup_err:
-                        logger.error(f"Failed to cleanup oversized file {file_path}: {cleanup_err}")
-                    raise HTTPException(status_code=413, detail=f"File too large (max {max_size_mb_str}MB)")
-                buffer.write(chunk)
+        stored = await blob_store.put(db, file, max_size)
     except HTTPException:
         raise
     except (OSError, IOError) as e:
         logger.error(f"File I/O error during upload: {e}")
-        # Cleanup partial file if it exists
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except OSError:
-                pass
         raise HTTPException(status_code=500, detail="Не удалось сохранить файл. Проверьте права доступа к диску.")
     except Exception as e:
         logger.error(f"Unexpected error during file upload: {e}")
-        # Cleanup partial file if it exists
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except OSError:
-                pass
         raise HTTPException(status_code=500, detail="Произошла ошибка при загрузке файла. Попробуйте еще раз.")
 
     # Save to DB (internal path without leading slash for easier local handling)
     doc_data = DocumentCreate(title=title, description=description)
     document = await BoardService.create_document(
-        db, doc_data, file_path=file_path, owner_id=current_user.id, file_size=size
+        db, doc_data, file_path=file_path, owner_id=current_user.id,
+        file_size=stored.size, blob_sha256=stored.sha256
     )
     return document
 
@@ -116,7 +92,7 @@ mimetypes.add_type('application/vnd.ms-excel', '.xls')
 async def get_document_file(
     request: Request,
     doc_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Securely serve a document file if authorized"""
@@ -150,7 +126,10 @@ async def get_document_file(
 
     # Secure path validation - prevents path traversal
     try:
-        safe_path = safe_file_path(document.file_path, UPLOAD_DIR)
+        if document.blob_sha256:
+            safe_path = blob_store.path(document.blob_sha256)
+        else:
+            safe_path = safe_file_path(document.file_path, UPLOAD_DIR)
     except HTTPException:
         raise
     except Exception as e:
@@ -161,7 +140,7 @@ async def get_document_file(
         raise HTTPException(status_code=404, detail="File not found on disk")
 
     # Determine filename and media type
-    mime_type, _ = mimetypes.guess_type(safe_path)
+    mime_type, _ = mimetypes.guess_type(document.file_path)
     if not mime_type:
         mime_type = "application/octet-stream"
         
@@ -181,12 +160,14 @@ async def get_document_file(
         safe_path,
         filename=download_filename if is_download else None,
         media_type=mime_type,
-        content_disposition=content_disposition
+        content_disposition=content_disposition,
+        request=request,
+        content_hash=document.blob_sha256
     )
 
 @router.get("/documents/owned", response_model=List[DocumentResponse])
 async def get_my_documents(
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get documents owned by current user"""
@@ -194,7 +175,7 @@ async def get_my_documents(
 
 @router.get("/documents/received", response_model=List[DocumentShareResponse])
 async def get_received_documents(
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get documents shared with current user"""
@@ -305,15 +286,11 @@ async def _validate_file_and_channel(
     return allowed_extensions
 
 
-async def _save_uploaded_file(file: UploadFile, extension: str, db: AsyncSession) -> tuple[str, int]:
-    """Save uploaded file and return file path and size"""
-    if not os.path.exists(UPLOAD_DIR):
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-
+async def _save_uploaded_file(file: UploadFile, extension: str, db: AsyncSession) -> tuple[str, StoredUpload]:
+    """Store uploaded file and return its file path and stored content"""
     filename = f"{uuid.uuid4()}{extension}"
     file_path = f"{UPLOAD_DIR}/{filename}"
 
-    size = 0
     max_size_mb_str = await ConfigService.get_value(db, "max_upload_size_mb")
     try:
         max_size = int(max_size_mb_str) * 1024 * 1024
@@ -321,20 +298,13 @@ async def _save_uploaded_file(file: UploadFile, extension: str, db: AsyncSession
         max_size = MAX_FILE_SIZE
 
     try:
-        with open(file_path, "wb") as buffer:
-            for chunk in iter(lambda: file.file.read(8192), b""):
-                size += len(chunk)
-                if size > max_size:
-                    buffer.close()
-                    os.remove(file_path)
-                    raise HTTPException(status_code=413, detail=f"File too large (max {max_size_mb_str}MB)")
-                buffer.write(chunk)
+        stored = await blob_store.put(db, file, max_size)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="Could not save file")
     
-    return file_path, size
+    return file_path, stored
 
 
 async def _share_document_with_recipients(
@@ -379,35 +349,32 @@ async def _post_document_to_channel(
         "created_at": msg.created_at.isoformat()
     })
     
-    member_ids = await ChatService.get_channel_member_ids(db, channel_id)
-    for m_id in member_ids:
-        if m_id == current_user.id:
-            continue
-        
-        await manager.broadcast_to_user(m_id, {
-            "type": "new_message",
-            "channel_id": channel_id,
-            "message": {
-                "id": msg.id,
-                "content": msg.content,
-                "sender_id": current_user.id,
-                "sender_name": current_user.full_name or current_user.username,
-                "created_at": msg.created_at.isoformat(),
-                "document_id": document.id,
-                "document_title": document.title,
-                "file_path": document.file_path
-            }
-        })
-        
-        await manager.broadcast_to_user(m_id, {
-            "type": "document_shared",
+    recipient_ids = await ChatService.get_notification_recipient_ids(
+        db, channel_id, exclude_user_id=current_user.id
+    )
+    await manager.broadcast_to_users(recipient_ids, {
+        "type": "new_message",
+        "channel_id": channel_id,
+        "message": {
+            "id": msg.id,
+            "content": msg.content,
+            "sender_id": current_user.id,
+            "sender_name": current_user.full_name or current_user.username,
+            "created_at": msg.created_at.isoformat(),
             "document_id": document.id,
-            "channel_id": channel_id,
-            "title": document.title,
-            "owner_name": current_user.full_name or current_user.username,
-            "created_at": document.created_at.isoformat(),
+            "document_title": document.title,
             "file_path": document.file_path
-        })
+        }
+    })
+    await manager.broadcast_to_users(recipient_ids, {
+        "type": "document_shared",
+        "document_id": document.id,
+        "channel_id": channel_id,
+        "title": document.title,
+        "owner_name": current_user.full_name or current_user.username,
+        "created_at": document.created_at.isoformat(),
+        "file_path": document.file_path
+    })
 
 
 async def _send_document_via_dms(
@@ -491,11 +458,12 @@ async def upload_and_share_document(
     await _validate_file_and_channel(file, channel_id, current_user, db)
     
     extension = os.path.splitext(file.filename)[1].lower()
-    file_path, size = await _save_uploaded_file(file, extension, db)
+    file_path, stored = await _save_uploaded_file(file, extension, db)
 
     doc_data = DocumentCreate(title=title, description=description)
     document = await BoardService.create_document(
-        db, doc_data, file_path=file_path, owner_id=current_user.id, file_size=size
+        db, doc_data, file_path=file_path, owner_id=current_user.id,
+        file_size=stored.size, blob_sha256=stored.sha256
     )
 
     await _share_document_with_recipients(db, document, r_ids, current_user.id)
@@ -510,7 +478,7 @@ async def upload_and_share_document(
 @router.delete("/documents/{doc_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_document(
     doc_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a document"""
@@ -521,10 +489,10 @@ async def delete_document(
     if document.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this document")
 
-    # Delete file
+    # Delete file (blob-backed content is released by the service)
     # Remove leading slash for os.remove
     file_path_sys = document.file_path.lstrip("/")
-    if os.path.exists(file_path_sys):
+    if not document.blob_sha256 and os.path.exists(file_path_sys):
         try:
             os.remove(file_path_sys)
         except OSError:
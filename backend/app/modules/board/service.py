@@ -2,23 +2,37 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from typing import List, Optional
+from app.modules.auth.models import User
 from app.modules.board.models import Document, DocumentShare
 from app.modules.board.schemas import DocumentCreate
-from app.modules.board.events import DocumentSharedEvent
+from app.modules.board.events import DocumentSharedEvent, DocumentCreated, DocumentDeleted
+from app.core.blobs import blob_store
+from app.core.events import event_bus
 
 class BoardService:
     @staticmethod
-    async def create_document(db: AsyncSession, doc_data: DocumentCreate, file_path: str, owner_id: int, file_size: Optional[int] = None) -> Document:
+    async def create_document(
+        db: AsyncSession,
+        doc_data: DocumentCreate,
+        file_path: str,
+        owner_id: int,
+        file_size: Optional[int] = None,
+        blob_sha256: Optional[str] = None
+    ) -> Document:
         document = Document(
             title=doc_data.title,
             description=doc_data.description,
             file_path=file_path,
             file_size=file_size,
+            blob_sha256=blob_sha256,
             owner_id=owner_id
         )
         db.add(document)
         await db.commit()
         await db.refresh(document)
+        await event_bus.publish(DocumentCreated(
+            document_id=document.id, owner_id=owner_id, file_size=file_size, file_path=file_path
+        ))
         return document
 
     @staticmethod
@@ -137,7 +151,6 @@ class BoardService:
         share = result.scalars().first()
 
         # Publish event for chat module to handle
-        from app.core.events import event_bus
         from datetime import datetime
         event = DocumentSharedEvent(
             document_id=document_id,
@@ -164,9 +177,20 @@ class BoardService:
         if not document:
             return False
             
+        await blob_store.release(db, document.blob_sha256)
         await db.delete(document)
         await db.commit()
+        await event_bus.publish(BoardService.deleted_event(document))
         return True
+    
+    @staticmethod
+    def deleted_event(document: Document) -> DocumentDeleted:
+        return DocumentDeleted(
+            document_id=document.id,
+            owner_id=document.owner_id,
+            file_size=document.file_size,
+            file_path=document.file_path
+        )
 
     @staticmethod
     async def get_document_share(db: AsyncSession, document_id: int, recipient_id: int) -> Optional[DocumentShare]:
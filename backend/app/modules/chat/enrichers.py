@@ -1,10 +1,10 @@
 """Response enrichers for chat module"""
-from sqlalchemy import select, func
+from sqlalchemy import select, func, case
 from sqlalchemy.orm import defer
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import Dict, List, Optional
 
-from app.modules.chat.models import Channel, Message, ChannelMember
+from app.modules.chat.models import Channel, ChannelMember
 from app.modules.chat.schemas import ChannelResponse, LastMessageInfo, UserBasicInfo
 from app.modules.chat.service import ChatService
 from app.modules.auth.models import User
@@ -37,7 +37,7 @@ async def enrich_channel(db: AsyncSession, channel: Channel, current_user_id: in
     
     if member:
         resp.last_read_message_id = member.last_read_message_id
-        resp.unread_count = await ChatService.get_unread_count(db, channel.id, current_user_id)
+        resp.unread_count = member.unread_count
     
     # Get max last_read_message_id from others
     others_read_stmt = select(func.max(ChannelMember.last_read_message_id)).where(
@@ -95,26 +95,22 @@ async def enrich_last_message(
     channel: Channel,
     resp: ChannelResponse
 ) -> ChannelResponse:
-    """Enrich channel with last message preview"""
-    last_msg_stmt = select(Message).where(Message.channel_id == channel.id).order_by(Message.id.desc()).limit(1)
-    last_msg_result = await db.execute(last_msg_stmt)
-    last_msg: Optional[Message] = last_msg_result.scalar_one_or_none()
-    
-    if last_msg:
-        sender_stmt = select(User).options(defer(User.hashed_password)).where(User.id == last_msg.user_id)
-        sender_result = await db.execute(sender_stmt)
-        sender: Optional[User] = sender_result.scalar_one_or_none()
-        
-        resp.last_message = LastMessageInfo(
-            id=last_msg.id,
-            content=last_msg.content[:100] if last_msg.content else "",
-            sender_name=sender.full_name or sender.username if sender else "Unknown",
-            created_at=last_msg.created_at
-        )
-    
+    """Enrich channel with last message preview (denormalized on the channel row)"""
+    resp.last_message = _last_message_info(channel)
     return resp
 
 
+def _last_message_info(channel: Channel) -> Optional[LastMessageInfo]:
+    if channel.last_message_id is None:
+        return None
+    return LastMessageInfo(
+        id=channel.last_message_id,
+        content=channel.last_message_preview or "",
+        sender_name=channel.last_sender_name or "Unknown",
+        created_at=channel.last_message_at
+    )
+
+
 async def enrich_channel_settings(
     db: AsyncSession,
     channel: Channel,
@@ -145,3 +141,115 @@ async def enrich_channel_settings(
         resp.mute_until = result.scalar()
     
     return resp
+
+
+async def enrich_channels(db: AsyncSession, channels: List[Channel], current_user_id: int) -> List[ChannelResponse]:
+    """
+    Batched variant of enrich_channel for channel lists.
+
+    Builds every ChannelResponse from a fixed number of grouped queries,
+    independent of how many channels are passed in.
+    """
+    if not channels:
+        return []
+
+    channel_ids = [c.id for c in channels]
+    direct_ids = [c.id for c in channels if c.is_direct]
+    online_user_ids = set(manager.get_online_user_ids())
+
+    # Member counts and others' max read id
+    stats_stmt = (
+        select(
+            ChannelMember.channel_id,
+            func.count(ChannelMember.id),
+            func.max(case(
+                (ChannelMember.user_id != current_user_id, ChannelMember.last_read_message_id),
+                else_=None
+            ))
+        )
+        .where(ChannelMember.channel_id.in_(channel_ids))
+        .group_by(ChannelMember.channel_id)
+    )
+    stats: Dict[int, tuple] = {
+        row[0]: (row[1], row[2]) for row in await db.execute(stats_stmt)
+    }
+
+    # Online members per channel
+    online_counts: Dict[int, int] = {}
+    if online_user_ids:
+        online_stmt = (
+            select(ChannelMember.channel_id, func.count(func.distinct(ChannelMember.user_id)))
+            .where(
+                ChannelMember.channel_id.in_(channel_ids),
+                ChannelMember.user_id.in_(online_user_ids)
+            )
+            .group_by(ChannelMember.channel_id)
+        )
+        online_counts = {row[0]: row[1] for row in await db.execute(online_stmt)}
+
+    # Current user's membership rows (read pointer, unread counter, pin, mute)
+    member_stmt = select(ChannelMember).where(
+        ChannelMember.channel_id.in_(channel_ids),
+        ChannelMember.user_id == current_user_id
+    )
+    memberships: Dict[int, ChannelMember] = {}
+    for member in (await db.execute(member_stmt)).scalars():
+        memberships.setdefault(member.channel_id, member)
+
+
+    # Other participant of each direct channel
+    dm_peers: Dict[int, User] = {}
+    if direct_ids:
+        peer_stmt = (
+            select(ChannelMember.channel_id, User)
+            .join(User, User.id == ChannelMember.user_id)
+            .options(defer(User.hashed_password))
+            .where(
+                ChannelMember.channel_id.in_(direct_ids),
+                User.id != current_user_id
+            )
+        )
+        for channel_id, user in await db.execute(peer_stmt):
+            dm_peers.setdefault(channel_id, user)
+
+    responses = []
+    for channel in channels:
+        resp = ChannelResponse.from_orm(channel)
+
+        members_count, others_read_id = stats.get(channel.id, (0, None))
+        resp.members_count = members_count or 0
+        resp.others_read_id = others_read_id or 0
+        resp.online_count = online_counts.get(channel.id, 0)
+
+        member = memberships.get(channel.id)
+        if member:
+            resp.last_read_message_id = member.last_read_message_id
+            resp.unread_count = member.unread_count
+
+        if channel.is_direct:
+            other_user = dm_peers.get(channel.id)
+            if other_user:
+                resp.display_name = other_user.full_name or other_user.username
+                user_info = UserBasicInfo.from_orm(other_user)
+                user_info.is_online = other_user.id in online_user_ids
+                resp.other_user = user_info
+            else:
+                resp.display_name = "Self" if channel.created_by == current_user_id else "Unknown"
+        else:
+            resp.display_name = channel.name
+
+        resp.last_message = _last_message_info(channel)
+
+        if hasattr(channel, 'is_pinned'):
+            resp.is_pinned = channel.is_pinned
+        else:
+            resp.is_pinned = member.is_pinned if member else False
+
+        if hasattr(channel, 'mute_until'):
+            resp.mute_until = channel.mute_until
+        else:
+            resp.mute_until = member.mute_until if member else None
+
+        responses.append(resp)
+
+    return responses
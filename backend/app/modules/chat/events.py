@@ -3,11 +3,6 @@ from dataclasses import dataclass, field
 from datetime import datetime
 
 
-@dataclass
-class Event:
-    pass
-
-
 @dataclass(frozen=True)
 class MessageCreated(Event):
     message_id: int
@@ -15,4 +10,13 @@ class MessageCreated(Event):
     user_id: int
     content: str
     document_id: int | None = None
-    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat)
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+
+@dataclass(frozen=True)
+class MessageDeleted(Event):
+    message_id: int
+    channel_id: int
+    user_id: int
+    created_at: str
+    reply_count: int = 0
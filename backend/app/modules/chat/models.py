@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, DateTime, ForeignKey, Integer, Text, UniqueConstraint
+from sqlalchemy import String, DateTime, ForeignKey, Integer, Text, UniqueConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship, backref
 from app.core.database import Base
 
@@ -20,6 +20,12 @@ class Channel(Base):
         onupdate=datetime.utcnow,
         nullable=False
     )
+    
+    # Denormalized last message preview, maintained by ChatService on create/delete
+    last_message_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    last_message_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_sender_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    last_message_preview: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
 
 
 class Message(Base):
@@ -32,12 +38,19 @@ class Message(Base):
     parent_id: Mapped[Optional[int]] = mapped_column(ForeignKey("messages.id"), nullable=True, index=True)
     content: Mapped[str] = mapped_column(Text, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # Denormalized number of direct replies, maintained by ChatService on create/delete
+    reply_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
     
     document = relationship("Document")
     user = relationship("app.modules.auth.models.User")
     reactions = relationship("MessageReaction", cascade="all, delete-orphan")
     replies = relationship("Message", backref=backref("parent", remote_side=[id]), cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination of channel history: WHERE channel_id = ? AND id < ? ORDER BY id DESC
+        Index("ix_messages_channel_id_id", "channel_id", "id"),
+    )
+
 
 class ChannelMember(Base):
     __tablename__ = "channel_members"
@@ -47,6 +60,8 @@ class ChannelMember(Base):
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
     joined_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     last_read_message_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # Messages after last_read_message_id, maintained by ChatService on create/delete/read
+    unread_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
     is_pinned: Mapped[bool] = mapped_column(default=False, nullable=False, index=True)
     mute_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
@@ -1,20 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect, Query
 import logging
 import os
-from sqlalchemy.exc import SQLAlchemyError
 
 logger = logging.getLogger(__name__)
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload, defer
+from sqlalchemy.orm import defer
 from typing import List, Optional
 
-from app.core.database import get_db, AsyncSessionLocal
-from app.core.security import decode_access_token
+from app.core.database import get_db, get_read_db, AsyncSessionLocal
 from app.core.file_security import safe_file_operation
 from app.core.rate_limit import rate_limit_chat_message
-from app.modules.auth.router import get_current_user
+from app.modules.auth.router import get_current_user, get_current_principal
+from app.modules.auth.token_cache import AuthPrincipal, verify_token
 from app.modules.auth.models import User
 from app.modules.auth.service import UserService
 from app.modules.chat.schemas import (
@@ -32,7 +31,8 @@ from app.modules.admin.service import SystemSettingService
 from app.modules.chat.models import ChannelMember, Channel, Message
 from app.modules.chat.websocket import manager
 from app.modules.chat.validators import sanitize_message_content, validate_emoji, parse_mentions
-from app.modules.chat.enrichers import enrich_channel
+from app.modules.chat.enrichers import enrich_channel, enrich_channels
+from app.core.events import event_bus
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
@@ -40,7 +40,7 @@ router = APIRouter(prefix="/chat", tags=["Chat"])
 @router.post("/channels/{channel_id}/read")
 async def mark_channel_as_read(
     channel_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Mark all messages in a channel as read for current user"""
@@ -57,10 +57,20 @@ async def mark_channel_as_read(
     return {"status": "success", "last_read_message_id": last_id}
 
 
+@router.get("/unread")
+async def get_unread_counts(
+    current_user: AuthPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Unread counters of all channels of the current user (for badge refresh)"""
+    counts = await ChatService.get_unread_counts(db, current_user.id)
+    return {"channels": counts, "total": sum(counts.values())}
+
+
 @router.post("/channels", response_model=ChannelResponse, status_code=status.HTTP_201_CREATED)
 async def create_channel(
     channel_data: ChannelCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new channel"""
@@ -97,18 +107,18 @@ async def create_channel(
 
 @router.get("/channels", response_model=List[ChannelResponse])
 async def get_my_channels(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: AuthPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all channels for current user"""
     channels = await ChatService.get_user_channels(db, current_user.id)
-    return [await enrich_channel(db, c, current_user.id) for c in channels]
+    return await enrich_channels(db, channels, current_user.id)
 
 
 @router.get("/channels/{channel_id}", response_model=ChannelResponse)
 async def get_channel(
     channel_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get a specific channel"""
@@ -142,16 +152,25 @@ async def get_channel_messages(
     channel_id: int,
     limit: Optional[int] = Query(None, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    before_id: Optional[int] = Query(None, ge=1, description="Сообщения старше указанного ID"),
+    after_id: Optional[int] = Query(None, ge=0, description="Сообщения новее указанного ID"),
+    around_id: Optional[int] = Query(None, ge=1, description="Сообщения вокруг указанного ID (переход к сообщению)"),
+    current_user: AuthPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
+    """
+    Get channel history in chronological order.
+    Use before_id/after_id cursors for scrolling and around_id to jump to a message.
+    """
+    if sum(cursor is not None for cursor in (before_id, after_id, around_id)) > 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Укажите только один из параметров before_id, after_id, around_id"
+        )
+
     # Determine limit
     if limit is None:
-        setting_val = await ConfigService.get_value(db, "chat_page_size")
-        try:
-            limit = int(setting_val)
-        except (ValueError, TypeError):
-            limit = 50
+        limit = await ConfigService.get_int(db, "chat_page_size", 50)
             
     # Check if user is a member
     is_member = await ChatService.is_user_member(db, channel_id, current_user.id)
@@ -161,15 +180,19 @@ async def get_channel_messages(
             raise HTTPException(status_code=404, detail="Чат не найден")
         
         if not channel.is_direct:
-            # Auto-join public channel
-            await ChatService.add_member(db, channel_id, current_user.id)
+            # Auto-join public channel (db may be a read replica)
+            async with AsyncSessionLocal() as write_db:
+                await ChatService.add_member(write_db, channel_id, current_user.id)
         else:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Вы не являетесь участником этого канала"
             )
 
-    messages = await ChatService.get_channel_messages(db, channel_id, limit, offset)
+    messages = await ChatService.get_channel_messages(
+        db, channel_id, limit, offset,
+        before_id=before_id, after_id=after_id, around_id=around_id
+    )
 
     # Batch load users and documents to avoid N+1 queries
     user_ids = {msg.user_id for msg in messages if msg.user_id}
@@ -238,8 +261,8 @@ async def get_channel_messages(
 @router.get("/messages/{message_id}/replies", response_model=List[MessageWithUser])
 async def get_message_replies(
     message_id: int,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: AuthPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get replies for a specific message thread"""
     # Check if user has access to the channel of the parent message
@@ -320,7 +343,7 @@ async def get_message_replies(
 @router.post("/channels/{channel_id}/pin")
 async def toggle_pin_channel(
     channel_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Toggle channel pinning for current user"""
@@ -332,7 +355,7 @@ async def toggle_pin_channel(
 async def mute_channel(
     channel_id: int,
     mute_until: Optional[str] = Query(None, description="ISO format datetime string, or null to unmute"),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Mute notifications for a channel until a specific time"""
@@ -401,7 +424,7 @@ async def add_reaction(
 async def remove_reaction(
     message_id: int,
     emoji: str = Query(...),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Remove a reaction from a message"""
@@ -430,8 +453,8 @@ async def remove_reaction(
 @router.get("/channels/{channel_id}/members", response_model=List[UserBasicInfo])
 async def get_channel_members(
     channel_id: int,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: AuthPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all members of a channel"""
     # Check if user is a member
@@ -462,6 +485,30 @@ async def get_channel_members(
     return result
 
 
+async def _authenticate_user_socket(token: str) -> Optional[AuthPrincipal]:
+    """Validate token, account state and connection limit before accepting a user socket"""
+    try:
+        # Served from the token cache on reconnects
+        async with AsyncSessionLocal() as db:
+            user = await verify_token(db, token)
+        if user is None:
+            logger.warning("Invalid token or unknown user, rejecting connection")
+            return None
+        if not user.is_active:
+            logger.warning(f"User {user.id} is inactive, rejecting connection")
+            return None
+        
+        # Check connection limit BEFORE accepting
+        existing_connections = len(manager.user_connections.get(user.id, []))
+        if existing_connections >= 5:
+            logger.warning(f"User {user.id} has too many connections ({existing_connections}), rejecting")
+            return None
+        return user
+    except Exception as e:
+        logger.error(f"Pre-authentication error: {e}")
+        return None
+
+
 @router.websocket("/ws/user")
 @router.websocket("/ws/user")
 async def user_websocket_endpoint(
@@ -472,35 +519,10 @@ async def user_websocket_endpoint(
     import asyncio
     
     # STEP 1: Authenticate BEFORE accepting connection
-    try:
-        payload = decode_access_token(token)
-        if not payload:
-            logger.warning("Invalid token, rejecting connection")
-            return
-        
-        user_id_str = payload.get("sub")
-        if not user_id_str:
-            logger.warning("No user_id in token, rejecting connection")
-            return
-        
-        user_id = int(user_id_str)
-
-        # Check if user is active and connection limit
-        async with AsyncSessionLocal() as db:
-            user_result = await db.execute(select(User).where(User.id == user_id))
-            user = user_result.scalar_one_or_none()
-            if not user or not user.is_active:
-                logger.warning(f"User {user_id} is inactive or not found, rejecting connection")
-                return
-            
-            # Check connection limit BEFORE accepting
-            existing_connections = len(manager.user_connections.get(user_id, []))
-            if existing_connections >= 5:
-                logger.warning(f"User {user_id} has too many connections ({existing_connections}), rejecting")
-                return
-    except Exception as e:
-        logger.error(f"Pre-authentication error: {e}")
+    user = await _authenticate_user_socket(token)
+    if user is None:
         return
+    user_id = user.id
     
     # STEP 2: Now accept the connection (only if all checks passed)
     try:
@@ -512,30 +534,9 @@ async def user_websocket_endpoint(
     
     # STEP 3: Add to user_connections
     try:
-        is_first_connection = user_id not in manager.user_connections
-        if is_first_connection:
-            manager.user_connections[user_id] = []
-        manager.user_connections[user_id].append(websocket)
-        
-        # Update last_seen in DB immediately & broadcast online status
-        if is_first_connection:
-            try:
-                async with AsyncSessionLocal() as db_session:
-                    from sqlalchemy import update
-                    from datetime import datetime
-                    await db_session.execute(
-                        update(User).where(User.id == user_id).values(last_seen=datetime.utcnow())
-                    )
-                    await db_session.commit()
-                    
-                await manager.broadcast_to_all_users({
-                    "type": "user_presence",
-                    "user_id": user_id,
-                    "status": "online"
-                })
-            except Exception as e:
-                logger.error(f"Error in connection setup side-effects for user {user_id}: {e}")
-                
+        await manager.register_user_connection(websocket, user_id)
+        # Online diff follows on the next presence flush, last_seen is written behind
+        manager.presence.touch(user_id)
     except Exception as e:
         logger.error(f"Critical error in WebSocket setup for user {user_id}: {e}")
         try:
@@ -552,7 +553,7 @@ async def user_websocket_endpoint(
                 await asyncio.wait_for(websocket.receive_text(), timeout=45.0)
             except asyncio.TimeoutError:
                 try:
-                    await websocket.send_json({"type": "ping"})
+                    await manager.send_personal(websocket, {"type": "ping"})
                 except Exception:
                     break
             except WebSocketDisconnect:
@@ -561,20 +562,244 @@ async def user_websocket_endpoint(
         logger.error(f"User {user_id} WebSocket error: {e}")
     finally:
         await manager.disconnect_user(websocket, user_id)
-        # Final last_seen update on disconnect
-        try:
-            async with AsyncSessionLocal() as db:
-                from datetime import datetime
-                from sqlalchemy import update
-                await db.execute(
-                    update(User).where(User.id == user_id).values(last_seen=datetime.utcnow())
-                )
-                await db.commit()
-        except (SQLAlchemyError, Exception) as db_err:
-            logger.error(f"Error updating last_seen on disconnect: {db_err}")
         logger.info(f"Cleaned up connection for user {user_id}")
 
 
+async def _join_channels(websocket: WebSocket, user_id: int, channel_ids: List[int]) -> tuple[List[int], List[int]]:
+    """
+    Subscribe a multiplexed socket to channels the user may read.
+    Membership for all requested channels is checked with one query;
+    public channels are auto-joined like on the per-channel endpoint.
+    """
+    async with AsyncSessionLocal() as db:
+        member_result = await db.execute(
+            select(ChannelMember.channel_id).where(
+                ChannelMember.user_id == user_id,
+                ChannelMember.channel_id.in_(channel_ids)
+            )
+        )
+        allowed = set(member_result.scalars().all())
+        
+        missing = [cid for cid in channel_ids if cid not in allowed]
+        if missing:
+            channel_result = await db.execute(
+                select(Channel.id).where(Channel.id.in_(missing), Channel.is_direct == False)
+            )
+            for public_id in channel_result.scalars().all():
+                # Auto-join public channel
+                await ChatService.add_member(db, public_id, user_id)
+                allowed.add(public_id)
+    
+    joined = [cid for cid in channel_ids if cid in allowed]
+    for cid in joined:
+        if not manager.is_joined(websocket, cid):
+            await manager.join_channel(websocket, cid, user_id)
+    return joined, [cid for cid in channel_ids if cid not in allowed]
+
+
+@router.websocket("/ws")
+async def multiplexed_websocket_endpoint(
+    websocket: WebSocket,
+    token: str = Query(...),
+):
+    """
+    Single WebSocket per client for notifications and any number of channels.
+    
+    Control frames:
+    - {"type": "subscribe", "channel_ids": [...]} -> {"type": "subscribed", "channel_ids": [...], "denied": [...]}
+    - {"type": "unsubscribe", "channel_ids": [...]} -> {"type": "unsubscribed", "channel_ids": [...]}
+    
+    Typing indicators and new messages are sent as on /ws/{channel_id} with an
+    extra "channel_id" field. Channel frames delivered to the client carry
+    "channel_id" and "scope": "channel"; user notifications have no scope.
+    The per-channel endpoint remains available for older clients.
+    """
+    import asyncio
+    import json
+    
+    principal = await _authenticate_user_socket(token)
+    if principal is None:
+        return
+    user_id = principal.id
+
+    # Sender profile (name, rank, avatar) is loaded once and reused for every channel frame
+    async with AsyncSessionLocal() as db:
+        user_result = await db.execute(select(User).where(User.id == user_id))
+        user = user_result.scalar_one_or_none()
+    if not user or not user.is_active:
+        return
+
+    try:
+        await websocket.accept()
+    except Exception as e:
+        logger.error(f"Failed to accept WebSocket connection: {e}")
+        return
+
+    try:
+        await manager.connect_multiplexed(websocket, user_id)
+        manager.presence.touch(user_id)
+        
+        while True:
+            try:
+                raw = await asyncio.wait_for(websocket.receive_text(), timeout=45.0)
+            except asyncio.TimeoutError:
+                await manager.send_personal(websocket, {"type": "ping"})
+                continue
+            
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                continue
+            if not isinstance(data, dict):
+                continue
+            
+            frame_type = data.get("type")
+            if frame_type in ("subscribe", "unsubscribe"):
+                try:
+                    channel_ids = list(dict.fromkeys(int(cid) for cid in data.get("channel_ids", [])))
+                except (ValueError, TypeError):
+                    continue
+                
+                if frame_type == "subscribe":
+                    joined, denied = await _join_channels(websocket, user_id, channel_ids) if channel_ids else ([], [])
+                    await manager.send_personal(websocket, {
+                        "type": "subscribed",
+                        "channel_ids": joined,
+                        "denied": denied
+                    })
+                else:
+                    for cid in channel_ids:
+                        await manager.disconnect(websocket, cid, user_id)
+                    await manager.send_personal(websocket, {
+                        "type": "unsubscribed",
+                        "channel_ids": channel_ids
+                    })
+                continue
+            
+            try:
+                channel_id = int(data.get("channel_id"))
+            except (ValueError, TypeError):
+                continue
+            if not manager.is_joined(websocket, channel_id):
+                await manager.send_personal(websocket, {
+                    "type": "error",
+                    "channel_id": channel_id,
+                    "message": "Вы не подписаны на этот канал"
+                })
+                continue
+            
+            await _handle_channel_frame(websocket, channel_id, user, data)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"User {user_id} multiplexed WebSocket error: {e}")
+    finally:
+        await manager.disconnect_multiplexed(websocket, user_id)
+
+
+async def _handle_channel_frame(websocket: WebSocket, channel_id: int, user: User, data: dict) -> None:
+    """Handle a typing indicator or new chat message received for a channel"""
+    user_id = user.id
+    
+    # Handle typing indicator
+    if data.get("type") == "typing":
+        await manager.broadcast_to_channel(channel_id, {
+            "type": "typing",
+            "user_id": user_id,
+            "username": user.username,
+            "full_name": user.full_name,
+            "is_typing": data.get("is_typing", True)
+        }, exclude_websocket=websocket)
+        return
+
+    content = data.get("content", "").strip()
+    document_id = data.get("document_id")
+    parent_id = data.get("parent_id")
+
+    # Sanitize content
+    if content:
+        content = sanitize_message_content(content)
+
+    if not content and not document_id:
+        return
+
+    # Single session for the whole write path: limits, mentions, insert, context
+    async with AsyncSessionLocal() as db:
+        # Check message length
+        max_len = await ConfigService.get_int(db, "chat_max_message_length", 4000)
+
+        if len(content) > max_len:
+            await manager.send_personal(websocket, {
+                "type": "error", 
+                "message": f"Сообщение слишком длинное. Максимум {max_len} символов."
+            })
+            return
+
+        # Rate limiting check
+        if not await rate_limit_chat_message(user_id, db):
+            await manager.send_personal(websocket, {
+                "type": "error", 
+                "message": "Слишком много сообщений. Пожалуйста, подождите."
+            })
+            return
+
+        # Save message together with mentions, parent/document info and member list
+        message_data = MessageCreate(
+            channel_id=channel_id, 
+            content=content, 
+            document_id=document_id,
+            parent_id=parent_id
+        )
+        message, context = await ChatService.post_message(
+            db, message_data, user_id, mentioned_usernames=parse_mentions(content)
+        )
+
+    mentioned_user_ids = context["mentioned_user_ids"]
+
+    # Broadcast to all connected clients in the channel WebSocket
+    await manager.broadcast_to_channel(channel_id, {
+        "type": "new_message",
+        "id": message.id,
+        "channel_id": message.channel_id,
+        "user_id": message.user_id,
+        "username": user.username,
+        "full_name": user.full_name,
+        "rank": user.rank,
+        "role": user.role,
+        "avatar_url": user.avatar_url,
+        "content": message.content,
+        "document_id": message.document_id,
+        "parent_id": message.parent_id,
+        "parent": context["parent_info"],
+        **context["doc_info"],
+        "created_at": message.created_at.isoformat(),
+        "mentions": mentioned_user_ids,
+        "reply_count": 0
+    })
+
+    # Also notify channel members via global WebSocket (sender and muted members excluded)
+    # This notifies users who are not currently viewing the channel
+    notification = {
+        "type": "new_message",
+        "channel_id": channel_id,
+        "channel_name": context["channel_name"],
+        "is_direct": context["is_direct"],
+        "is_mentioned": False,
+        "message": {
+            "id": message.id,
+            "content": message.content[:100],  # Truncate for notification
+            "sender_id": user_id,
+            "sender_name": user.full_name or user.username,
+            "created_at": message.created_at.isoformat()
+        }
+    }
+    mentioned = set(mentioned_user_ids)
+    recipients = context["recipient_ids"]
+    await manager.broadcast_to_users([m for m in recipients if m not in mentioned], notification)
+    await manager.broadcast_to_users(
+        [m for m in recipients if m in mentioned], {**notification, "is_mentioned": True}
+    )
+
 
 @router.websocket("/ws/{channel_id}")
 async def websocket_endpoint(
@@ -583,22 +808,15 @@ async def websocket_endpoint(
     token: str = Query(...),
 ):
     """WebSocket endpoint for real-time messaging"""
-    # Authenticate user
-    payload = decode_access_token(token)
-    if not payload:
-        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-        return
-    
-    user_id_str = payload.get("sub")
-    if not user_id_str:
-        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-        return
-    
-    # Convert to int (JWT stores sub as string)
-    user_id = int(user_id_str)
-    
     # Get DB session
     async with AsyncSessionLocal() as db:
+        # Authenticate user (token cache, falls back to a minimal user lookup)
+        principal = await verify_token(db, token)
+        if principal is None or not principal.is_active:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        user_id = principal.id
+        
         # Check if user is a member
         is_member = await ChatService.is_user_member(db, channel_id, user_id)
         if not is_member:
@@ -628,151 +846,7 @@ async def websocket_endpoint(
         while True:
             # Receive message
             data = await websocket.receive_json()
-            
-            # Handle typing indicator
-            if data.get("type") == "typing":
-                await manager.broadcast_to_channel(channel_id, {
-                    "type": "typing",
-                    "user_id": user_id,
-                    "username": user.username,
-                    "full_name": user.full_name,
-                    "is_typing": data.get("is_typing", True)
-                }, exclude_websocket=websocket)
-                continue
-                
-            content = data.get("content", "").strip()
-            document_id = data.get("document_id")
-            parent_id = data.get("parent_id")
-            
-            # Sanitize content
-            if content:
-                content = sanitize_message_content(content)
-            
-            if not content and not document_id:
-                continue
-            
-            # Check message length
-            async with AsyncSessionLocal() as db:
-                max_len_setting = await ConfigService.get_value(db, "chat_max_message_length")
-                try:
-                    max_len = int(max_len_setting)
-                except (ValueError, TypeError):
-                    max_len = 4000
-                    
-                if len(content) > max_len:
-                    await websocket.send_json({
-                        "type": "error", 
-                        "message": f"Сообщение слишком длинное. Максимум {max_len} символов."
-                    })
-                    continue
-
-                # Rate limiting check
-                if not await rate_limit_chat_message(user_id, db):
-                    await websocket.send_json({
-                        "type": "error", 
-                        "message": "Слишком много сообщений. Пожалуйста, подождите."
-                    })
-                    continue
-            
-            # Parse mentions
-            mentioned_usernames = parse_mentions(content)
-            mentioned_user_ids = []
-            
-            if mentioned_usernames:
-                async with AsyncSessionLocal() as db_session:
-                    mention_stmt = select(User).where(User.username.in_(mentioned_usernames))
-                    mention_result = await db_session.execute(mention_stmt)
-                    mentioned_users = mention_result.scalars().all()
-                    mentioned_user_ids = [u.id for u in mentioned_users]
-
-            # Save message to database
-            async with AsyncSessionLocal() as db:
-                message_data = MessageCreate(
-                    channel_id=channel_id, 
-                    content=content, 
-                    document_id=document_id,
-                    parent_id=parent_id
-                )
-                message = await ChatService.create_message(db, message_data, user_id, document_id=document_id)
-                
-                # Get channel info for notification
-                channel = await ChatService.get_channel_by_id(db, channel_id)
-                
-                # Get document info if exists
-                doc_info = {"is_document_deleted": False}
-                if document_id:
-                    from app.modules.board.models import Document
-                    doc_result = await db.execute(select(Document).where(Document.id == document_id))
-                    doc = doc_result.scalar_one_or_none()
-                    if doc:
-                        doc_info["document_title"] = doc.title
-                        doc_info["file_path"] = doc.file_path
-                    else:
-                        doc_info["is_document_deleted"] = True
-
-                # Get parent info if exists
-                parent_info = None
-                if message.parent_id:
-                    parent_msg_stmt = select(Message).options(selectinload(Message.user)).where(Message.id == message.parent_id)
-                    parent_result = await db.execute(parent_msg_stmt)
-                    parent_msg = parent_result.scalars().first()
-                    if parent_msg:
-                        parent_info = {
-                            "id": parent_msg.id,
-                            "content": parent_msg.content,
-                            "username": parent_msg.user.username if parent_msg.user else "Unknown",
-                            "full_name": parent_msg.user.full_name if parent_msg.user else None
-                        }
-
-                # Broadcast to all connected clients in the channel WebSocket
-                
-                # Use data from refreshed message.user
-                msg_user = message.user
-                
-                await manager.broadcast_to_channel(channel_id, {
-                    "type": "new_message",
-                    "id": message.id,
-                    "channel_id": message.channel_id,
-                    "user_id": message.user_id,
-                    "username": msg_user.username if msg_user else "Unknown",
-                    "full_name": msg_user.full_name if msg_user else None,
-                    "rank": msg_user.rank if msg_user else None,
-                    "role": msg_user.role if msg_user else "user",
-                    "avatar_url": msg_user.avatar_url if msg_user else None,
-                    "content": message.content,
-                    "document_id": message.document_id,
-                    "parent_id": message.parent_id,
-                    "parent": parent_info,
-                    **doc_info,
-                    "created_at": message.created_at.isoformat(),
-                    "mentions": mentioned_user_ids,
-                    "reply_count": 0
-                })
-                
-                # Also broadcast to all channel members via global WebSocket
-                # This notifies users who are not currently viewing the channel
-                member_ids = await ChatService.get_channel_member_ids(db, channel_id)
-                for member_id in member_ids:
-                    # Don't notify the sender
-                    if member_id == user_id:
-                        continue
-                    
-                    is_mentioned = member_id in mentioned_user_ids
-                    
-                    await manager.broadcast_to_user(member_id, {
-                        "type": "new_message",
-                        "channel_id": channel_id,
-                        "channel_name": channel.name if channel else None,
-                        "is_direct": channel.is_direct if channel else False,
-                        "is_mentioned": is_mentioned,
-                        "message": {
-                            "id": message.id,
-                            "content": message.content[:100],  # Truncate for notification
-                            "sender_id": user_id,
-                            "sender_name": user.full_name or user.username,
-                            "created_at": message.created_at.isoformat()
-                        }
-                    })
+            await _handle_channel_frame(websocket, channel_id, user, data)
     
     except WebSocketDisconnect:
         await manager.disconnect(websocket, channel_id, user_id)
@@ -785,7 +859,7 @@ async def websocket_endpoint(
 async def start_direct_message(
     user_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     """Start or get a direct message channel with another user"""
     # logger.debug(f"Starting DM: current_user={current_user.id} -> target_user={user_id}")
@@ -843,30 +917,25 @@ async def delete_channel(
             detail="Недостаточно прав для удаления этого чата"
         )
     
-    # Notify all members about the deletion
-    for member_id in member_ids:
-        # Don't notify the user who deleted the channel
-        if member_id == current_user.id:
-            continue
-        
-        await manager.broadcast_to_user(member_id, {
-            "type": "channel_deleted",
-            "channel_id": channel_id,
-            "channel_name": channel_name,
-            "is_direct": is_direct,
-            "deleted_by": {
-                "id": current_user.id,
-                "username": current_user.username,
-                "full_name": current_user.full_name
-            }
-        })
+    # Notify all members about the deletion (except the user who deleted the channel)
+    await manager.broadcast_to_users([m for m in member_ids if m != current_user.id], {
+        "type": "channel_deleted",
+        "channel_id": channel_id,
+        "channel_name": channel_name,
+        "is_direct": is_direct,
+        "deleted_by": {
+            "id": current_user.id,
+            "username": current_user.username,
+            "full_name": current_user.full_name
+        }
+    })
     
     return {"status": "success"}
 
 @router.delete("/messages/{message_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_message(
     message_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a message. Only the message author or admin can delete."""
@@ -895,9 +964,12 @@ async def delete_message(
             if document:
                 # Secure file deletion with path validation
                 try:
-                    safe_path = safe_file_operation(document.file_path, "uploads/documents")
-                    if os.path.exists(safe_path):
-                        os.remove(safe_path)
+                    if document.blob_sha256:
+                        await blob_store.release(db, document.blob_sha256)
+                    else:
+                        safe_path = safe_file_operation(document.file_path, "uploads/documents")
+                        if os.path.exists(safe_path):
+                            os.remove(safe_path)
                 except ValueError as e:
                     logger.error(f"Path traversal detected in document deletion: {e}")
                 except Exception as e:
@@ -905,6 +977,8 @@ async def delete_message(
                 
                 await db.delete(document)
                 await db.commit()
+                from app.modules.board.service import BoardService
+                await event_bus.publish(BoardService.deleted_event(document))
         except Exception as e:
             logger.error(f"Error deleting document: {e}")
     
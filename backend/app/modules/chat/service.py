@@ -1,11 +1,19 @@
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
-from sqlalchemy import select, and_, func, delete
+from sqlalchemy import select, and_, or_, case, func, delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.modules.chat.models import Channel, Message, ChannelMember, MessageReaction
 from app.modules.chat.schemas import ChannelCreate, MessageCreate
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, aliased
 from app.modules.auth.models import User
+from app.core.events import event_bus
+from app.modules.chat.events import MessageCreated, MessageDeleted
+from app.modules.admin.events import StatsInvalidated
+
+
+def _sender_name_expr():
+    """Display name as shown in previews: full name, or username when it is empty"""
+    return func.coalesce(func.nullif(User.full_name, ""), User.username)
 
 
 class ChatService:
@@ -122,8 +130,15 @@ class ChatService:
         return list(result.scalars().all())
     
     @staticmethod
-    async def create_message(db: AsyncSession, message_data: MessageCreate, user_id: int, document_id: Optional[int] = None) -> Message:
-        """Create a new message and update sender's last_read_message_id"""
+    async def create_message(
+        db: AsyncSession,
+        message_data: MessageCreate,
+        user_id: int,
+        document_id: Optional[int] = None,
+        commit: bool = True
+    ) -> Message:
+        """Create a new message, bump members' unread counters and the sender's last_read_message_id.
+        Runs as one transaction: INSERT, one UPDATE of the channel's memberships, denormalized counters, COMMIT."""
         message = Message(
             channel_id=message_data.channel_id,
             user_id=user_id,
@@ -133,70 +148,185 @@ class ChatService:
         )
         
         db.add(message)
-        await db.commit()
-        await db.refresh(message, ["user"])
+        await db.flush()
         
-        # Update sender's last_read_message_id
-        stmt = select(ChannelMember).where(
-            and_(ChannelMember.channel_id == message.channel_id, ChannelMember.user_id == user_id)
+        # Sender has read up to their own message, everyone else gets one more unread
+        is_sender = ChannelMember.user_id == user_id
+        await db.execute(
+            update(ChannelMember)
+            .where(ChannelMember.channel_id == message.channel_id)
+            .values(
+                last_read_message_id=case((is_sender, message.id), else_=ChannelMember.last_read_message_id),
+                unread_count=case((is_sender, 0), else_=ChannelMember.unread_count + 1)
+            )
         )
-        result = await db.execute(stmt)
-        member = result.scalars().first()
-        if member:
-            member.last_read_message_id = message.id
+        
+        # Denormalized counters: channel's last message preview and parent's reply count
+        await db.execute(
+            update(Channel)
+            .where(
+                Channel.id == message.channel_id,
+                or_(Channel.last_message_id.is_(None), Channel.last_message_id < message.id)
+            )
+            .values(
+                last_message_id=message.id,
+                last_message_at=message.created_at,
+                last_message_preview=message.content[:100] if message.content else "",
+                last_sender_name=select(_sender_name_expr()).where(User.id == user_id).scalar_subquery()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if message.parent_id:
+            await db.execute(
+                update(Message)
+                .where(Message.id == message.parent_id)
+                .values(reply_count=Message.reply_count + 1)
+            )
+        
+        if commit:
             await db.commit()
-            
+            await ChatService.publish_created(message)
         return message
     
     @staticmethod
-    async def get_channel_messages(
-        db: AsyncSession, 
-        channel_id: int, 
-        limit: int = 50,
-        offset: int = 0
-    ) -> List[Message]:
-        """Get messages for a channel (top-level only)"""
+    async def publish_created(message: Message) -> None:
+        """Announce a committed message to other modules"""
+        await event_bus.publish(MessageCreated(
+            message_id=message.id,
+            channel_id=message.channel_id,
+            user_id=message.user_id,
+            content=message.content,
+            document_id=message.document_id,
+            created_at=message.created_at.isoformat()
+        ))
+    
+    @staticmethod
+    async def resolve_mentions(db: AsyncSession, usernames: Iterable[str]) -> List[int]:
+        """Map mentioned usernames to user IDs in a single query"""
+        usernames = list(usernames)
+        if not usernames:
+            return []
+        result = await db.execute(select(User.id).where(User.username.in_(usernames)))
+        return list(result.scalars().all())
+    
+    @staticmethod
+    async def get_message_context(
+        db: AsyncSession,
+        channel_id: int,
+        document_id: Optional[int] = None,
+        parent_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Load everything a new message broadcast needs besides the message itself
+        (channel name/type, attached document, replied-to message and its author)
+        with a single joined query.
+        """
+        from app.modules.board.models import Document
         
-        from sqlalchemy.orm import aliased
-        ReplyMsg = aliased(Message)
         ParentMsg = aliased(Message)
         ParentUser = aliased(User)
         
-        # Subquery to count replies (still useful if we want to show it, though less critical in Telegram style)
-        reply_count_subquery = (
-            select(func.count(ReplyMsg.id))
-            .where(ReplyMsg.parent_id == Message.id)
-            .correlate(Message)
-            .scalar_subquery()
-        )
-
-        result = await db.execute(
+        stmt = (
             select(
-                Message, 
-                reply_count_subquery.label("reply_count"),
-                ParentMsg,
-                ParentUser
+                Channel.name,
+                Channel.is_direct,
+                Document.title,
+                Document.file_path,
+                ParentMsg.id,
+                ParentMsg.content,
+                ParentUser.username,
+                ParentUser.full_name
             )
+            .select_from(Channel)
+            .outerjoin(Document, Document.id == document_id)
+            .outerjoin(ParentMsg, ParentMsg.id == parent_id)
+            .outerjoin(ParentUser, ParentUser.id == ParentMsg.user_id)
+            .where(Channel.id == channel_id)
+        )
+        row = (await db.execute(stmt)).first()
+        
+        context: Dict[str, Any] = {
+            "channel_name": None,
+            "is_direct": False,
+            "doc_info": {"is_document_deleted": False},
+            "parent_info": None
+        }
+        if row is None:
+            if document_id:
+                context["doc_info"]["is_document_deleted"] = True
+            return context
+        
+        name, is_direct, doc_title, doc_path, p_id, p_content, p_username, p_full_name = row
+        context["channel_name"] = name
+        context["is_direct"] = is_direct
+        if document_id:
+            if doc_title is not None:
+                context["doc_info"]["document_title"] = doc_title
+                context["doc_info"]["file_path"] = doc_path
+            else:
+                context["doc_info"]["is_document_deleted"] = True
+        if p_id is not None:
+            context["parent_info"] = {
+                "id": p_id,
+                "content": p_content,
+                "username": p_username or "Unknown",
+                "full_name": p_full_name
+            }
+        return context
+    
+    @staticmethod
+    async def post_message(
+        db: AsyncSession,
+        message_data: MessageCreate,
+        user_id: int,
+        mentioned_usernames: Iterable[str] = ()
+    ) -> Tuple[Message, Dict[str, Any]]:
+        """
+        Write path for a chat message sent over WebSocket, in one transaction:
+        mention lookup, broadcast context, insert + counters, notification recipients
+        (members other than the sender that are not muted or are mentioned).
+        Returns the message and a context dict for building notifications.
+        """
+        mentioned_user_ids = await ChatService.resolve_mentions(db, mentioned_usernames)
+        context = await ChatService.get_message_context(
+            db, message_data.channel_id, message_data.document_id, message_data.parent_id
+        )
+        message = await ChatService.create_message(
+            db, message_data, user_id, document_id=message_data.document_id, commit=False
+        )
+        context["recipient_ids"] = await ChatService.get_notification_recipient_ids(
+            db, message_data.channel_id, exclude_user_id=user_id, always_notify=mentioned_user_ids
+        )
+        context["mentioned_user_ids"] = mentioned_user_ids
+        await db.commit()
+        await ChatService.publish_created(message)
+        return message, context
+    
+    @staticmethod
+    async def _fetch_message_page(
+        db: AsyncSession,
+        conditions: list,
+        order_by,
+        limit: int,
+        offset: int = 0
+    ) -> List[Message]:
+        """One page of channel messages (with parent preview) for the given keyset conditions"""
+        ParentMsg = aliased(Message)
+        ParentUser = aliased(User)
+        
+        result = await db.execute(
+            select(Message, ParentMsg, ParentUser)
             .outerjoin(ParentMsg, Message.parent_id == ParentMsg.id)
             .outerjoin(ParentUser, ParentMsg.user_id == ParentUser.id)
             .options(selectinload(Message.reactions).selectinload(MessageReaction.user))
-            .where(Message.channel_id == channel_id) # Removed parent_id.is_(None) check to show all messages
-            .order_by(Message.created_at.desc())
+            .where(*conditions)
+            .order_by(order_by)
             .limit(limit)
             .offset(offset)
         )
         
-        # Result is list of (Message, reply_count, ParentMsg, ParentUser) tuples
-        rows = result.all()
         messages = []
-        for row in rows:
-            msg = row[0]
-            count = row[1]
-            parent_msg = row[2]
-            parent_user = row[3]
-            
-            msg.reply_count = count
-            
+        for msg, parent_msg, parent_user in result.all():
             # Attach parent info manually to be used by router
             if parent_msg:
                 msg.parent_info = {
@@ -207,11 +337,129 @@ class ChatService:
                 }
             else:
                 msg.parent_info = None
-                
             messages.append(msg)
-            
-        return list(reversed(messages))
+        return messages
+    
+    @staticmethod
+    async def get_channel_messages(
+        db: AsyncSession, 
+        channel_id: int, 
+        limit: int = 50,
+        offset: int = 0,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        around_id: Optional[int] = None
+    ) -> List[Message]:
+        """
+        Get a page of channel messages in chronological order.
+        
+        Cursor modes use the (channel_id, id) index, so cost does not depend on
+        how deep in history the page is:
+        - before_id: `limit` messages older than before_id
+        - after_id: `limit` messages newer than after_id
+        - around_id: the message itself with up to limit // 2 older and the rest newer
+        Without a cursor the latest messages are returned (`offset` is kept for old clients).
+        """
+        in_channel = Message.channel_id == channel_id
+        
+        if around_id is not None:
+            older = await ChatService._fetch_message_page(
+                db, [in_channel, Message.id <= around_id], Message.id.desc(), limit // 2 + 1
+            )
+            newer = await ChatService._fetch_message_page(
+                db, [in_channel, Message.id > around_id], Message.id.asc(), limit - len(older)
+            ) if limit > len(older) else []
+            messages = list(reversed(older)) + newer
+        elif after_id is not None:
+            messages = await ChatService._fetch_message_page(
+                db, [in_channel, Message.id > after_id], Message.id.asc(), limit
+            )
+        else:
+            conditions = [in_channel]
+            if before_id is not None:
+                conditions.append(Message.id < before_id)
+                offset = 0
+            page = await ChatService._fetch_message_page(db, conditions, Message.id.desc(), limit, offset)
+            messages = list(reversed(page))
+        
+        return messages
 
+    @staticmethod
+    async def refresh_last_messages(db: AsyncSession, channel_ids: Optional[Iterable[int]] = None, *conditions) -> None:
+        """
+        Recompute channels.last_message_* from the messages table in one bulk UPDATE.
+        Each column is a correlated lookup of the newest message on the (channel_id, id) index.
+        """
+        def latest(column, *joins):
+            stmt = select(column).select_from(Message)
+            for target, onclause in joins:
+                stmt = stmt.join(target, onclause)
+            return (
+                stmt.where(Message.channel_id == Channel.id)
+                .order_by(Message.id.desc())
+                .limit(1)
+                .correlate(Channel)
+                .scalar_subquery()
+            )
+        
+        stmt = update(Channel).values(
+            last_message_id=latest(Message.id),
+            last_message_at=latest(Message.created_at),
+            last_message_preview=latest(func.substr(Message.content, 1, 100)),
+            last_sender_name=latest(_sender_name_expr(), (User, User.id == Message.user_id))
+        )
+        if channel_ids is not None:
+            stmt = stmt.where(Channel.id.in_(list(channel_ids)))
+        if conditions:
+            stmt = stmt.where(*conditions)
+        await db.execute(stmt.execution_options(synchronize_session=False))
+    
+    @staticmethod
+    async def refresh_reply_counts(db: AsyncSession, channel_ids: Optional[Iterable[int]] = None) -> None:
+        """Recompute messages.reply_count from the messages table in one bulk UPDATE"""
+        Reply = aliased(Message)
+        stmt = update(Message).values(
+            reply_count=(
+                select(func.count(Reply.id))
+                .where(Reply.parent_id == Message.id)
+                .correlate(Message)
+                .scalar_subquery()
+            )
+        )
+        if channel_ids is not None:
+            stmt = stmt.where(Message.channel_id.in_(list(channel_ids)))
+        await db.execute(stmt.execution_options(synchronize_session=False))
+    
+    @staticmethod
+    async def refresh_unread_counts(db: AsyncSession, channel_ids: Optional[Iterable[int]] = None, *conditions) -> None:
+        """Recompute channel_members.unread_count from last_read_message_id in one bulk UPDATE"""
+        stmt = update(ChannelMember).values(
+            unread_count=(
+                select(func.count(Message.id))
+                .where(
+                    Message.channel_id == ChannelMember.channel_id,
+                    Message.id > func.coalesce(ChannelMember.last_read_message_id, 0)
+                )
+                .correlate(ChannelMember)
+                .scalar_subquery()
+            )
+        )
+        if channel_ids is not None:
+            stmt = stmt.where(ChannelMember.channel_id.in_(list(channel_ids)))
+        if conditions:
+            stmt = stmt.where(*conditions)
+        await db.execute(stmt.execution_options(synchronize_session=False))
+    
+    @staticmethod
+    async def repair_denormalized(db: AsyncSession, channel_ids: Optional[Iterable[int]] = None) -> None:
+        """Backfill/repair reply counts, last message previews and unread counters (all channels by default)"""
+        if channel_ids is not None:
+            channel_ids = list(channel_ids)
+        await ChatService.refresh_reply_counts(db, channel_ids)
+        await ChatService.refresh_last_messages(db, channel_ids)
+        await ChatService.refresh_unread_counts(db, channel_ids)
+        await db.commit()
+    
     @staticmethod
     async def get_replies(
         db: AsyncSession,
@@ -226,6 +474,29 @@ class ChatService:
         )
         return list(result.scalars().all())
     
+    @staticmethod
+    async def get_notification_recipient_ids(
+        db: AsyncSession,
+        channel_id: int,
+        exclude_user_id: Optional[int] = None,
+        always_notify: Iterable[int] = ()
+    ) -> List[int]:
+        """
+        Channel members that should get new-message notifications: everyone
+        whose mute has expired or was never set, plus members in always_notify
+        (e.g. mentioned users) regardless of mute.
+        """
+        not_muted = or_(ChannelMember.mute_until.is_(None), ChannelMember.mute_until <= datetime.utcnow())
+        always_notify = list(always_notify)
+        if always_notify:
+            not_muted = or_(not_muted, ChannelMember.user_id.in_(always_notify))
+        
+        stmt = select(ChannelMember.user_id).where(ChannelMember.channel_id == channel_id, not_muted)
+        if exclude_user_id is not None:
+            stmt = stmt.where(ChannelMember.user_id != exclude_user_id)
+        result = await db.execute(stmt)
+        return list(result.scalars().all())
+    
     @staticmethod
     async def is_user_member(db: AsyncSession, channel_id: int, user_id: int) -> bool:
         """Check if user is a member of a channel.
@@ -258,7 +529,9 @@ class ChatService:
             )
             return result.scalars().first()
             
-        member = ChannelMember(channel_id=channel_id, user_id=user_id)
+        # Existing history counts as unread for a new member
+        unread = await db.scalar(select(func.count(Message.id)).where(Message.channel_id == channel_id))
+        member = ChannelMember(channel_id=channel_id, user_id=user_id, unread_count=unread or 0)
         db.add(member)
         await db.commit()
         await db.refresh(member)
@@ -288,51 +561,45 @@ class ChatService:
         await db.execute(delete(ChannelMember).where(ChannelMember.channel_id == channel_id))
         await db.delete(channel)
         await db.commit()
+        await event_bus.publish(StatsInvalidated(reason=f"channel {channel_id} deleted"))
         return True
 
     @staticmethod
     async def get_unread_count(db: AsyncSession, channel_id: int, user_id: int) -> int:
         """Get unread message count for a user in a channel"""
-        # Get member info for last_read_message_id
-        stmt = select(ChannelMember).where(
-            and_(ChannelMember.channel_id == channel_id, ChannelMember.user_id == user_id)
-        )
-        result = await db.execute(stmt)
-        member = result.scalars().first()
-        
-        if not member:
-            return 0
-            
-        last_id = member.last_read_message_id or 0
-        
-        # Count messages in this channel with id > last_id
-        count_stmt = select(func.count(Message.id)).where(
-            and_(Message.channel_id == channel_id, Message.id > last_id)
+        result = await db.execute(
+            select(ChannelMember.unread_count).where(
+                and_(ChannelMember.channel_id == channel_id, ChannelMember.user_id == user_id)
+            )
         )
-        result = await db.execute(count_stmt)
         return result.scalar() or 0
 
+    @staticmethod
+    async def get_unread_counts(db: AsyncSession, user_id: int) -> Dict[int, int]:
+        """Get unread counters of all the user's channels in one indexed lookup"""
+        result = await db.execute(
+            select(ChannelMember.channel_id, ChannelMember.unread_count)
+            .where(ChannelMember.user_id == user_id)
+        )
+        return {channel_id: count for channel_id, count in result.all()}
+
     @staticmethod
     async def mark_channel_as_read(db: AsyncSession, channel_id: int, user_id: int) -> Optional[int]:
-        """Update last_read_message_id for a user in a channel to the latest message ID"""
-        # Get latest message ID in channel
-        latest_stmt = select(Message.id).where(Message.channel_id == channel_id).order_by(Message.id.desc()).limit(1)
-        result = await db.execute(latest_stmt)
-        latest_id = result.scalar()
+        """Update last_read_message_id for a user in a channel to the latest message ID and reset the unread counter"""
+        # Latest message ID is denormalized on the channel
+        latest_id = await db.scalar(select(Channel.last_message_id).where(Channel.id == channel_id))
         
         if latest_id is None:
             return None
             
-        # Update member record
-        stmt = select(ChannelMember).where(
-            and_(ChannelMember.channel_id == channel_id, ChannelMember.user_id == user_id)
+        result = await db.execute(
+            update(ChannelMember)
+            .where(and_(ChannelMember.channel_id == channel_id, ChannelMember.user_id == user_id))
+            .values(last_read_message_id=latest_id, unread_count=0)
         )
-        result = await db.execute(stmt)
-        member = result.scalars().first()
+        await db.commit()
         
-        if member:
-            member.last_read_message_id = latest_id
-            await db.commit()
+        if result.rowcount:
             return latest_id
             
         return None
@@ -438,8 +705,37 @@ class ChatService:
             created_at=message.created_at
         )
         
-        # Delete the message (cascade will handle reactions)
+        reply_count = message.reply_count or 0
+        # Replies go with the message and have larger ids
+        last_deleted_id = await db.scalar(
+            select(func.max(Message.id)).where(Message.parent_id == message.id)
+        ) or message.id
+        
+        # Delete the message (cascade will handle reactions and replies)
         await db.delete(message)
+        await db.flush()
+        
+        if message.parent_id:
+            await db.execute(
+                update(Message)
+                .where(Message.id == message.parent_id, Message.reply_count > 0)
+                .values(reply_count=Message.reply_count - 1)
+            )
+        # Replies always have larger ids, so the preview is stale only if it points at or past this message
+        await ChatService.refresh_last_messages(
+            db, [message.channel_id], Channel.last_message_id >= message.id
+        )
+        # Only members who had not read this message or its last reply yet are affected
+        await ChatService.refresh_unread_counts(
+            db, [message.channel_id], func.coalesce(ChannelMember.last_read_message_id, 0) < last_deleted_id
+        )
         await db.commit()
+        await event_bus.publish(MessageDeleted(
+            message_id=message_copy.id,
+            channel_id=message_copy.channel_id,
+            user_id=message_copy.user_id,
+            created_at=message_copy.created_at.isoformat(),
+            reply_count=reply_count
+        ))
         
         return message_copy
@@ -88,8 +88,9 @@ class EmailAttachment(Base):
     
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
     content_type: Mapped[str] = mapped_column(String(100), nullable=True)
-    file_path: Mapped[str] = mapped_column(String(512), nullable=False) # Path on disk
+    file_path: Mapped[str] = mapped_column(String(512), nullable=False) # Path on disk (name only when in the blob store)
     file_size: Mapped[int] = mapped_column(Integer, nullable=False)
+    blob_sha256: Mapped[Optional[str]] = mapped_column(ForeignKey("blobs.sha256"), nullable=True, index=True)  # Content in the blob store
     
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
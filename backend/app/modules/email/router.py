@@ -1,16 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import os
 import mimetypes
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.modules.auth.models import User
-from app.modules.auth.router import get_current_user
+from app.modules.auth.router import get_current_user, get_current_principal
+from app.modules.auth.token_cache import AuthPrincipal
 from app.modules.email import service
 from app.modules.email import schemas
-from app.core.file_security import safe_file_path
+from app.core.file_security import safe_file_path, secure_file_response
+from app.core.blobs import blob_store
 from app.core.config import get_settings
 
 settings = get_settings()
@@ -36,8 +37,8 @@ async def list_messages(
     folder: str = Query("inbox", enum=["inbox", "sent", "trash", "archive", "starred", "important"]),
     skip: int = 0,
     limit: int = 50,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: AuthPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
     account = await service.get_user_email_account(db, current_user.id)
     if not account:
@@ -48,7 +49,7 @@ async def list_messages(
 @router.get("/messages/{message_id}", response_model=schemas.EmailMessage)
 async def get_message(
     message_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     account = await service.get_user_email_account(db, current_user.id)
@@ -75,19 +76,13 @@ async def send_email(
     cc_address: Optional[str] = Form(None),
     bcc_address: Optional[str] = Form(None),
     attachments: Optional[List[UploadFile]] = File(None),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     account = await service.get_user_email_account(db, current_user.id)
     if not account:
         raise HTTPException(status_code=404, detail="Email account not set up")
 
-    files_data = []
-    if attachments:
-        for file in attachments:
-            file_content = await file.read()
-            files_data.append((file.filename, file_content, file.content_type))
-
     email_data = schemas.EmailMessageCreate(
         to_address=to_address,
         subject=subject,
@@ -97,13 +92,13 @@ async def send_email(
         bcc_address=bcc_address
     )
 
-    return await service.send_email(db, account.id, email_data, files_data)
+    return await service.send_email(db, account.id, email_data, attachments or [])
 
 @router.patch("/messages/{message_id}", response_model=schemas.EmailMessage)
 async def update_message(
     message_id: int,
     updates: schemas.EmailMessageUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     account = await service.get_user_email_account(db, current_user.id)
@@ -118,7 +113,7 @@ async def update_message(
 @router.delete("/messages/{message_id}")
 async def delete_message(
     message_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     account = await service.get_user_email_account(db, current_user.id)
@@ -132,8 +127,8 @@ async def delete_message(
 
 @router.get("/folders", response_model=List[schemas.EmailFolder])
 async def list_folders(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: AuthPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
     account = await service.get_user_email_account(db, current_user.id)
     if not account:
@@ -143,8 +138,8 @@ async def list_folders(
 
 @router.get("/stats", response_model=schemas.EmailStats)
 async def get_stats(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: AuthPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
     account = await service.get_user_email_account(db, current_user.id)
     if not account:
@@ -154,7 +149,7 @@ async def get_stats(
 
 @router.get("/unread-count", response_model=schemas.UnreadCount)
 async def get_unread_count(
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     account = await service.get_user_email_account(db, current_user.id)
@@ -165,7 +160,7 @@ async def get_unread_count(
 
 @router.post("/mark-all-read")
 async def mark_all_as_read(
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     account = await service.get_user_email_account(db, current_user.id)
@@ -178,7 +173,7 @@ async def mark_all_as_read(
 @router.post("/folders", response_model=schemas.EmailFolder)
 async def create_folder(
     folder_data: schemas.EmailFolderCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     account = await service.get_user_email_account(db, current_user.id)
@@ -189,7 +184,7 @@ async def create_folder(
 @router.delete("/folders/{folder_id}")
 async def delete_folder(
     folder_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     account = await service.get_user_email_account(db, current_user.id)
@@ -201,7 +196,8 @@ async def delete_folder(
 @router.get("/attachments/{attachment_id}/download")
 async def download_email_attachment(
     attachment_id: int,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Securely download email attachment if authorized"""
@@ -211,7 +207,10 @@ async def download_email_attachment(
     
     # Secure path validation - prevents path traversal
     try:
-        safe_path = safe_file_path(attachment.file_path, UPLOAD_DIR)
+        if attachment.blob_sha256:
+            safe_path = blob_store.path(attachment.blob_sha256)
+        else:
+            safe_path = safe_file_path(attachment.file_path, UPLOAD_DIR)
     except HTTPException:
         raise
     except Exception as e:
@@ -221,13 +220,15 @@ async def download_email_attachment(
         raise HTTPException(status_code=404, detail="File not found on disk")
     
     # Determine filename and media type
-    mime_type, _ = mimetypes.guess_type(safe_path)
+    mime_type, _ = mimetypes.guess_type(attachment.file_path)
     if not mime_type:
         mime_type = "application/octet-stream"
     
     # Use attachment filename for download
-    return FileResponse(
-        path=safe_path,
+    return secure_file_response(
+        safe_path,
+        filename=attachment.filename,
         media_type=mime_type,
-        filename=attachment.filename
+        request=request,
+        content_hash=attachment.blob_sha256
     )
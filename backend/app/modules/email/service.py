@@ -1,11 +1,12 @@
 from sqlalchemy import select, update, desc, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from fastapi import HTTPException
+from fastapi import HTTPException, UploadFile
 from typing import List, Optional
 import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import asyncio
 import os
 import uuid
 import logging
@@ -16,6 +17,7 @@ import bleach
 from app.modules.email.models import EmailMessage, EmailAccount, EmailAttachment, EmailFolder
 from app.modules.email.schemas import EmailMessageCreate, EmailMessageUpdate, EmailFolderCreate
 from app.modules.auth.models import User
+from app.core.blobs import blob_store
 from email import message_from_bytes, encoders
 from email.header import decode_header
 
@@ -175,12 +177,28 @@ async def get_email_by_id(db: AsyncSession, message_id: int, account_id: Optiona
 
 from app.core.config_service import ConfigService
 
-async def send_email(db: AsyncSession, account_id: int, email_data: EmailMessageCreate, files: List[tuple] = []) -> EmailMessage:
+async def _store_outgoing_attachments(db: AsyncSession, attachments: List[UploadFile]) -> List[tuple]:
+    """Stream uploaded attachments into the blob store within the configured size limits"""
+    max_bytes, max_total_bytes, _ = await _get_attachment_settings(db)
+    stored_files = []
+    total_size = 0
+    for upload in attachments:
+        filename = Path(upload.filename or "attachment").name
+        stored = await blob_store.put(db, upload, min(max_bytes, max_total_bytes - total_size))
+        total_size += stored.size
+        stored_files.append((filename, stored, upload.content_type or "application/octet-stream"))
+    return stored_files
+
+
+async def send_email(db: AsyncSession, account_id: int, email_data: EmailMessageCreate, attachments: List[UploadFile] = []) -> EmailMessage:
     # 1. Fetch sender account
     account = await db.get(EmailAccount, account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Email account not found")
 
+    # Attachments are stored before anything is recorded (references commit with the message)
+    files = await _store_outgoing_attachments(db, attachments)
+
     # 2. Create Email Message in DB (Sent folder)
     db_message = EmailMessage(
         account_id=account_id,
@@ -217,35 +235,31 @@ async def send_email(db: AsyncSession, account_id: int, email_data: EmailMessage
         part_html = MIMEText(email_data.body_html, "html")
         smtp_msg.attach(part_html)
 
-    for filename, content, content_type in files:
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        file_path = Path(UPLOAD_DIR) / unique_filename
-
+    for filename, stored, content_type in files:
         try:
-            with open(file_path, "wb") as f:
-                f.write(content)
-
             attachment = EmailAttachment(
                 message_id=db_message.id,
-                file_name=filename,
-                file_path=str(file_path),
-                file_size=len(content)
+                filename=filename,
+                content_type=content_type,
+                file_path=str(Path(UPLOAD_DIR) / f"{uuid.uuid4()}_{filename}"),
+                file_size=stored.size,
+                blob_sha256=stored.sha256
             )
             db.add(attachment)
 
-            # Add to email message
+            # Add to email message (SMTP submission needs the content itself)
             from email.mime.base import MIMEBase
             part = MIMEBase(*content_type.split('/', 1) if '/' in content_type else ('application', 'octet-stream'))
-            part.set_payload(content)
+            part.set_payload(await asyncio.to_thread(Path(stored.path).read_bytes))
             import email.encoders
             email.encoders.encode_base64(part)
             part.add_header('Content-Disposition', f'attachment; filename="{filename}"')
             smtp_msg.attach(part)
 
         except Exception as e:
-            logger.error(f"Failed to save attachment {filename}: {e}")
+            logger.error(f"Failed to attach {filename}: {e}")
 
-    await db.flush()
+    await db.commit()
 
     # 4. Send via aiosmtplib
     smtp_host = await ConfigService.get_value(db, "email_smtp_host", "127.0.0.1")
@@ -378,10 +392,9 @@ async def _save_email_attachments(
                 unique_filename = f"{uuid.uuid4()}_{filename}"
                 file_path = Path(UPLOAD_DIR) / unique_filename
 
-                # Save to disk
+                # Save to the blob store
                 try:
-                    with open(file_path, "wb") as f:
-                        f.write(content)
+                    stored = await blob_store.put_bytes(db, content if isinstance(content, bytes) else content.encode())
                 except Exception as e:
                     logger.error(f"Failed to save attachment {filename}: {e}")
                     continue
@@ -389,9 +402,11 @@ async def _save_email_attachments(
                 # Create database record
                 attachment = EmailAttachment(
                     message_id=message_id,
-                    file_name=filename,
+                    filename=filename,
+                    content_type=part.get_content_type(),
                     file_path=str(file_path),
-                    file_size=file_size
+                    file_size=stored.size,
+                    blob_sha256=stored.sha256
                 )
                 db.add(attachment)
 
@@ -520,6 +535,8 @@ async def delete_email_message(db: AsyncSession, message_id: int, account_id: in
     if not message:
         return
     
+    # Attachments go with the message (cascade)
+    await blob_store.release_all(db, [attachment.blob_sha256 for attachment in message.attachments])
     await db.delete(message)
     await db.commit()
 
@@ -0,0 +1,32 @@
+"""
+Domain Events for Tasks Module
+
+Events published when tasks are created, change status or are deleted,
+enabling cross-module communication without direct dependencies.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class TaskCreated:
+    """Event published after a task was issued"""
+    task_id: int
+    status: str
+    created_at: str
+
+
+@dataclass(frozen=True)
+class TaskStatusChanged:
+    """Event published after a task moved from one status to another"""
+    task_id: int
+    old_status: str
+    new_status: str
+
+
+@dataclass(frozen=True)
+class TaskDeleted:
+    """Event published after a task was deleted"""
+    task_id: int
+    status: str
+    created_at: str
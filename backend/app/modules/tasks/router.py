@@ -6,11 +6,14 @@ from sqlalchemy import select, or_
 from sqlalchemy.orm import selectinload
 
 from app.core.database import get_db
-from app.modules.auth.router import get_current_user
+from app.modules.auth.router import get_current_user, get_current_principal
+from app.modules.auth.token_cache import AuthPrincipal
 from app.modules.auth.models import User
 from .models import Task, TaskStatus
 from .schemas import TaskCreate, TaskResponse, TaskReport, TaskReject
 from app.core.websocket_manager import websocket_manager as manager
+from app.core.events import event_bus
+from .events import TaskCreated, TaskStatusChanged, TaskDeleted
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
@@ -58,6 +61,10 @@ async def create_task(
         created_tasks.append(new_task)
 
     await db.commit()
+    for task in created_tasks:
+        await event_bus.publish(TaskCreated(
+            task_id=task.id, status=task.status, created_at=task.created_at.isoformat()
+        ))
     
     # Refresh to get IDs and relationships
     task_ids = [t.id for t in created_tasks]
@@ -85,7 +92,7 @@ async def create_task(
 
 @router.get("/received", response_model=List[TaskResponse])
 async def get_received_tasks(
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get active tasks assigned to current user"""
@@ -101,21 +108,25 @@ async def get_received_tasks(
     tasks = result.scalars().all()
     
     # Check for overdue
-    updated = False
+    overdue = []
     now = datetime.utcnow()
     for t in tasks:
         if t.status == TaskStatus.IN_PROGRESS and t.deadline < now:
             t.status = TaskStatus.OVERDUE
-            updated = True
+            overdue.append(t.id)
     
-    if updated:
+    if overdue:
         await db.commit()
+        for overdue_id in overdue:
+            await event_bus.publish(TaskStatusChanged(
+                task_id=overdue_id, old_status=TaskStatus.IN_PROGRESS, new_status=TaskStatus.OVERDUE
+            ))
         
     return tasks
 
 @router.get("/issued", response_model=List[TaskResponse])
 async def get_issued_tasks(
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get non-completed tasks issued by current user"""
@@ -132,7 +143,7 @@ async def get_issued_tasks(
 
 @router.get("/completed", response_model=List[TaskResponse])
 async def get_completed_tasks(
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get completed tasks (either issued or received)"""
@@ -172,10 +183,12 @@ async def report_task(
     if task.status not in [TaskStatus.IN_PROGRESS, TaskStatus.OVERDUE]:
          raise HTTPException(status_code=400, detail="Task cannot be reported")
 
+    old_status = task.status
     task.status = TaskStatus.ON_REVIEW
     task.completion_report = report.report_text
     await db.commit()
     await db.refresh(task)
+    await event_bus.publish(TaskStatusChanged(task_id=task.id, old_status=old_status, new_status=task.status))
 
     # Notify Issuer
     issuer_name = f"{current_user.rank} {current_user.full_name}" if current_user.rank else (current_user.full_name or current_user.username)
@@ -210,10 +223,12 @@ async def confirm_task(
     if task.issuer_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    old_status = task.status
     task.status = TaskStatus.COMPLETED
     task.completed_at = datetime.utcnow()
     await db.commit()
     await db.refresh(task)
+    await event_bus.publish(TaskStatusChanged(task_id=task.id, old_status=old_status, new_status=task.status))
 
     # Notify Assignee that task is confirmed
     issuer_name = f"{current_user.rank} {current_user.full_name}" if current_user.rank else (current_user.full_name or current_user.username)
@@ -249,11 +264,13 @@ async def reject_task(
     if task.issuer_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
         
+    old_status = task.status
     task.status = TaskStatus.IN_PROGRESS if task.deadline > datetime.utcnow() else TaskStatus.OVERDUE
     task.return_reason = rejection.reason
     
     await db.commit()
     await db.refresh(task)
+    await event_bus.publish(TaskStatusChanged(task_id=task.id, old_status=old_status, new_status=task.status))
 
     # Notify Assignee
     issuer_name = f"{current_user.rank} {current_user.full_name}" if current_user.rank else (current_user.full_name or current_user.username)
@@ -271,7 +288,7 @@ async def reject_task(
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_task(
     task_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a task (Issuer only)"""
@@ -286,4 +303,5 @@ async def delete_task(
     
     await db.delete(task)
     await db.commit()
+    await event_bus.publish(TaskDeleted(task_id=task.id, status=task.status, created_at=task.created_at.isoformat()))
     return None
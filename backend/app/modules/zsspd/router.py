@@ -2,7 +2,9 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
-from app.modules.auth.router import get_current_user
+from app.core.config_service import ConfigService
+from app.modules.auth.router import get_current_principal
+from app.modules.auth.token_cache import AuthPrincipal
 from app.modules.auth.models import User
 from .schemas import ZsspdPackageCreate, ZsspdPackageRead, ZsspdPackageUpdate, ZsspdFileRead
 from .service import ZsspdService
@@ -15,7 +17,7 @@ async def get_outgoing_packages(
     skip: int = 0,
     limit: int = 100,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     service = ZsspdService(db)
     # Filter by user if not admin/operator
@@ -26,7 +28,7 @@ async def get_outgoing_packages(
 async def create_outgoing_package(
     package: ZsspdPackageCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     service = ZsspdService(db)
     if package.direction != ZsspdDirection.OUTGOING:
@@ -38,7 +40,7 @@ async def upload_package_file(
     package_id: int,
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     service = ZsspdService(db)
     package = await service.get_package(package_id)
@@ -49,14 +51,20 @@ async def upload_package_file(
     if package.created_by != current_user.id and current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Not authorized to edit this package")
 
-    return await service.add_file(package_id, file)
+    max_mb_str = await ConfigService.get_value(db, "max_upload_size_mb")
+    try:
+        max_bytes = int(max_mb_str) * 1024 * 1024
+    except (ValueError, TypeError):
+        max_bytes = 50 * 1024 * 1024
+
+    return await service.add_file(package_id, file, max_bytes)
 
 @router.put("/packages/{package_id}", response_model=ZsspdPackageRead)
 async def update_package_status(
     package_id: int,
     update_data: ZsspdPackageUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     # Only operators or owners (for certain statuses) can update
     # For now, let's keep it simple: Export/Process is for operators only
@@ -75,7 +83,7 @@ async def update_package_status(
 async def get_package_details(
     package_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_principal)
 ):
     service = ZsspdService(db)
     package = await service.get_package(package_id)
@@ -1,5 +1,4 @@
 import os
-import shutil
 import logging
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,6 +10,7 @@ from .models import ZsspdPackage, ZsspdFile, ZsspdStatus, ZsspdDirection
 from .schemas import ZsspdPackageCreate, ZsspdPackageUpdate
 from app.modules.archive.service import sanitize_filename
 from app.core.file_security import safe_file_operation
+from app.core.blobs import blob_store
 
 logger = logging.getLogger(__name__)
 
@@ -65,14 +65,12 @@ class ZsspdService:
         await self.db.commit()
         return await self.get_package(package.id)
 
-    async def add_file(self, package_id: int, file: UploadFile) -> ZsspdFile:
+    async def add_file(self, package_id: int, file: UploadFile, max_bytes: Optional[int] = None) -> ZsspdFile:
         package = await self.get_package(package_id)
         if not package:
             raise HTTPException(status_code=404, detail="Package not found")
         
-        # Create package directory
         package_dir = os.path.join(UPLOAD_DIR, str(package_id))
-        os.makedirs(package_dir, exist_ok=True)
         
         # Sanitize filename to prevent path traversal
         safe_filename = sanitize_filename(file.filename or 'unnamed')
@@ -85,17 +83,15 @@ class ZsspdService:
             logger.error(f"Path traversal attempt detected: {file.filename}")
             raise HTTPException(status_code=400, detail="Invalid filename")
         
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        file_size = os.path.getsize(file_path)
+        # Save file (content goes to the blob store)
+        stored = await blob_store.put(self.db, file, max_bytes)
         
         db_file = ZsspdFile(
             package_id=package.id,
             filename=file.filename,
             file_path=file_path,
-            file_size=file_size
+            file_size=stored.size,
+            blob_sha256=stored.sha256
         )
         self.db.add(db_file)
         await self.db.commit()
@@ -109,9 +105,12 @@ class ZsspdService:
             
         # Try to delete physical file with safe path validation
         try:
-            safe_path = safe_file_operation(db_file.file_path, UPLOAD_DIR)
-            if os.path.exists(safe_path):
-                os.remove(safe_path)
+            if db_file.blob_sha256:
+                await blob_store.release(self.db, db_file.blob_sha256)
+            else:
+                safe_path = safe_file_operation(db_file.file_path, UPLOAD_DIR)
+                if os.path.exists(safe_path):
+                    os.remove(safe_path)
         except ValueError as e:
             logger.error(f"Path traversal detected in delete_file: {e}")
         except Exception as e:
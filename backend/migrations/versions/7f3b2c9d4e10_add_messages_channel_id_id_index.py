@@ -0,0 +1,25 @@
+"""add messages (channel_id, id) index
+
+Revision ID: 7f3b2c9d4e10
+Revises: 38a02d034ab7
+Create Date: 2026-10-16 10:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '7f3b2c9d4e10'
+down_revision: Union[str, None] = '38a02d034ab7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_messages_channel_id_id', 'messages', ['channel_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_channel_id_id', table_name='messages')
@@ -0,0 +1,53 @@
+"""add denormalized chat counters
+
+Revision ID: 9b1e4f6a2c73
+Revises: 7f3b2c9d4e10
+Create Date: 2026-10-16 11:02:17.540391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9b1e4f6a2c73'
+down_revision: Union[str, None] = '7f3b2c9d4e10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('messages', sa.Column('reply_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('channels', sa.Column('last_message_id', sa.Integer(), nullable=True))
+    op.add_column('channels', sa.Column('last_message_at', sa.DateTime(), nullable=True))
+    op.add_column('channels', sa.Column('last_sender_name', sa.String(length=255), nullable=True))
+    op.add_column('channels', sa.Column('last_message_preview', sa.String(length=100), nullable=True))
+
+    # Backfill (same as scripts/repair_chat_counters.py)
+    op.execute(
+        "UPDATE messages SET reply_count = "
+        "(SELECT COUNT(r.id) FROM messages AS r WHERE r.parent_id = messages.id)"
+    )
+    latest = (
+        "(SELECT {column} FROM messages AS m {join}"
+        " WHERE m.channel_id = channels.id ORDER BY m.id DESC LIMIT 1)"
+    )
+    op.execute(
+        "UPDATE channels SET "
+        f"last_message_id = {latest.format(column='m.id', join='')}, "
+        f"last_message_at = {latest.format(column='m.created_at', join='')}, "
+        f"last_message_preview = {latest.format(column='SUBSTR(m.content, 1, 100)', join='')}, "
+        "last_sender_name = " + latest.format(
+            column="COALESCE(NULLIF(u.full_name, ''), u.username)",
+            join="JOIN users AS u ON u.id = m.user_id"
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('channels', 'last_message_preview')
+    op.drop_column('channels', 'last_sender_name')
+    op.drop_column('channels', 'last_message_at')
+    op.drop_column('channels', 'last_message_id')
+    op.drop_column('messages', 'reply_count')
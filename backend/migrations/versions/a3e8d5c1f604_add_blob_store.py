@@ -0,0 +1,49 @@
+"""add blob store
+
+Revision ID: a3e8d5c1f604
+Revises: f7c2a9d4b318
+Create Date: 2026-10-16 19:02:47.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e8d5c1f604'
+down_revision: Union[str, None] = 'f7c2a9d4b318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Existing rows keep blob_sha256 = NULL and their file at file_path
+BLOB_TABLES = ('documents', 'archive_files', 'email_attachments', 'zsspd_files')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('sha256')
+    )
+    op.create_index(op.f('ix_blobs_ref_count'), 'blobs', ['ref_count'], unique=False)
+
+    for table in BLOB_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('blob_sha256', sa.String(length=64), nullable=True))
+            batch_op.create_index(op.f(f'ix_{table}_blob_sha256'), ['blob_sha256'], unique=False)
+            batch_op.create_foreign_key(f'fk_{table}_blob_sha256', 'blobs', ['blob_sha256'], ['sha256'])
+
+
+def downgrade() -> None:
+    for table in BLOB_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(f'fk_{table}_blob_sha256', type_='foreignkey')
+            batch_op.drop_index(op.f(f'ix_{table}_blob_sha256'))
+            batch_op.drop_column('blob_sha256')
+
+    op.drop_index(op.f('ix_blobs_ref_count'), table_name='blobs')
+    op.drop_table('blobs')
@@ -0,0 +1,50 @@
+"""add archive folder path
+
+Revision ID: b6d4e2a7c915
+Revises: a3e8d5c1f604
+Create Date: 2026-10-16 19:41:05.620417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d4e2a7c915'
+down_revision: Union[str, None] = 'a3e8d5c1f604'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('archive_folders', sa.Column('path', sa.String(length=1024), nullable=False, server_default=''))
+    op.create_index(op.f('ix_archive_folders_path'), 'archive_folders', ['path'], unique=False)
+
+    # Backfill "/<root id>/.../<id>/" level by level from the roots
+    conn = op.get_bind()
+    folders = sa.table('archive_folders', sa.column('id'), sa.column('parent_id'), sa.column('path'))
+    children = {}
+    for folder_id, parent_id in conn.execute(sa.select(folders.c.id, folders.c.parent_id)):
+        children.setdefault(parent_id, []).append(folder_id)
+
+    paths = {}
+    level = [(folder_id, f"/{folder_id}/") for folder_id in children.get(None, [])]
+    while level:
+        paths.update(level)
+        level = [
+            (child_id, f"{path}{child_id}/")
+            for folder_id, path in level
+            for child_id in children.get(folder_id, [])
+        ]
+
+    if paths:
+        conn.execute(
+            folders.update().where(folders.c.id == sa.bindparam('folder_id')).values(path=sa.bindparam('folder_path')),
+            [{'folder_id': folder_id, 'folder_path': path} for folder_id, path in paths.items()]
+        )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_archive_folders_path'), table_name='archive_folders')
+    op.drop_column('archive_folders', 'path')
@@ -0,0 +1,32 @@
+"""add channel_members.unread_count
+
+Revision ID: c4d8a1e5f237
+Revises: 9b1e4f6a2c73
+Create Date: 2026-10-16 11:48:05.226914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8a1e5f237'
+down_revision: Union[str, None] = '9b1e4f6a2c73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('channel_members', sa.Column('unread_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill (same as scripts/repair_chat_counters.py)
+    op.execute(
+        "UPDATE channel_members SET unread_count = "
+        "(SELECT COUNT(m.id) FROM messages AS m WHERE m.channel_id = channel_members.channel_id "
+        "AND m.id > COALESCE(channel_members.last_read_message_id, 0))"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('channel_members', 'unread_count')
@@ -0,0 +1,48 @@
+"""add archive jobs
+
+Revision ID: c8f1a6d3e052
+Revises: b6d4e2a7c915
+Create Date: 2026-10-16 20:13:29.407651
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f1a6d3e052'
+down_revision: Union[str, None] = 'b6d4e2a7c915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'archive_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(length=16), nullable=False),
+        sa.Column('items', sa.JSON(), nullable=False),
+        sa.Column('target_folder_id', sa.Integer(), nullable=True),
+        sa.Column('target_unit_id', sa.Integer(), nullable=False),
+        sa.Column('is_private', sa.Boolean(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('done', sa.Integer(), nullable=False),
+        sa.Column('error', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['target_unit_id'], ['units.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_archive_jobs_id'), 'archive_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_archive_jobs_status'), 'archive_jobs', ['status'], unique=False)
+    op.create_index(op.f('ix_archive_jobs_user_id'), 'archive_jobs', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_archive_jobs_user_id'), table_name='archive_jobs')
+    op.drop_index(op.f('ix_archive_jobs_status'), table_name='archive_jobs')
+    op.drop_index(op.f('ix_archive_jobs_id'), table_name='archive_jobs')
+    op.drop_table('archive_jobs')
@@ -0,0 +1,32 @@
+"""add schema_marker
+
+Revision ID: d2a7c6e9f481
+Revises: c4d8a1e5f237
+Create Date: 2026-10-16 14:02:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7c6e9f481'
+down_revision: Union[str, None] = 'c4d8a1e5f237'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Filled in by the next full startup (init_db); fast startup stays off until then
+    op.create_table(
+        'schema_marker',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('schema_marker')
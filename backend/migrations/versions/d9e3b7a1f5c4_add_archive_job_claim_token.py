@@ -0,0 +1,25 @@
+"""add archive job claim token
+
+Revision ID: d9e3b7a1f5c4
+Revises: c8f1a6d3e052
+Create Date: 2026-10-16 21:02:47.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9e3b7a1f5c4'
+down_revision: Union[str, None] = 'c8f1a6d3e052'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('archive_jobs', sa.Column('claim_token', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('archive_jobs', 'claim_token')
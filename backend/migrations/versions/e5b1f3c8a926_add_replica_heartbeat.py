@@ -0,0 +1,30 @@
+"""add replica_heartbeat
+
+Revision ID: e5b1f3c8a926
+Revises: d2a7c6e9f481
+Create Date: 2026-10-16 16:21:09.734512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b1f3c8a926'
+down_revision: Union[str, None] = 'd2a7c6e9f481'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'replica_heartbeat',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('beat_ms', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('replica_heartbeat')
@@ -0,0 +1,30 @@
+"""add stat reconcile lease
+
+Revision ID: e8a4c2f6b193
+Revises: d9e3b7a1f5c4
+Create Date: 2026-10-16 21:36:11.482907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a4c2f6b193'
+down_revision: Union[str, None] = 'd9e3b7a1f5c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stat_reconcile',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('reconciled_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('stat_reconcile')
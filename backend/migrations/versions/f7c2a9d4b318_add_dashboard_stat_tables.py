@@ -0,0 +1,48 @@
+"""add dashboard stat tables
+
+Revision ID: f7c2a9d4b318
+Revises: e5b1f3c8a926
+Create Date: 2026-10-16 18:47:52.103688
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c2a9d4b318'
+down_revision: Union[str, None] = 'e5b1f3c8a926'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Filled by the statistics reconciliation job on the next startup
+    op.create_table(
+        'stat_counters',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+    op.create_table(
+        'stat_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('metric', sa.String(length=32), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'metric')
+    )
+    op.create_table(
+        'stat_user_messages',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('message_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index(op.f('ix_stat_user_messages_message_count'), 'stat_user_messages', ['message_count'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_stat_user_messages_message_count'), table_name='stat_user_messages')
+    op.drop_table('stat_user_messages')
+    op.drop_table('stat_daily')
+    op.drop_table('stat_counters')
@@ -0,0 +1,98 @@
+"""
+Benchmark: chat delivery latency while a burst of logins is verified.
+
+A chat sender broadcasts a message to a channel every few milliseconds and
+records how long each one takes to reach an in-memory socket. Meanwhile a
+burst of concurrent logins runs bcrypt verification, either inline on the
+event loop (previous behaviour) or through the password thread pool.
+
+Usage (from backend/):
+    python -m scripts.bench_login_burst [logins]
+"""
+import asyncio
+import os
+import secrets
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", secrets.token_hex(32))
+os.environ.setdefault("DEBUG", "true")
+
+from app.core.security import get_password_hash, verify_password, verify_password_async, password_pool
+from app.core.websocket_manager import WebSocketManager
+
+LOGINS = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+SEND_INTERVAL = 0.005
+
+
+class TimingWebSocket:
+    """Socket that records when each frame arrives"""
+
+    def __init__(self) -> None:
+        self.received = asyncio.Event()
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, data: str) -> None:
+        self.received.set()
+
+
+async def _chat_latencies(manager: WebSocketManager, ws: TimingWebSocket, stop: asyncio.Event) -> list:
+    latencies = []
+    while not stop.is_set():
+        ws.received.clear()
+        start = time.perf_counter()
+        await manager.broadcast_to_channel(1, {"type": "new_message", "content": "ping"})
+        await ws.received.wait()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(SEND_INTERVAL)
+    return latencies
+
+
+async def _inline_login(password: str, hashed: str) -> None:
+    # Previous behaviour: bcrypt on the event loop inside an async handler
+    await asyncio.sleep(0)
+    verify_password(password, hashed)
+
+
+async def _pooled_login(password: str, hashed: str) -> None:
+    await verify_password_async(password, hashed)
+
+
+async def _scenario(name: str, login, hashed: str) -> None:
+    manager = WebSocketManager()
+    ws = TimingWebSocket()
+    manager._add_channel_socket(ws, 1, 1)
+    stop = asyncio.Event()
+    chat = asyncio.create_task(_chat_latencies(manager, ws, stop))
+    await asyncio.sleep(0.1)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login("correct horse", hashed) for _ in range(LOGINS)))
+    burst = time.perf_counter() - start
+
+    stop.set()
+    latencies = await chat
+    manager._release_writer(ws)
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:>8} {burst:>9.2f} {len(latencies):>9} {statistics.median(latencies):>9.2f} "
+        f"{p99:>9.2f} {latencies[-1]:>9.2f}"
+    )
+
+
+async def run() -> None:
+    hashed = get_password_hash("correct horse")
+    print(f"{LOGINS} concurrent logins, pool of {password_pool.workers} threads")
+    print(f"{'mode':>8} {'burst s':>9} {'messages':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    await _scenario("inline", _inline_login, hashed)
+    await _scenario("pool", _pooled_login, hashed)
+    password_pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
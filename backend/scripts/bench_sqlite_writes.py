@@ -0,0 +1,115 @@
+"""
+Benchmark: concurrent chat message inserts on a SQLite file.
+
+Every writer posts messages through ChatService.create_message, one session
+per message like the WebSocket handler does. Compares
+- legacy: NullPool, default rollback journal (previous configuration),
+- pool+WAL: persistent pool with the connection pragmas,
+- pool+WAL+queue: the above plus the single-writer queue (default now).
+
+Usage (from backend/):
+    python -m scripts.bench_sqlite_writes [writers] [messages_per_writer]
+"""
+import asyncio
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", secrets.token_hex(32))
+os.environ.setdefault("DEBUG", "true")
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import app.core.models  # noqa: F401
+import app.modules.archive.models  # noqa: F401
+import app.modules.board.models  # noqa: F401
+import app.modules.email.models  # noqa: F401
+import app.modules.tasks.models  # noqa: F401
+import app.modules.zsspd.models  # noqa: F401
+from app.core.config import get_settings
+from app.core.database import Base, create_engine_with_pool, create_session_factory
+from app.modules.auth.models import User
+from app.modules.chat.models import Channel, ChannelMember
+from app.modules.chat.schemas import MessageCreate
+from app.modules.chat.service import ChatService
+
+# DEBUG turns on SQL echo for new engines
+get_settings().debug = False
+
+WRITERS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+MESSAGES = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+
+
+def _legacy(url: str):
+    engine = create_async_engine(url, poolclass=NullPool)
+    return engine, async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
+
+def _pooled(url: str):
+    engine = create_engine_with_pool(url)
+    return engine, async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
+
+def _pooled_queue(url: str):
+    engine = create_engine_with_pool(url)
+    return engine, create_session_factory(engine)
+
+
+async def _seed(engine, session_factory) -> tuple:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with session_factory() as db:
+        users = [User(username=f"w{i}", email=f"w{i}@example.com", hashed_password="x") for i in range(WRITERS)]
+        db.add_all(users)
+        await db.flush()
+        channel = Channel(name="bench", created_by=users[0].id)
+        db.add(channel)
+        await db.flush()
+        db.add_all(ChannelMember(channel_id=channel.id, user_id=u.id) for u in users)
+        await db.commit()
+        return channel.id, [u.id for u in users]
+
+
+async def _writer(session_factory, channel_id: int, user_id: int, stats: dict) -> None:
+    for i in range(MESSAGES):
+        try:
+            async with session_factory() as db:
+                await ChatService.create_message(db, MessageCreate(channel_id=channel_id, content=f"msg {i}"), user_id)
+            stats["ok"] += 1
+        except OperationalError as e:
+            stats["errors"] += 1
+            stats.setdefault("sample", str(e.orig))
+
+
+async def _scenario(name: str, factory, tmp: str) -> None:
+    url = f"sqlite+aiosqlite:///{os.path.join(tmp, name.replace('+', '_') + '.db')}"
+    engine, session_factory = factory(url)
+    channel_id, user_ids = await _seed(engine, session_factory)
+
+    stats = {"ok": 0, "errors": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(_writer(session_factory, channel_id, uid, stats) for uid in user_ids))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+
+    print(f"{name:>16} {stats['ok']:>8} {stats['errors']:>8} {elapsed:>9.2f} {stats['ok'] / elapsed:>10.0f}")
+    if stats["errors"]:
+        print(f"{'':>16} first error: {stats['sample']}")
+
+
+async def run() -> None:
+    print(f"{WRITERS} concurrent writers x {MESSAGES} messages")
+    print(f"{'mode':>16} {'ok':>8} {'errors':>8} {'seconds':>9} {'msgs/s':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        await _scenario("legacy", _legacy, tmp)
+        await _scenario("pool+WAL", _pooled, tmp)
+        await _scenario("pool+WAL+queue", _pooled_queue, tmp)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
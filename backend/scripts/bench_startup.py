@@ -0,0 +1,98 @@
+"""
+Benchmark: API process startup time, full vs. fast startup mode.
+
+Each scenario runs in a fresh interpreter against a temporary SQLite
+database and measures
+- importing app.main (routers, models, middleware),
+- the database part of the lifespan: init_db, seed_db.main() in full mode,
+  and loading the settings cache.
+Redis, SMTP and mDNS are left out: they cost the same in both modes.
+
+Usage (from backend/):
+    python -m scripts.bench_startup [runs]
+"""
+import os
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+CHILD = r'''
+import asyncio, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+
+async def startup():
+    from app.core.config import get_settings
+    from app.core.config_service import ConfigService
+    from app.core.database import init_db, engine, AsyncSessionLocal
+    fast = get_settings().fast_startup
+    await init_db(fast=fast)
+    if not fast:
+        from scripts import seed_db
+        await seed_db.main()
+    async with AsyncSessionLocal() as db:
+        await ConfigService.load(db)
+    await engine.dispose()
+
+asyncio.run(startup())
+t2 = time.perf_counter()
+print(f"RESULT {t1 - t0:.4f} {t2 - t1:.4f}")
+'''
+
+DEFERRED = r'''
+import time
+t0 = time.perf_counter()
+import zeroconf.asyncio, magic, PIL.Image, psutil
+print(f"RESULT {time.perf_counter() - t0:.4f} 0")
+'''
+
+
+def _run(code: str, db_path: str, fast: bool) -> tuple:
+    env = dict(
+        os.environ,
+        SECRET_KEY=os.environ.get("SECRET_KEY", secrets.token_hex(32)),
+        DEBUG="true",
+        DATABASE_URL=f"sqlite+aiosqlite:///{db_path}",
+        FAST_STARTUP="true" if fast else "false",
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    line = next(l for l in out.splitlines() if l.startswith("RESULT"))
+    import_s, db_s = map(float, line.split()[1:])
+    return import_s, db_s
+
+
+def _report(name: str, samples: list) -> None:
+    import_s = statistics.median(s[0] for s in samples)
+    db_s = statistics.median(s[1] for s in samples)
+    print(f"{name:>22} {import_s:>9.3f} {db_s:>9.3f} {import_s + db_s:>9.3f}")
+
+
+def main() -> None:
+    print(f"median of {RUNS} runs, seconds")
+    print(f"{'scenario':>22} {'import':>9} {'db init':>9} {'total':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        first = []
+        for i in range(RUNS):
+            first.append(_run(CHILD, os.path.join(tmp, f"first{i}.db"), fast=False))
+        _report("first boot", first)
+
+        db_path = os.path.join(tmp, "warm.db")
+        _run(CHILD, db_path, fast=False)
+        _report("restart, full mode", [_run(CHILD, db_path, fast=False) for _ in range(RUNS)])
+        _report("restart, fast mode", [_run(CHILD, db_path, fast=True) for _ in range(RUNS)])
+
+        deferred = statistics.median(_run(DEFERRED, db_path, fast=True)[0] for _ in range(RUNS))
+        print(f"deferred imports (zeroconf, magic, PIL, psutil) now loaded on first use: {deferred:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
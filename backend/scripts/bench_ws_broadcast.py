@@ -0,0 +1,98 @@
+"""
+Micro-benchmark: channel broadcast cost vs. number of recipients.
+
+Compares the serialize-once broadcast path of WebSocketManager with
+per-recipient send_json serialization, using in-memory sockets.
+
+Usage (from backend/):
+    python -m scripts.bench_ws_broadcast
+"""
+import asyncio
+import json
+import os
+import secrets
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", secrets.token_hex(32))
+os.environ.setdefault("DEBUG", "true")
+
+from app.core.websocket_manager import WebSocketManager
+
+RECIPIENT_COUNTS = [10, 100, 500, 2000]
+ROUNDS = 20
+
+MESSAGE = {
+    "type": "new_message",
+    "id": 123456,
+    "channel_id": 42,
+    "user_id": 7,
+    "username": "ivanov",
+    "full_name": "Иванов Иван Иванович",
+    "rank": "майор",
+    "role": "user",
+    "avatar_url": "/static/avatars/7.png",
+    "content": "Текст сообщения " * 20,
+    "document_id": None,
+    "parent_id": None,
+    "parent": None,
+    "is_document_deleted": False,
+    "created_at": "2026-01-01T12:00:00",
+    "mentions": [1, 2, 3],
+    "reply_count": 0,
+}
+
+
+class NullWebSocket:
+    """Socket that accepts frames without doing I/O"""
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, data: str) -> None:
+        pass
+
+    async def send_json(self, data) -> None:
+        # Mirrors starlette's WebSocket.send_json serialization
+        json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+async def _per_recipient_broadcast(sockets) -> None:
+    await asyncio.gather(*(ws.send_json(MESSAGE) for ws in sockets))
+
+
+async def _flush(manager: WebSocketManager) -> None:
+    """Wait until every writer task has sent its queued frames"""
+    while any(writer._pending for writer in manager._writers.values()):
+        await asyncio.sleep(0)
+
+
+async def run() -> None:
+    print(f"{'recipients':>10} {'per-recipient ms':>18} {'serialize-once ms':>18} {'speedup':>8}")
+    for count in RECIPIENT_COUNTS:
+        manager = WebSocketManager()
+        sockets = [NullWebSocket() for _ in range(count)]
+        for i, ws in enumerate(sockets):
+            manager._add_channel_socket(ws, 1, i)
+
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            await _per_recipient_broadcast(sockets)
+        baseline = (time.perf_counter() - start) / ROUNDS * 1000
+
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            await manager.broadcast_to_channel(1, MESSAGE)
+            await _flush(manager)
+        optimized = (time.perf_counter() - start) / ROUNDS * 1000
+
+        for ws in sockets:
+            manager._release_writer(ws)
+        await asyncio.sleep(0)
+
+        print(f"{count:>10} {baseline:>18.2f} {optimized:>18.2f} {baseline / optimized:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
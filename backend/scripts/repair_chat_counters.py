@@ -0,0 +1,30 @@
+"""
+Backfill/repair denormalized chat data:
+messages.reply_count, channels.last_message_id/at/sender_name/preview
+and channel_members.unread_count.
+
+Usage (from backend/):
+    python -m scripts.repair_chat_counters              # all channels
+    python -m scripts.repair_chat_counters 12 15        # selected channels
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import AsyncSessionLocal, init_db
+from app.modules.chat.service import ChatService
+
+
+async def repair(channel_ids=None) -> None:
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        await ChatService.repair_denormalized(db, channel_ids)
+    scope = f"channels {', '.join(map(str, channel_ids))}" if channel_ids else "all channels"
+    print(f"Reply counts, last message previews and unread counters rebuilt for {scope}")
+
+
+if __name__ == "__main__":
+    ids = [int(arg) for arg in sys.argv[1:]] or None
+    asyncio.run(repair(ids))
@@ -0,0 +1,95 @@
+import os
+import secrets
+
+# Settings are validated at import time, so configure a test environment
+# before anything from `app` is imported.
+os.environ.setdefault("SECRET_KEY", secrets.token_hex(32))
+os.environ.setdefault("DEBUG", "true")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+
+
+class QueryCounter:
+    """Counts SQL statements executed on an engine"""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args, **kwargs) -> None:
+        self.count += 1
+
+    def reset(self) -> None:
+        self.count = 0
+
+
+@pytest_asyncio.fixture
+async def db_engine():
+    import app.core.models
+    import app.modules.auth.models
+    import app.modules.chat.models
+    import app.modules.board.models
+    import app.modules.archive.models
+    import app.modules.admin.models
+    import app.modules.tasks.models
+    import app.modules.email.models
+    import app.modules.zsspd.models
+
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def db_session(db_engine):
+    session_factory = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+def query_counter(db_engine):
+    counter = QueryCounter()
+    event.listen(db_engine.sync_engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(db_engine.sync_engine, "before_cursor_execute", counter)
+
+
+@pytest_asyncio.fixture
+async def store(db_engine, tmp_path, monkeypatch):
+    """The global blob store, rooted in a temporary working directory"""
+    from app.core.blobs import blob_store
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        blob_store, "_session_factory", async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    )
+    monkeypatch.setattr(blob_store, "_released", set())
+    monkeypatch.setattr(blob_store, "_retired", [])
+    return blob_store
+
+
+@pytest_asyncio.fixture
+async def owner(db_session):
+    """Two units and a user of the first one, as `(units, user)`"""
+    from app.modules.auth.models import Unit, User
+
+    units = [Unit(name="Штаб"), Unit(name="Связь")]
+    db_session.add_all(units)
+    await db_session.flush()
+    user = User(username="owner", email="owner@example.com", hashed_password="x", unit_id=units[0].id)
+    db_session.add(user)
+    await db_session.commit()
+    return units, user
@@ -0,0 +1,243 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import app.modules.admin.service as admin_service
+from app.core.database import Base, create_engine_with_pool, create_session_factory
+from app.core.events import event_bus
+from app.core.sqlite_writer import sqlite_write_queue
+from app.modules.admin.service import AdminService
+from app.modules.admin.stats import StatsCollector, storage_category
+from app.modules.archive.models import ArchiveFile
+from app.modules.auth.models import Unit, User
+from app.modules.board.schemas import DocumentCreate
+from app.modules.board.service import BoardService
+from app.modules.chat.models import Channel, ChannelMember
+from app.modules.chat.schemas import MessageCreate
+from app.modules.chat.service import ChatService
+from app.modules.tasks.events import TaskCreated, TaskStatusChanged
+from app.modules.tasks.models import Task, TaskStatus
+
+
+@pytest_asyncio.fixture
+async def collector(db_engine, monkeypatch):
+    session_factory = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    stats = StatsCollector(session_factory=session_factory)
+    monkeypatch.setattr(admin_service, "stats_collector", stats)
+    await stats.subscribe(event_bus)
+    yield stats
+    for handlers in event_bus._handlers.values():
+        handlers[:] = [h for h in handlers if getattr(h, "__self__", None) is not stats]
+
+
+def _nonzero(values: dict) -> dict:
+    return {key: value for key, value in values.items() if value}
+
+
+async def _seed(db):
+    unit = Unit(name="Штаб")
+    db.add(unit)
+    await db.flush()
+    users = [User(username=f"u{i}", email=f"u{i}@example.com", hashed_password="x", unit_id=unit.id) for i in range(3)]
+    db.add_all(users)
+    await db.flush()
+    channel = Channel(name="general", created_by=users[0].id)
+    db.add(channel)
+    await db.flush()
+    db.add_all(ChannelMember(channel_id=channel.id, user_id=u.id) for u in users)
+    db.add_all([
+        ArchiveFile(title="scan", file_path="/uploads/archive/1/scan.png", file_size=1000,
+                    mime_type="image/png", owner_id=users[0].id, unit_id=unit.id),
+        ArchiveFile(title="report", file_path="/uploads/archive/1/report.pdf", file_size=500,
+                    mime_type="application/pdf", owner_id=users[0].id, unit_id=unit.id),
+    ])
+    deadline = datetime.utcnow() + timedelta(days=1)
+    db.add_all([
+        Task(issuer_id=users[0].id, assignee_id=users[1].id, title="t1", description="d", deadline=deadline),
+        Task(issuer_id=users[0].id, assignee_id=users[2].id, title="t2", description="d", deadline=deadline,
+             status=TaskStatus.COMPLETED),
+    ])
+    await db.commit()
+    return users, channel
+
+
+@pytest.mark.asyncio
+async def test_dashboard_reads_materialized_counters(db_session, collector, query_counter):
+    users, channel = await _seed(db_session)
+    for i in range(3):
+        await ChatService.create_message(db_session, MessageCreate(channel_id=channel.id, content=f"m{i}"), users[1].id)
+    await ChatService.create_message(db_session, MessageCreate(channel_id=channel.id, content="m"), users[2].id)
+    await collector.reconcile()
+
+    query_counter.reset()
+    overview = await AdminService.get_overview_stats(db_session)
+    # stat_counters + today's rollup, independent of table sizes
+    assert query_counter.count == 2
+    assert overview["total_users"] == 3
+    assert overview["messages_today"] == 4
+    assert overview["total_files"] == 2
+    assert overview["total_storage_size"] == 1500
+    assert overview["tasks_total"] == 2
+    assert overview["tasks_in_progress"] == 1
+    assert overview["tasks_completed"] == 1
+
+    activity = await AdminService.get_activity_stats(db_session, days=7)
+    assert len(activity) == 7
+    assert activity[-1] == {
+        "date": datetime.utcnow().date().isoformat(), "messages": 4, "new_users": 3, "new_tasks": 2
+    }
+
+    storage = {row["name"]: row for row in await AdminService.get_storage_stats(db_session)}
+    assert storage["Images"]["value"] == 1000
+    assert storage["Documents"]["count"] == 1
+
+    top = await AdminService.get_top_active_users(db_session)
+    assert [(row["user"].id, row["count"]) for row in top] == [(users[1].id, 3), (users[2].id, 1)]
+
+
+@pytest.mark.asyncio
+async def test_events_keep_counters_in_sync_with_reconciliation(db_session, collector):
+    users, channel = await _seed(db_session)
+    await collector.reconcile()
+
+    message = await ChatService.create_message(
+        db_session, MessageCreate(channel_id=channel.id, content="hello"), users[0].id
+    )
+    await BoardService.create_document(
+        db_session, DocumentCreate(title="doc"), "/uploads/documents/plan.docx", users[0].id, file_size=300
+    )
+    task = await db_session.scalar(select(Task).where(Task.title == "t1"))
+    task.status = TaskStatus.ON_REVIEW
+    await db_session.commit()
+    await event_bus.publish(TaskStatusChanged(task_id=task.id, old_status=TaskStatus.IN_PROGRESS,
+                                              new_status=TaskStatus.ON_REVIEW))
+
+    # Deltas of this process are visible before they are written
+    overview = await AdminService.get_overview_stats(db_session)
+    assert overview["messages_today"] == 1
+    assert overview["total_files"] == 3
+    assert overview["tasks_on_review"] == 1
+    assert overview["tasks_in_progress"] == 0
+
+    assert await collector.flush() > 0
+    flushed = _nonzero(await collector.get_counters(db_session))
+    flushed_daily = _nonzero(await collector.get_daily(db_session, datetime.utcnow().date()))
+
+    await ChatService.delete_message(db_session, message.id, users[0].id)
+    await collector.flush()
+    assert (await collector.get_daily(db_session, datetime.utcnow().date()))[
+        (datetime.utcnow().date(), "messages")
+    ] == 0
+
+    # Apart from the deleted message, incremental maintenance matches a full recount
+    await ChatService.create_message(db_session, MessageCreate(channel_id=channel.id, content="again"), users[0].id)
+    await collector.flush()
+    await collector.reconcile()
+    assert _nonzero(await collector.get_counters(db_session)) == flushed
+    assert _nonzero(await collector.get_daily(db_session, datetime.utcnow().date())) == flushed_daily
+
+
+@pytest.mark.asyncio
+async def test_bulk_operations_request_reconciliation(db_session, collector):
+    users, channel = await _seed(db_session)
+    await collector.reconcile()
+    await ChatService.create_message(db_session, MessageCreate(channel_id=channel.id, content="x"), users[0].id)
+    await collector.flush()
+
+    assert await ChatService.delete_channel(db_session, channel.id, users[0]) is True
+    assert collector._reconcile_requested is True
+
+    await collector.reconcile()
+    today = datetime.utcnow().date()
+    assert (await collector.get_daily(db_session, today))[(today, "messages")] == 0
+    assert await AdminService.get_top_active_users(db_session) == []
+
+
+@pytest.mark.asyncio
+async def test_task_events_roll_up_by_day(db_session, collector):
+    created = datetime.utcnow() - timedelta(days=2)
+    await event_bus.publish(TaskCreated(task_id=1, status=TaskStatus.IN_PROGRESS, created_at=created.isoformat()))
+    await collector.flush()
+
+    activity = await AdminService.get_activity_stats(db_session, days=3)
+    assert [row["new_tasks"] for row in activity] == [1, 0, 0]
+
+
+@pytest.mark.asyncio
+async def test_storage_categories_match_in_sql(db_session, collector):
+    users, _ = await _seed(db_session)
+    files = [
+        ("video/mp4", "/a/clip.bin"), (None, "/a/Photo.JPG"), ("", "/a/song.flac"), (None, "/a/backup.tar.gz"),
+        ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", "/a/x"),
+        ("application/octet-stream", "/a/noext"), (None, "/a/table.xlsx"), ("application/x-7z-compressed", "/a/b.7z"),
+    ]
+    db_session.add_all(
+        ArchiveFile(title="f", file_path=path, file_size=10, mime_type=mime, owner_id=users[0].id, unit_id=users[0].unit_id)
+        for mime, path in files
+    )
+    await db_session.commit()
+    await collector.reconcile()
+
+    expected = {}
+    for mime, path in files + [("image/png", "/uploads/archive/1/scan.png"), ("application/pdf", "/uploads/archive/1/report.pdf")]:
+        category = storage_category(mime, path)
+        expected[category] = expected.get(category, 0) + 1
+    counters = await collector.get_counters(db_session)
+    assert {key.split(":")[1]: value for key, value in counters.items() if key.endswith(":count") and value} == expected
+
+
+@pytest.mark.asyncio
+async def test_reconcile_runs_on_one_worker(db_session, collector, db_engine):
+    await _seed(db_session)
+    other = StatsCollector(session_factory=async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False))
+
+    assert await collector.reconcile(min_age=3600) is True
+    # Another worker starting up right after skips the recount
+    assert await other.reconcile(min_age=3600) is False
+    assert await other.reconcile(min_age=0) is True
+
+
+@pytest.mark.asyncio
+async def test_reconcile_supersedes_buffered_deltas(db_session, collector):
+    users, channel = await _seed(db_session)
+    await collector.reconcile()
+    await ChatService.create_message(db_session, MessageCreate(channel_id=channel.id, content="x"), users[0].id)
+    await BoardService.create_document(
+        db_session, DocumentCreate(title="doc"), "/uploads/documents/plan.docx", users[0].id, file_size=300
+    )
+
+    # The recount already includes the rows behind the unwritten deltas
+    await collector.reconcile()
+    await collector.flush()
+
+    overview = await AdminService.get_overview_stats(db_session)
+    assert overview["messages_today"] == 1
+    assert overview["total_files"] == 3
+
+
+@pytest.mark.asyncio
+async def test_recount_scan_does_not_hold_the_writer(tmp_path):
+    import app.modules.admin.models  # noqa: F401
+    import app.modules.tasks.models  # noqa: F401
+
+    engine = create_engine_with_pool(f"sqlite+aiosqlite:///{tmp_path / 'stats.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    stats = StatsCollector(session_factory=create_session_factory(engine))
+    recount = stats._recount
+    writer_free = []
+
+    async def watched_recount(db):
+        writer_free.append(not sqlite_write_queue._get_lock().locked())
+        return await recount(db)
+
+    stats._recount = watched_recount
+    try:
+        assert await stats.reconcile() is True
+    finally:
+        await engine.dispose()
+    # Chat posts and uploads can commit while the aggregates run
+    assert writer_free == [True]
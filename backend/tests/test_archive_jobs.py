@@ -0,0 +1,208 @@
+import io
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import func, select, update
+
+from app.core.websocket_manager import websocket_manager
+from app.modules.archive import jobs as jobs_module
+from app.modules.archive.jobs import ArchiveJobRunner
+from app.modules.archive.models import ArchiveFile, ArchiveJob
+from app.modules.archive.service import ArchiveService
+
+
+@pytest.fixture
+def runner(store):
+    return ArchiveJobRunner(lease=60, session_factory=store._session_factory)
+
+
+@pytest.fixture
+def progress(monkeypatch):
+    """Messages sent to users over the WebSocket"""
+    sent = []
+
+    async def broadcast_to_user(user_id, message):
+        sent.append((user_id, message))
+
+    monkeypatch.setattr(websocket_manager, "broadcast_to_user", broadcast_to_user)
+    return sent
+
+
+async def _scans(db, user, files):
+    file_ids = []
+    for i in range(files):
+        record = await ArchiveService.save_file(
+            db, UploadFile(io.BytesIO(b"%%PDF-1.4 %d" % i), filename="scan.pdf"), f"scan {i}",
+            None, owner_id=user.id, unit_id=user.unit_id
+        )
+        file_ids.append(record.id)
+    return file_ids
+
+
+async def _copies(db, unit_id):
+    return await db.scalar(select(func.count()).select_from(ArchiveFile).where(ArchiveFile.unit_id == unit_id))
+
+
+@pytest.mark.asyncio
+async def test_job_runs_in_chunks_and_reports_progress(db_session, runner, progress, monkeypatch, owner):
+    monkeypatch.setattr(jobs_module, "CHUNK_SIZE", 2)
+    (unit, other_unit), user = owner
+    file_ids = await _scans(db_session, user, 5)
+
+    job = await runner.submit(
+        db_session, user.id, "copy", file_ids, ["file"] * 5, None, other_unit.id, False
+    )
+    assert await runner.claim() == job.id
+    assert await runner.claim() is None
+    await runner.process(job.id)
+
+    await db_session.refresh(job)
+    assert (job.status, job.done, job.total) == ("completed", 5, 5)
+    assert await _copies(db_session, other_unit.id) == 5
+    assert [(m["status"], m["done"]) for _, m in progress] == [
+        ("running", 0), ("running", 2), ("running", 4), ("running", 5), ("completed", 5)
+    ]
+    assert all(user_id == user.id and m["type"] == "archive_job" for user_id, m in progress)
+
+
+@pytest.mark.asyncio
+async def test_interrupted_job_resumes_after_lease(db_session, runner, progress, owner):
+    (unit, other_unit), user = owner
+    file_ids = await _scans(db_session, user, 3)
+    # A worker died after committing the first item
+    await ArchiveService.copy_items(db_session, file_ids[:1], ["file"], None, other_unit.id, False, user.id)
+    job = ArchiveJob(
+        user_id=user.id, action="copy", items=[["file", i] for i in file_ids],
+        target_unit_id=other_unit.id, status="running", done=1
+    )
+    db_session.add(job)
+    await db_session.commit()
+
+    # Still leased by the dead worker
+    assert await runner.claim() is None
+
+    job.updated_at = datetime.utcnow() - timedelta(seconds=120)
+    await db_session.commit()
+    assert await runner.claim() == job.id
+    await runner.process(job.id)
+
+    await db_session.refresh(job)
+    assert job.status == "completed"
+    # Nothing was copied twice
+    assert await _copies(db_session, other_unit.id) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_rolls_back_with_its_progress(db_session, runner, progress, monkeypatch, owner):
+    (unit, other_unit), user = owner
+    file_ids = await _scans(db_session, user, 2)
+
+    async def broken_copy(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(ArchiveService, "copy_items", broken_copy)
+    job = await runner.submit(db_session, user.id, "copy", file_ids, ["file"] * 2, None, other_unit.id, False)
+    assert await runner.claim() == job.id
+    await runner.process(job.id)
+
+    await db_session.refresh(job)
+    assert (job.status, job.done, job.error) == ("failed", 0, "disk full")
+    assert progress[-1][1]["status"] == "failed"
+
+
+@pytest.mark.asyncio
+async def test_job_fails_when_target_folder_is_deleted(db_session, runner, progress, monkeypatch, owner):
+    monkeypatch.setattr(jobs_module, "CHUNK_SIZE", 1)
+    (unit, _), user = owner
+    file_ids = await _scans(db_session, user, 3)
+    target = await ArchiveService.create_folder(db_session, "target", unit.id, user.id)
+    job = await runner.submit(db_session, user.id, "move", file_ids, ["file"] * 3, target.id, unit.id, False)
+    assert await runner.claim() == job.id
+
+    apply = ArchiveJobRunner._apply
+    applied = 0
+
+    async def apply_then_delete(db, job, chunk):
+        nonlocal applied
+        await apply(db, job, chunk)
+        applied += 1
+        if applied == 1:
+            async with runner._get_session_factory()() as other:
+                await ArchiveService.delete_folder(other, target.id)
+
+    monkeypatch.setattr(ArchiveJobRunner, "_apply", staticmethod(apply_then_delete))
+    await runner.process(job.id)
+
+    await db_session.refresh(job)
+    assert (job.status, job.done, job.error) == ("failed", 1, "Целевая папка удалена")
+    # The moved file went with the folder, the rest stayed where they were
+    remaining = (await db_session.execute(select(ArchiveFile.id, ArchiveFile.folder_id))).all()
+    assert sorted(remaining) == [(file_ids[1], None), (file_ids[2], None)]
+
+
+@pytest.mark.asyncio
+async def test_deleting_target_folder_fails_queued_jobs(db_session, runner, progress, owner):
+    (unit, _), user = owner
+    file_ids = await _scans(db_session, user, 1)
+    parent = await ArchiveService.create_folder(db_session, "parent", unit.id, user.id)
+    child = await ArchiveService.create_folder(db_session, "child", unit.id, user.id, parent_id=parent.id)
+    job = await runner.submit(db_session, user.id, "copy", file_ids, ["file"], child.id, unit.id, False)
+
+    await ArchiveService.delete_folder(db_session, parent.id)
+
+    await db_session.refresh(job)
+    assert (job.status, job.error) == ("failed", "Целевая папка удалена")
+    assert await runner.claim() is None
+
+
+@pytest.mark.asyncio
+async def test_worker_stops_after_its_lease_is_taken_over(db_session, runner, progress, monkeypatch, owner):
+    monkeypatch.setattr(jobs_module, "CHUNK_SIZE", 1)
+    (unit, other_unit), user = owner
+    file_ids = await _scans(db_session, user, 3)
+    job = await runner.submit(db_session, user.id, "copy", file_ids, ["file"] * 3, None, other_unit.id, False)
+    assert await runner.claim() == job.id
+
+    successor = ArchiveJobRunner(lease=60, session_factory=runner._get_session_factory())
+    apply = ArchiveJobRunner._apply
+
+    async def slow_apply(db, job, chunk):
+        await apply(db, job, chunk)
+        if job.done == 1:
+            # The first chunk outlived the lease and another worker took the job over
+            async with runner._get_session_factory()() as other:
+                await other.execute(
+                    update(ArchiveJob).where(ArchiveJob.id == job.id)
+                    .values(updated_at=datetime.utcnow() - timedelta(seconds=120))
+                )
+                await other.commit()
+            assert await successor.claim() == job.id
+
+    monkeypatch.setattr(ArchiveJobRunner, "_apply", staticmethod(slow_apply))
+    await runner.process(job.id)
+
+    await db_session.refresh(job)
+    assert (job.status, job.done) == ("running", 1)
+
+    monkeypatch.setattr(ArchiveJobRunner, "_apply", staticmethod(apply))
+    await successor.process(job.id)
+
+    await db_session.refresh(job)
+    assert (job.status, job.done) == ("completed", 3)
+    # Nothing was copied twice
+    assert await _copies(db_session, other_unit.id) == 3
+
+
+@pytest.mark.asyncio
+async def test_item_units_in_one_query(db_session, runner, query_counter, owner):
+    (unit, _), user = owner
+    file_ids = await _scans(db_session, user, 3)
+    folder = await ArchiveService.create_folder(db_session, "docs", unit.id, user.id)
+
+    query_counter.reset()
+    units = await ArchiveService.get_item_units(
+        db_session, file_ids + [folder.id, 999], ["file"] * 3 + ["folder", "file"]
+    )
+    assert query_counter.count == 1
+    assert units == {**{("file", i): unit.id for i in file_ids}, ("folder", folder.id): unit.id}
@@ -0,0 +1,144 @@
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import func, select, update
+
+from app.core.models import Blob
+from app.modules.archive.models import ArchiveFile, ArchiveFolder
+from app.modules.archive.service import ArchiveService
+
+
+async def _chain(db, depth, unit_id, owner_id, parent_id=None):
+    """Folders nested `depth` levels deep, each holding one file with the same content"""
+    folders = []
+    for level in range(depth):
+        folder = await ArchiveService.create_folder(db, f"level {level}", unit_id, owner_id, parent_id)
+        await ArchiveService.save_file(
+            db, UploadFile(io.BytesIO(b"%PDF-1.4 page"), filename="page.pdf"), f"page {level}",
+            None, owner_id=owner_id, unit_id=unit_id, folder_id=folder.id
+        )
+        folders.append(folder)
+        parent_id = folder.id
+    return folders
+
+
+@pytest.mark.asyncio
+async def test_create_folder_builds_path(db_session, store, owner):
+    (unit, _), user = owner
+    root, child, grandchild = await _chain(db_session, 3, unit.id, user.id)
+
+    assert root.path == f"/{root.id}/"
+    assert grandchild.path == f"/{root.id}/{child.id}/{grandchild.id}/"
+
+
+@pytest.mark.asyncio
+async def test_move_rewrites_subtree_in_bulk(db_session, store, query_counter, owner):
+    (unit, other_unit), user = owner
+    folders = await _chain(db_session, 6, unit.id, user.id)
+    target = await ArchiveService.create_folder(db_session, "target", other_unit.id, user.id, is_private=True)
+
+    query_counter.reset()
+    await ArchiveService.move_items(db_session, [folders[1].id], ["folder"], target.id, other_unit.id, True)
+    assert query_counter.count <= 8
+
+    moved = (await db_session.execute(
+        select(ArchiveFolder).where(ArchiveFolder.id.in_([f.id for f in folders[1:]])).order_by(ArchiveFolder.id)
+    )).scalars().all()
+    assert moved[0].parent_id == target.id
+    assert moved[-1].path == target.path + "".join(f"{f.id}/" for f in folders[1:])
+    assert all(f.unit_id == other_unit.id and f.is_private for f in moved)
+
+    files = (await db_session.execute(
+        select(ArchiveFile).where(ArchiveFile.folder_id.in_([f.id for f in folders[1:]]))
+    )).scalars().all()
+    assert len(files) == 5
+    assert all(f.unit_id == other_unit.id and f.is_private for f in files)
+    # The folder left behind keeps its context
+    assert (await ArchiveService.get_folder_by_id(db_session, folders[0].id)).unit_id == unit.id
+
+
+@pytest.mark.asyncio
+async def test_folder_cannot_move_into_own_subtree(db_session, store, owner):
+    (unit, _), user = owner
+    root, child = await _chain(db_session, 2, unit.id, user.id)
+
+    await ArchiveService.move_items(db_session, [root.id], ["folder"], child.id, unit.id, False)
+
+    assert (await ArchiveService.get_folder_by_id(db_session, root.id)).parent_id is None
+    assert child.path == f"/{root.id}/{child.id}/"
+
+
+@pytest.mark.asyncio
+async def test_delete_removes_subtree_in_one_transaction(db_session, store, query_counter, owner):
+    (unit, _), user = owner
+    folders = await _chain(db_session, 6, unit.id, user.id)
+    sha256 = (await db_session.execute(select(ArchiveFile.blob_sha256))).scalars().first()
+    legacy_path = os.path.join("uploads", "archive", str(unit.id), "1_old.txt")
+    os.makedirs(os.path.dirname(legacy_path), exist_ok=True)
+    with open(legacy_path, "wb") as f:
+        f.write(b"from before the store")
+    db_session.add(ArchiveFile(
+        title="old", file_path=f"/{legacy_path}", owner_id=user.id, unit_id=unit.id, folder_id=folders[-1].id
+    ))
+    await db_session.commit()
+
+    query_counter.reset()
+    assert await ArchiveService.delete_folder(db_session, folders[0].id)
+    assert query_counter.count <= 8
+
+    assert await db_session.scalar(select(func.count()).select_from(ArchiveFolder)) == 0
+    assert await db_session.scalar(select(func.count()).select_from(ArchiveFile)) == 0
+    assert await db_session.scalar(select(Blob.ref_count).where(Blob.sha256 == sha256)) == 0
+    # Disk cleanup is left to the background collector
+    assert store._released == {sha256}
+    assert store._retired == [os.path.abspath(legacy_path)]
+    assert os.path.exists(legacy_path)
+
+
+@pytest.mark.asyncio
+async def test_copy_duplicates_subtree_sharing_content(db_session, store, owner):
+    (unit, other_unit), user = owner
+    folders = await _chain(db_session, 4, unit.id, user.id)
+    sha256 = (await db_session.execute(select(ArchiveFile.blob_sha256))).scalars().first()
+
+    await ArchiveService.copy_items(db_session, [folders[0].id], ["folder"], None, other_unit.id, False, user.id)
+
+    copies = (await db_session.execute(
+        select(ArchiveFolder).where(ArchiveFolder.unit_id == other_unit.id).order_by(func.length(ArchiveFolder.path))
+    )).scalars().all()
+    assert [f.name for f in copies] == [f.name for f in folders]
+    assert copies[0].parent_id is None and copies[0].path == f"/{copies[0].id}/"
+    for parent, child in zip(copies, copies[1:]):
+        assert child.parent_id == parent.id
+        assert child.path == f"{parent.path}{child.id}/"
+
+    copied_files = (await db_session.execute(
+        select(ArchiveFile).where(ArchiveFile.unit_id == other_unit.id)
+    )).scalars().all()
+    assert sorted(f.folder_id for f in copied_files) == [f.id for f in copies]
+    assert await db_session.scalar(select(Blob.ref_count).where(Blob.sha256 == sha256)) == 8
+
+
+@pytest.mark.asyncio
+async def test_folders_without_path_are_repaired(db_session, store, owner):
+    (unit, _), user = owner
+    root, child, grandchild = await _chain(db_session, 3, unit.id, user.id)
+    target = await ArchiveService.create_folder(db_session, "target", unit.id, user.id)
+    root_id, child_id, grandchild_id, target_id = root.id, child.id, grandchild.id, target.id
+    # Rows the path backfill missed
+    await db_session.execute(
+        update(ArchiveFolder).where(ArchiveFolder.id.in_([root_id, child_id])).values(path="")
+    )
+    await db_session.commit()
+    db_session.expunge_all()
+
+    await ArchiveService.move_items(db_session, [root_id], ["folder"], target_id, unit.id, False)
+
+    paths = dict((await db_session.execute(select(ArchiveFolder.id, ArchiveFolder.path))).all())
+    assert paths[root_id] == f"/{target_id}/{root_id}/"
+    assert paths[grandchild_id] == f"/{target_id}/{root_id}/{child_id}/{grandchild_id}/"
+
+    await ArchiveService.delete_folder(db_session, target_id)
+    assert await db_session.scalar(select(func.count()).select_from(ArchiveFolder)) == 0
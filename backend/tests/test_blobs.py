@@ -0,0 +1,111 @@
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import select
+
+from app.core.models import Blob
+from app.modules.archive.models import ArchiveFile
+from app.modules.archive.service import ArchiveService
+
+
+def _upload(data: bytes, filename: str = "report.pdf") -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename=filename)
+
+
+async def _ref_count(db, sha256):
+    return await db.scalar(select(Blob.ref_count).where(Blob.sha256 == sha256))
+
+
+@pytest.mark.asyncio
+async def test_same_content_is_stored_once(db_session, store):
+    first = await store.put(db_session, _upload(b"same bytes"))
+    second = await store.put_bytes(db_session, b"same bytes")
+    await db_session.commit()
+
+    assert first.sha256 == second.sha256 and first.path == second.path
+    assert open(first.path, "rb").read() == b"same bytes"
+    assert await _ref_count(db_session, first.sha256) == 2
+    # Nothing left behind in the incoming area
+    assert os.listdir(os.path.join(store.root, "incoming")) == []
+
+
+@pytest.mark.asyncio
+async def test_last_release_collects_the_blob(db_session, store):
+    stored = await store.put(db_session, _upload(b"content"))
+    await store.add_ref(db_session, stored.sha256)
+    await db_session.commit()
+
+    await store.release(db_session, stored.sha256)
+    await db_session.commit()
+    assert store._released == {stored.sha256}
+    assert await store.collect(store._released) == 0
+    assert os.path.exists(stored.path)
+
+    # A rolled back release changes nothing
+    await store.release(db_session, stored.sha256)
+    await db_session.rollback()
+    assert await _ref_count(db_session, stored.sha256) == 1
+
+    await store.release(db_session, stored.sha256)
+    await db_session.commit()
+    assert await store.collect([stored.sha256]) == 1
+    assert not os.path.exists(stored.path)
+    assert await _ref_count(db_session, stored.sha256) is None
+
+
+@pytest.mark.asyncio
+async def test_archive_copy_only_adds_references(db_session, store, owner):
+    (unit, _), user = owner
+    original = await ArchiveService.save_file(
+        db_session, _upload(b"%PDF-1.4 scan"), "scan", None, owner_id=user.id, unit_id=unit.id
+    )
+    files_on_disk = sorted(os.listdir(os.path.join(store.root, original.blob_sha256[:2])))
+
+    await ArchiveService.copy_items(db_session, [original.id], ["file"], None, unit.id, False, user.id)
+
+    copies = (await db_session.execute(select(ArchiveFile).where(ArchiveFile.id != original.id))).scalars().all()
+    assert len(copies) == 1
+    assert copies[0].blob_sha256 == original.blob_sha256
+    assert copies[0].file_path.endswith("report.pdf")
+    assert sorted(os.listdir(os.path.join(store.root, original.blob_sha256[:2]))) == files_on_disk
+    assert await _ref_count(db_session, original.blob_sha256) == 2
+
+    await ArchiveService.delete_file(db_session, original.id)
+    await ArchiveService.delete_file(db_session, copies[0].id)
+    assert await store.collect(store._released) == 1
+    assert not os.path.exists(store.path(original.blob_sha256))
+
+
+@pytest.mark.asyncio
+async def test_legacy_file_moves_into_store_on_first_copy(db_session, store, owner):
+    (unit, _), user = owner
+    legacy_path = os.path.join("uploads", "archive", str(unit.id), "1_old.txt")
+    os.makedirs(os.path.dirname(legacy_path))
+    with open(legacy_path, "wb") as f:
+        f.write(b"from before the store")
+    legacy = ArchiveFile(title="old", file_path=f"/{legacy_path}", file_size=21, owner_id=user.id, unit_id=unit.id)
+    db_session.add(legacy)
+    await db_session.commit()
+
+    await ArchiveService.copy_items(db_session, [legacy.id], ["file"], None, unit.id, False, user.id)
+
+    await db_session.refresh(legacy)
+    assert legacy.blob_sha256 is not None
+    assert await _ref_count(db_session, legacy.blob_sha256) == 2
+    assert open(store.path(legacy.blob_sha256), "rb").read() == b"from before the store"
+    # The old file is retired once the copy committed
+    assert store._retired == [os.path.abspath(legacy_path)]
+
+
+@pytest.mark.asyncio
+async def test_sweep_removes_files_without_rows(db_session, store):
+    stored = await store.put(db_session, _upload(b"kept"))
+    await db_session.commit()
+    orphan = await store.put(db_session, _upload(b"rolled back"))
+    await db_session.rollback()
+
+    assert await store.sweep_orphans(grace=0) == 1
+    assert not os.path.exists(orphan.path)
+    assert os.path.exists(stored.path)
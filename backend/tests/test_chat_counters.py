@@ -0,0 +1,147 @@
+import pytest
+from sqlalchemy import select
+
+from app.modules.auth.models import User
+from app.modules.auth.service import UserService
+from app.modules.chat.models import Channel, Message
+from app.modules.chat.schemas import MessageCreate
+from app.modules.chat.service import ChatService
+
+
+async def _setup(db):
+    alice = User(username="alice", email="alice@example.com", hashed_password="x", full_name="Алиса")
+    bob = User(username="bob", email="bob@example.com", hashed_password="x", full_name="")
+    db.add_all([alice, bob])
+    await db.flush()
+    channel = Channel(name="general", created_by=alice.id)
+    db.add(channel)
+    await db.commit()
+    return alice, bob, channel
+
+
+async def _channel_row(db, channel_id):
+    result = await db.execute(
+        select(
+            Channel.last_message_id, Channel.last_sender_name, Channel.last_message_preview
+        ).where(Channel.id == channel_id)
+    )
+    return tuple(result.one())
+
+
+async def _reply_count(db, message_id):
+    return await db.scalar(select(Message.reply_count).where(Message.id == message_id))
+
+
+@pytest.mark.asyncio
+async def test_create_message_maintains_counters(db_session):
+    alice, bob, channel = await _setup(db_session)
+
+    root = await ChatService.create_message(db_session, MessageCreate(channel_id=channel.id, content="корень"), alice.id)
+    assert await _channel_row(db_session, channel.id) == (root.id, "Алиса", "корень")
+
+    reply = await ChatService.create_message(
+        db_session, MessageCreate(channel_id=channel.id, content="x" * 300, parent_id=root.id), bob.id
+    )
+    assert await _reply_count(db_session, root.id) == 1
+    # Empty full name falls back to the username
+    assert await _channel_row(db_session, channel.id) == (reply.id, "bob", "x" * 100)
+
+
+@pytest.mark.asyncio
+async def test_delete_message_maintains_counters(db_session):
+    alice, bob, channel = await _setup(db_session)
+    root = await ChatService.create_message(db_session, MessageCreate(channel_id=channel.id, content="корень"), alice.id)
+    reply = await ChatService.create_message(
+        db_session, MessageCreate(channel_id=channel.id, content="ответ", parent_id=root.id), bob.id
+    )
+
+    await ChatService.delete_message(db_session, reply.id, bob.id)
+    assert await _reply_count(db_session, root.id) == 0
+    assert await _channel_row(db_session, channel.id) == (root.id, "Алиса", "корень")
+
+    await ChatService.delete_message(db_session, root.id, alice.id)
+    assert await _channel_row(db_session, channel.id) == (None, None, None)
+
+
+@pytest.mark.asyncio
+async def test_repair_rebuilds_from_messages(db_session):
+    alice, bob, channel = await _setup(db_session)
+    root = Message(channel_id=channel.id, user_id=alice.id, content="корень")
+    db_session.add(root)
+    await db_session.flush()
+    db_session.add_all(Message(channel_id=channel.id, user_id=bob.id, content="ответ", parent_id=root.id) for _ in range(2))
+    await db_session.commit()
+
+    await ChatService.repair_denormalized(db_session)
+
+    assert await _reply_count(db_session, root.id) == 2
+    last_id, sender, preview = await _channel_row(db_session, channel.id)
+    assert (sender, preview) == ("bob", "ответ")
+    assert last_id == await db_session.scalar(select(Message.id).order_by(Message.id.desc()).limit(1))
+
+
+@pytest.mark.asyncio
+async def test_unread_counters_follow_writes_and_reads(db_session, query_counter):
+    alice, bob, channel = await _setup(db_session)
+    await ChatService.add_member(db_session, channel.id, alice.id)
+    await ChatService.add_member(db_session, channel.id, bob.id)
+
+    for i in range(3):
+        await ChatService.create_message(db_session, MessageCreate(channel_id=channel.id, content=f"m{i}"), alice.id)
+    last = await ChatService.create_message(db_session, MessageCreate(channel_id=channel.id, content="ответ"), bob.id)
+
+    query_counter.reset()
+    assert await ChatService.get_unread_counts(db_session, bob.id) == {channel.id: 0}
+    assert await ChatService.get_unread_counts(db_session, alice.id) == {channel.id: 1}
+    assert query_counter.count == 2
+
+    await ChatService.mark_channel_as_read(db_session, channel.id, alice.id)
+    assert await ChatService.get_unread_count(db_session, channel.id, alice.id) == 0
+
+    await ChatService.create_message(db_session, MessageCreate(channel_id=channel.id, content="ещё"), alice.id)
+    await ChatService.delete_message(db_session, last.id, bob.id)
+    assert await ChatService.get_unread_count(db_session, channel.id, bob.id) == 1
+
+
+@pytest.mark.asyncio
+async def test_new_member_sees_history_as_unread(db_session):
+    alice, bob, channel = await _setup(db_session)
+    for i in range(2):
+        await ChatService.create_message(db_session, MessageCreate(channel_id=channel.id, content=f"m{i}"), alice.id)
+
+    await ChatService.add_member(db_session, channel.id, bob.id)
+
+    assert await ChatService.get_unread_count(db_session, channel.id, bob.id) == 2
+
+
+@pytest.mark.asyncio
+async def test_deleting_thread_drops_unread_replies(db_session):
+    alice, bob, channel = await _setup(db_session)
+    await ChatService.add_member(db_session, channel.id, alice.id)
+    await ChatService.add_member(db_session, channel.id, bob.id)
+    root = await ChatService.create_message(db_session, MessageCreate(channel_id=channel.id, content="корень"), alice.id)
+    await ChatService.mark_channel_as_read(db_session, channel.id, bob.id)
+    await ChatService.create_message(
+        db_session, MessageCreate(channel_id=channel.id, content="ответ", parent_id=root.id), alice.id
+    )
+    assert await ChatService.get_unread_count(db_session, channel.id, bob.id) == 1
+
+    await ChatService.delete_message(db_session, root.id, alice.id)
+
+    # The reply went with its parent
+    assert await ChatService.get_unread_count(db_session, channel.id, bob.id) == 0
+
+
+@pytest.mark.asyncio
+async def test_deleting_user_drops_their_unread_messages(db_session):
+    alice, bob, channel = await _setup(db_session)
+    await ChatService.add_member(db_session, channel.id, alice.id)
+    await ChatService.add_member(db_session, channel.id, bob.id)
+    await ChatService.mark_channel_as_read(db_session, channel.id, alice.id)
+    for i in range(2):
+        await ChatService.create_message(db_session, MessageCreate(channel_id=channel.id, content=f"m{i}"), bob.id)
+    assert await ChatService.get_unread_count(db_session, channel.id, alice.id) == 2
+
+    assert await UserService.delete_user(db_session, bob.id) is True
+
+    assert await ChatService.get_unread_count(db_session, channel.id, alice.id) == 0
@@ -0,0 +1,52 @@
+import pytest
+
+from app.modules.auth.models import User
+from app.modules.chat.models import Channel, ChannelMember, Message
+from app.modules.chat.enrichers import enrich_channel, enrich_channels
+from app.modules.chat.service import ChatService
+from app.modules.chat.websocket import manager
+
+
+async def _seed_channels(db, count: int):
+    me = User(username="me", email="me@example.com", hashed_password="x", full_name="Me")
+    peer = User(username="peer", email="peer@example.com", hashed_password="x", full_name="Peer")
+    db.add_all([me, peer])
+    await db.flush()
+
+    channels = []
+    for i in range(count):
+        is_direct = i % 3 == 0
+        channel = Channel(name=f"channel-{i}", created_by=me.id, is_direct=is_direct)
+        db.add(channel)
+        await db.flush()
+        db.add(ChannelMember(channel_id=channel.id, user_id=me.id, last_read_message_id=0))
+        db.add(ChannelMember(channel_id=channel.id, user_id=peer.id))
+        for n in range(i % 4):
+            db.add(Message(channel_id=channel.id, user_id=peer.id, content=f"msg {n}"))
+        channels.append(channel)
+    await db.commit()
+    await ChatService.repair_denormalized(db)
+    return me, channels
+
+
+@pytest.mark.asyncio
+async def test_enrich_channels_matches_single_enrichment(db_session, monkeypatch):
+    me, channels = await _seed_channels(db_session, 8)
+    monkeypatch.setattr(manager, "get_online_user_ids", lambda: [me.id + 1])
+
+    batched = await enrich_channels(db_session, channels, me.id)
+    single = [await enrich_channel(db_session, c, me.id) for c in channels]
+
+    assert [r.model_dump() for r in batched] == [r.model_dump() for r in single]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("channel_count", [5, 50, 300])
+async def test_enrich_channels_query_count_is_constant(db_session, query_counter, channel_count):
+    me, channels = await _seed_channels(db_session, channel_count)
+
+    query_counter.reset()
+    responses = await enrich_channels(db_session, channels, me.id)
+
+    assert len(responses) == channel_count
+    assert query_counter.count <= 6
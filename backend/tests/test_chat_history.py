@@ -0,0 +1,89 @@
+import pytest
+
+from app.modules.auth.models import User
+from app.modules.chat.models import Channel, Message
+from app.modules.chat.schemas import MessageCreate
+from app.modules.chat.service import ChatService
+
+
+async def _seed_history(db, count: int):
+    user = User(username="author", email="author@example.com", hashed_password="x", full_name="Author")
+    db.add(user)
+    await db.flush()
+    channel = Channel(name="history", created_by=user.id)
+    other = Channel(name="noise", created_by=user.id)
+    db.add_all([channel, other])
+    await db.flush()
+
+    ids = []
+    for i in range(count):
+        msg = Message(channel_id=channel.id, user_id=user.id, content=f"msg {i}")
+        db.add(msg)
+        # Interleave another channel so ids in the history are not contiguous
+        db.add(Message(channel_id=other.id, user_id=user.id, content=f"noise {i}"))
+        await db.flush()
+        ids.append(msg.id)
+    await db.commit()
+    return channel, ids
+
+
+@pytest.mark.asyncio
+async def test_latest_page_is_chronological(db_session):
+    channel, ids = await _seed_history(db_session, 30)
+
+    page = await ChatService.get_channel_messages(db_session, channel.id, limit=10)
+
+    assert [m.id for m in page] == ids[-10:]
+
+
+@pytest.mark.asyncio
+async def test_before_and_after_cursors(db_session):
+    channel, ids = await _seed_history(db_session, 30)
+
+    older = await ChatService.get_channel_messages(db_session, channel.id, limit=10, before_id=ids[15])
+    newer = await ChatService.get_channel_messages(db_session, channel.id, limit=10, after_id=ids[15])
+
+    assert [m.id for m in older] == ids[5:15]
+    assert [m.id for m in newer] == ids[16:26]
+
+
+@pytest.mark.asyncio
+async def test_around_mode_centres_on_target(db_session):
+    channel, ids = await _seed_history(db_session, 30)
+
+    page = await ChatService.get_channel_messages(db_session, channel.id, limit=10, around_id=ids[2])
+    assert [m.id for m in page] == ids[0:10]
+
+    page = await ChatService.get_channel_messages(db_session, channel.id, limit=10, around_id=ids[15])
+    assert [m.id for m in page] == ids[10:20]
+
+
+@pytest.mark.asyncio
+async def test_reply_counts_are_attached(db_session):
+    channel, ids = await _seed_history(db_session, 5)
+    author_id = (await db_session.get(Message, ids[0])).user_id
+    for _ in range(3):
+        await ChatService.create_message(
+            db_session, MessageCreate(channel_id=channel.id, content="reply", parent_id=ids[1]), author_id
+        )
+
+    page = await ChatService.get_channel_messages(db_session, channel.id, limit=5, before_id=ids[4] + 1)
+
+    counts = {m.id: m.reply_count for m in page}
+    assert counts[ids[1]] == 3
+    assert counts[ids[2]] == 0
+
+
+@pytest.mark.asyncio
+async def test_deep_cursor_costs_same_queries_as_first_page(db_session, query_counter):
+    channel, ids = await _seed_history(db_session, 300)
+
+    query_counter.reset()
+    await ChatService.get_channel_messages(db_session, channel.id, limit=50)
+    first_page = query_counter.count
+
+    query_counter.reset()
+    await ChatService.get_channel_messages(db_session, channel.id, limit=50, before_id=ids[60])
+    deep_page = query_counter.count
+
+    assert deep_page == first_page <= 3
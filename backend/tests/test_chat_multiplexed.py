@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import WebSocketDisconnect
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import app.modules.chat.router as chat_router
+from app.core.security import create_access_token
+from app.modules.auth.models import User
+from app.modules.chat.models import Channel, ChannelMember
+from app.modules.chat.websocket import manager
+from tests.test_websocket_manager import FakeWebSocket, _drain
+
+
+class ScriptedWebSocket(FakeWebSocket):
+    """Client socket that sends a fixed list of frames, then disconnects"""
+
+    def __init__(self, frames: list) -> None:
+        super().__init__()
+        self.frames = list(frames)
+
+    async def receive_text(self) -> str:
+        # Give the server time to deliver the previous frame's broadcasts
+        await _drain()
+        if not self.frames:
+            raise WebSocketDisconnect()
+        return json.dumps(self.frames.pop(0))
+
+
+@pytest.fixture
+def session_factory(db_engine, monkeypatch):
+    factory = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(chat_router, "AsyncSessionLocal", factory)
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_multiplexed_socket_handles_typing_and_messages(session_factory):
+    async with session_factory() as db:
+        sender = User(
+            username="ivanov", email="ivanov@example.com", hashed_password="x",
+            full_name="Иванов И.И.", rank="майор", avatar_url="/static/avatars/1.png",
+        )
+        listener = User(username="petrov", email="petrov@example.com", hashed_password="x")
+        db.add_all([sender, listener])
+        await db.flush()
+        channel = Channel(name="general", created_by=sender.id)
+        db.add(channel)
+        await db.flush()
+        db.add_all(
+            ChannelMember(channel_id=channel.id, user_id=u.id, last_read_message_id=0) for u in (sender, listener)
+        )
+        await db.commit()
+
+    peer = FakeWebSocket()
+    await manager.connect(peer, channel.id, listener.id)
+
+    client = ScriptedWebSocket([
+        {"type": "subscribe", "channel_ids": [channel.id]},
+        {"type": "typing", "channel_id": channel.id},
+        {"channel_id": channel.id, "content": "привет"},
+    ])
+    try:
+        await asyncio.wait_for(
+            chat_router.multiplexed_websocket_endpoint(client, token=create_access_token({"sub": str(sender.id)})),
+            timeout=5,
+        )
+        await _drain()
+    finally:
+        await manager.disconnect(peer, channel.id, listener.id)
+
+    assert client.of_type("subscribed") == [{"type": "subscribed", "channel_ids": [channel.id], "denied": []}]
+    [typing] = peer.of_type("typing")
+    assert typing["user_id"] == sender.id
+    assert typing["username"] == "ivanov"
+    assert typing["full_name"] == "Иванов И.И."
+
+    [message] = peer.of_type("new_message")
+    assert message["content"] == "привет"
+    assert message["username"] == "ivanov"
+    assert message["full_name"] == "Иванов И.И."
+    assert message["rank"] == "майор"
+    assert message["avatar_url"] == "/static/avatars/1.png"
+    assert not client.of_type("error")
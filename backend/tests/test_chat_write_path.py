@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.modules.auth.models import User
+from app.modules.board.models import Document
+from app.modules.chat.models import Channel, ChannelMember, Message
+from app.modules.chat.schemas import MessageCreate
+from app.modules.chat.service import ChatService
+
+# mention lookup + context join + INSERT + last_read UPDATE
+# + channel last-message UPDATE + parent reply_count UPDATE + recipient IDs
+MAX_ROUND_TRIPS = 7
+
+
+async def _seed(db, member_count: int = 20):
+    users = [
+        User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="x", full_name=f"User {i}")
+        for i in range(member_count)
+    ]
+    db.add_all(users)
+    await db.flush()
+
+    channel = Channel(name="general", created_by=users[0].id)
+    db.add(channel)
+    await db.flush()
+    db.add_all(ChannelMember(channel_id=channel.id, user_id=u.id, last_read_message_id=0) for u in users)
+
+    document = Document(title="Приказ", file_path="uploads/order.pdf", owner_id=users[0].id)
+    db.add(document)
+    await db.flush()
+
+    parent = Message(channel_id=channel.id, user_id=users[1].id, content="вопрос")
+    db.add(parent)
+    await db.commit()
+    return users, channel, document, parent
+
+
+@pytest.mark.asyncio
+async def test_post_message_builds_full_context(db_session):
+    users, channel, document, parent = await _seed(db_session)
+    sender = users[0]
+
+    message, context = await ChatService.post_message(
+        db_session,
+        MessageCreate(channel_id=channel.id, content="ответ", document_id=document.id, parent_id=parent.id),
+        sender.id,
+        mentioned_usernames=["user2", "user3", "nobody"],
+    )
+
+    assert context["channel_name"] == "general"
+    assert context["is_direct"] is False
+    assert context["doc_info"] == {
+        "is_document_deleted": False,
+        "document_title": "Приказ",
+        "file_path": "uploads/order.pdf",
+    }
+    assert context["parent_info"] == {"id": parent.id, "content": "вопрос", "username": "user1", "full_name": "User 1"}
+    assert sorted(context["mentioned_user_ids"]) == [users[2].id, users[3].id]
+    assert sorted(context["recipient_ids"]) == sorted(u.id for u in users[1:])
+
+    last_read = await db_session.scalar(
+        select(ChannelMember.last_read_message_id).where(
+            ChannelMember.channel_id == channel.id, ChannelMember.user_id == sender.id
+        )
+    )
+    assert last_read == message.id
+
+
+@pytest.mark.asyncio
+async def test_post_message_reports_missing_document(db_session):
+    users, channel, _, _ = await _seed(db_session, member_count=2)
+
+    _, context = await ChatService.post_message(
+        db_session, MessageCreate(channel_id=channel.id, content="файл", document_id=999), users[0].id
+    )
+
+    assert context["doc_info"] == {"is_document_deleted": True}
+    assert context["parent_info"] is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("member_count", [2, 20, 200])
+async def test_post_message_round_trips_are_constant(db_session, query_counter, member_count):
+    users, channel, document, parent = await _seed(db_session, member_count)
+
+    query_counter.reset()
+    await ChatService.post_message(
+        db_session,
+        MessageCreate(channel_id=channel.id, content="@user1 смотри", document_id=document.id, parent_id=parent.id),
+        users[0].id,
+        mentioned_usernames=["user1"],
+    )
+
+    assert query_counter.count <= MAX_ROUND_TRIPS, f"{query_counter.count} round trips"
+
+
+@pytest.mark.asyncio
+async def test_muted_members_are_not_notified_unless_mentioned(db_session):
+    users, channel, _, _ = await _seed(db_session, member_count=4)
+    sender, muted, muted_mentioned, active = users
+    until = datetime.utcnow() + timedelta(hours=1)
+    await db_session.execute(
+        update(ChannelMember)
+        .where(ChannelMember.user_id.in_([muted.id, muted_mentioned.id]))
+        .values(mute_until=until)
+    )
+    await db_session.commit()
+
+    _, context = await ChatService.post_message(
+        db_session,
+        MessageCreate(channel_id=channel.id, content="@user2 привет"),
+        sender.id,
+        mentioned_usernames=["user2"],
+    )
+
+    assert sorted(context["recipient_ids"]) == sorted([muted_mentioned.id, active.id])
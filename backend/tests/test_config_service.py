@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+import app.core.config_service as config_module
+from app.core.config_service import ConfigService, CONFIG_INVALIDATION_CHANNEL
+from app.core.models import SystemSetting
+from app.core.redis_manager import RedisManager
+from app.modules.admin.service import SystemSettingService
+from app.modules.auth.models import User
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    ConfigService.invalidate()
+    config_module._cache.clear()
+    yield
+    ConfigService.invalidate()
+    config_module._cache.clear()
+
+
+async def _seed_settings(db):
+    db.add_all([
+        SystemSetting(key="chat_page_size", value="30", type="int", group="chat"),
+        SystemSetting(key="chat_allow_delete", value="true", type="bool", group="chat"),
+        SystemSetting(key="app_name", value="КООРДИНАТОР", type="str", group="general"),
+    ])
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_reads_are_served_from_cache_after_load(db_session, query_counter):
+    await _seed_settings(db_session)
+    await ConfigService.load(db_session)
+
+    query_counter.reset()
+    assert await ConfigService.get_int(db_session, "chat_page_size", 50) == 30
+    assert await ConfigService.get_bool(db_session, "chat_allow_delete") is True
+    assert await ConfigService.get_value(db_session, "app_name") == "КООРДИНАТОР"
+    assert await ConfigService.get_typed(db_session, "chat_page_size") == 30
+    assert await ConfigService.get_int(db_session, "missing", 7) == 7
+
+    assert query_counter.count == 0
+
+
+@pytest.mark.asyncio
+async def test_group_does_not_hide_keys(db_session):
+    await _seed_settings(db_session)
+
+    # Settings are keyed by name only; the legacy default group must not filter them out
+    assert await ConfigService.get_value(db_session, "chat_page_size") == "30"
+
+
+@pytest.mark.asyncio
+async def test_admin_update_refreshes_cache(db_session):
+    await _seed_settings(db_session)
+    admin = User(username="admin", email="admin@example.com", hashed_password="x", role="admin")
+    db_session.add(admin)
+    await db_session.commit()
+    await ConfigService.load(db_session)
+
+    await SystemSettingService.set_value(db_session, "chat_page_size", 80, admin.id)
+
+    assert await ConfigService.get_int(db_session, "chat_page_size", 50) == 80
+    assert await SystemSettingService.get_value(db_session, "chat_page_size") == 80
+
+
+@pytest.mark.asyncio
+async def test_invalidation_from_other_worker_is_applied(db_session, query_counter):
+    await _seed_settings(db_session)
+    await ConfigService.load(db_session)
+    this_worker, other_worker = RedisManager.create_local_cluster(2)
+    await ConfigService.subscribe_invalidations(this_worker)
+
+    query_counter.reset()
+    await other_worker.publish(CONFIG_INVALIDATION_CHANNEL, {"key": "chat_page_size", "value": "25", "type": "int"})
+    await asyncio.sleep(0)
+
+    assert await ConfigService.get_int(db_session, "chat_page_size", 50) == 25
+    assert query_counter.count == 0
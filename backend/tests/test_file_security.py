@@ -0,0 +1,82 @@
+import os
+
+import pytest
+from fastapi import Request
+
+from app.core.file_security import secure_file_response
+
+SHA256 = "ab" * 32
+
+
+def _request(headers=None):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/file",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+    })
+
+
+async def _send(response, request):
+    """Run a response as ASGI app; returns (status, headers, body)"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await response(request.scope, receive, send)
+    start = messages[0]
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], headers, body
+
+
+@pytest.fixture
+def sample(tmp_path):
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(bytes(range(256)) * 4)
+    return str(path)
+
+
+@pytest.mark.asyncio
+async def test_full_response_is_privately_cacheable(sample):
+    request = _request()
+    status, headers, body = await _send(secure_file_response(sample, request=request, content_hash=SHA256), request)
+
+    assert status == 200 and len(body) == 1024
+    assert headers["etag"] == f'"{SHA256}"'
+    assert headers["cache-control"] == "private, no-cache"
+    assert headers["accept-ranges"] == "bytes"
+    assert headers["x-content-type-options"] == "nosniff"
+
+
+@pytest.mark.asyncio
+async def test_range_request_streams_only_the_range(sample):
+    request = _request({"Range": "bytes=100-199"})
+    status, headers, body = await _send(secure_file_response(sample, request=request), request)
+
+    assert status == 206
+    assert headers["content-range"] == "bytes 100-199/1024"
+    assert body == (bytes(range(256)) * 4)[100:200]
+
+
+@pytest.mark.asyncio
+async def test_matching_if_none_match_is_not_modified(sample):
+    request = _request({"If-None-Match": f'"other", W/"{SHA256}"'})
+    status, headers, body = await _send(secure_file_response(sample, request=request, content_hash=SHA256), request)
+
+    assert status == 304 and body == b""
+    assert headers["etag"] == f'"{SHA256}"'
+
+
+@pytest.mark.asyncio
+async def test_etag_without_hash_changes_with_the_file(sample):
+    first = secure_file_response(sample).headers["etag"]
+    with open(sample, "ab") as f:
+        f.write(b"more")
+    os.utime(sample, ns=(0, 10**18))
+
+    assert secure_file_response(sample).headers["etag"] != first
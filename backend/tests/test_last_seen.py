@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.core.last_seen import LastSeenBuffer
+from app.modules.auth.models import User
+
+
+async def _seed_users(session_factory, count: int) -> list:
+    async with session_factory() as db:
+        users = [User(username=f"u{i}", email=f"u{i}@example.com", hashed_password="x") for i in range(count)]
+        db.add_all(users)
+        await db.commit()
+        return [u.id for u in users]
+
+
+@pytest.fixture
+def session_factory(db_engine):
+    return async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.mark.asyncio
+async def test_reconnect_storm_is_one_bulk_update(session_factory, query_counter):
+    user_ids = await _seed_users(session_factory, 50)
+    buffer = LastSeenBuffer(interval=1, session_factory=session_factory)
+
+    # Every user flaps a few times before the flush
+    for _ in range(5):
+        for user_id in user_ids:
+            buffer.touch(user_id)
+
+    query_counter.reset()
+    written = await buffer.flush()
+
+    assert written == 50
+    assert query_counter.count == 1
+    assert buffer.pending_count == 0
+    assert buffer.stats()["last_flush_size"] == 50
+    async with session_factory() as db:
+        seen = (await db.execute(select(User.last_seen).where(User.id.in_(user_ids)))).scalars().all()
+    assert all(value is not None for value in seen)
+
+
+@pytest.mark.asyncio
+async def test_empty_buffer_does_not_touch_database(session_factory, query_counter):
+    buffer = LastSeenBuffer(interval=1, session_factory=session_factory)
+
+    query_counter.reset()
+    assert await buffer.flush() == 0
+    assert query_counter.count == 0
+
+
+@pytest.mark.asyncio
+async def test_stop_writes_pending_timestamps(session_factory):
+    (user_id,) = await _seed_users(session_factory, 1)
+    buffer = LastSeenBuffer(interval=3600, session_factory=session_factory)
+    buffer.start()
+    buffer.touch(user_id)
+
+    await buffer.stop()
+
+    async with session_factory() as db:
+        assert await db.scalar(select(User.last_seen).where(User.id == user_id)) is not None
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_batch():
+    def broken_factory():
+        raise RuntimeError("database is locked")
+
+    buffer = LastSeenBuffer(interval=1, session_factory=broken_factory)
+    buffer.touch(1)
+    buffer.touch(2)
+
+    assert await buffer.flush() == 0
+    assert buffer.pending_count == 2
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import PasswordHasherPool, get_password_hash_async, verify_password_async
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_round_trip():
+    hashed = await get_password_hash_async("Secret123")
+
+    assert await verify_password_async("Secret123", hashed) is True
+    assert await verify_password_async("wrong", hashed) is False
+
+
+@pytest.mark.asyncio
+async def test_event_loop_keeps_running_during_hashing():
+    pool = PasswordHasherPool(workers=1, max_pending=4)
+    release = threading.Event()
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while not release.is_set():
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    ticking = asyncio.create_task(ticker())
+    job = asyncio.create_task(pool.run(release.wait, 5))
+    await asyncio.sleep(0.05)
+    release.set()
+    await job
+    await ticking
+    pool.shutdown()
+
+    assert ticks > 5
+
+
+@pytest.mark.asyncio
+async def test_overload_is_rejected_with_503():
+    pool = PasswordHasherPool(workers=1, max_pending=2)
+    release = threading.Event()
+    running = [asyncio.create_task(pool.run(release.wait, 5)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await pool.run(release.wait, 5)
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"]
+
+    release.set()
+    await asyncio.gather(*running)
+    assert pool.pending == 0
+    pool.shutdown()
@@ -0,0 +1,117 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.last_seen import LastSeenBuffer
+from app.core.presence import PresenceService
+from app.core.redis_manager import RedisManager
+from app.core.websocket_manager import WebSocketManager
+from app.modules.chat.models import ChannelMember
+
+from tests.test_websocket_manager import FakeWebSocket, _drain
+
+
+def _cluster(size: int, session_factory=None) -> list:
+    managers = []
+    for redis in RedisManager.create_local_cluster(size):
+        manager = WebSocketManager(redis=redis)
+        manager.presence = PresenceService(
+            manager, redis, interval=1, last_seen=LastSeenBuffer(interval=1), session_factory=session_factory
+        )
+        managers.append(manager)
+    return managers
+
+
+@pytest.mark.asyncio
+async def test_reconnect_within_interval_sends_nothing():
+    (worker,) = _cluster(1)
+    watcher = FakeWebSocket()
+    await worker.connect_user(watcher, 1)
+    await worker.presence.flush()
+    await _drain()
+    watcher.sent.clear()
+
+    flapping = FakeWebSocket()
+    await worker.connect_user(flapping, 2)
+    await worker.disconnect_user(flapping, 2)
+    await worker.connect_user(flapping, 2)
+    await worker.disconnect_user(flapping, 2)
+    await worker.presence.flush()
+    await _drain()
+
+    assert watcher.of_type("presence_diff") == []
+    # The user is still recorded as seen
+    assert worker.presence.last_seen.pending_count == 2
+
+
+@pytest.mark.asyncio
+async def test_online_set_is_shared_across_workers():
+    w1, w2 = _cluster(2)
+    ws_a, ws_b = FakeWebSocket(), FakeWebSocket()
+    await w1.connect_user(ws_a, 1)
+    await w2.connect_user(ws_b, 2)
+
+    await w1.presence.flush()
+    await w2.presence.flush()
+    await w1.presence.flush()
+    await _drain()
+
+    assert sorted(w1.get_online_user_ids()) == [1, 2]
+    assert sorted(w2.get_online_user_ids()) == [1, 2]
+    assert ws_a.of_type("presence_diff")[-1] == {"type": "presence_diff", "online": [2], "offline": []}
+
+    await w2.disconnect_user(ws_b, 2)
+    await w2.presence.flush()
+    await w1.presence.flush()
+    await _drain()
+
+    assert w1.get_online_user_ids() == [1]
+    assert ws_a.of_type("presence_diff")[-1] == {"type": "presence_diff", "online": [], "offline": [2]}
+
+
+@pytest_asyncio.fixture
+async def session_factory(db_session):
+    # Channel 9 has members 1-5 and 7; user 6 is online but not a member
+    db_session.add_all(
+        ChannelMember(channel_id=9, user_id=user_id, last_read_message_id=0) for user_id in (1, 2, 3, 4, 5, 7)
+    )
+    await db_session.commit()
+    return async_sessionmaker(db_session.bind, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.mark.asyncio
+async def test_channel_presence_is_coalesced_per_flush(session_factory):
+    (worker,) = _cluster(1, session_factory)
+    sockets = [FakeWebSocket() for _ in range(5)]
+    for user_id, ws in enumerate(sockets, start=1):
+        await worker.connect_user(FakeWebSocket(), user_id)
+        await worker.connect(ws, 9, user_id)
+    await _drain()
+    assert sockets[0].of_type("presence") == []
+
+    await worker.presence.flush()
+    await _drain()
+
+    assert sockets[0].of_type("presence") == [{"type": "presence", "online_count": 5}]
+
+
+@pytest.mark.asyncio
+async def test_channel_presence_count_is_cluster_wide(session_factory):
+    w1, w2 = _cluster(2, session_factory)
+    listener_1, listener_2 = FakeWebSocket(), FakeWebSocket()
+    for user_id in (1, 2, 6):
+        await w1.connect_user(FakeWebSocket(), user_id)
+    await w1.connect(listener_1, 9, 1)
+    for user_id in (3, 7):
+        await w2.connect_user(FakeWebSocket(), user_id)
+    await w2.connect(listener_2, 9, 3)
+
+    await w1.presence.flush()
+    await w2.presence.flush()
+    await w1.presence.flush()
+    await _drain()
+
+    # Both workers report the same count of online members (1, 2, 3, 7), each to its own listeners
+    assert listener_1.of_type("presence")[-1] == {"type": "presence", "online_count": 4}
+    assert listener_2.of_type("presence")[-1] == {"type": "presence", "online_count": 4}
+    assert len(listener_2.of_type("presence")) == 1
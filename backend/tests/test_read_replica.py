@@ -0,0 +1,113 @@
+import time
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, text, update
+
+from app.core.database import Base, create_engine_with_pool, create_session_factory
+from app.core.models import ReplicaHeartbeat
+from app.core.read_replica import ReplicaRouter
+from app.modules.auth.models import User
+
+
+@pytest_asyncio.fixture
+async def databases(tmp_path):
+    """A primary and a second local database standing in for its replica"""
+    import app.modules.auth.models  # noqa: F401
+
+    primary = create_engine_with_pool(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine_with_pool(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    for engine in (primary, replica):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    yield primary, replica
+    await primary.dispose()
+    await replica.dispose()
+
+
+async def _replicate_heartbeat(primary, replica, age: float = 0) -> None:
+    """Copy the primary heartbeat to the replica, optionally `age` seconds old"""
+    async with primary.connect() as conn:
+        beat_ms = await conn.scalar(select(ReplicaHeartbeat.beat_ms))
+    async with replica.begin() as conn:
+        await conn.execute(ReplicaHeartbeat.__table__.delete())
+        await conn.execute(
+            ReplicaHeartbeat.__table__.insert().values(id=1, beat_ms=beat_ms - int(age * 1000))
+        )
+
+
+def _router(primary, replica) -> ReplicaRouter:
+    return ReplicaRouter(create_session_factory(primary), [replica], max_lag=2, interval=1)
+
+
+@pytest.mark.asyncio
+async def test_without_replicas_reads_go_to_primary(databases):
+    primary, _ = databases
+    router = ReplicaRouter(create_session_factory(primary), [])
+
+    await router.check()
+    assert router.session_factory() is router.primary_factory
+
+
+@pytest.mark.asyncio
+async def test_caught_up_replica_serves_reads(databases):
+    primary, replica = databases
+    router = _router(primary, replica)
+    async with replica.begin() as conn:
+        await conn.execute(User.__table__.insert().values(username="r", email="r@example.com", hashed_password="x"))
+
+    # Unchecked replicas are never used
+    assert router.session_factory() is router.primary_factory
+
+    await router.check()
+    await _replicate_heartbeat(primary, replica)
+    await router.check()
+    # The replica returns the previous beat: lag is bounded by the check interval
+    assert router.replicas[0].lag < 2
+
+    async with router.session_factory()() as db:
+        assert await db.scalar(select(User.username)) == "r"
+
+
+@pytest.mark.asyncio
+async def test_lagging_or_broken_replica_falls_back_to_primary(databases):
+    primary, replica = databases
+    router = _router(primary, replica)
+
+    # No heartbeat on the replica yet
+    await router.check()
+    assert router.replicas[0].error == "no heartbeat"
+    assert router.session_factory() is router.primary_factory
+
+    # Heartbeat far behind the primary
+    await _replicate_heartbeat(primary, replica, age=30)
+    await router.check()
+    assert router.replicas[0].lag > 2
+    assert router.session_factory() is router.primary_factory
+
+    # Measurement went stale (check loop stopped)
+    await _replicate_heartbeat(primary, replica)
+    await router.check()
+    router.replicas[0].checked_at = time.monotonic() - 60
+    assert router.session_factory() is router.primary_factory
+
+    # Replica query fails
+    async with replica.begin() as conn:
+        await conn.execute(text("DROP TABLE replica_heartbeat"))
+    await router.check()
+    assert router.replicas[0].lag is None
+    assert router.session_factory() is router.primary_factory
+    assert router.stats()["replicas"][0]["usable"] is False
+
+
+@pytest.mark.asyncio
+async def test_replica_sessions_refuse_writes(databases):
+    primary, replica = databases
+    router = _router(primary, replica)
+
+    async with router.replicas[0].session_factory() as db:
+        with pytest.raises(RuntimeError):
+            await db.execute(update(User).values(is_active=False))
+        db.add(User(username="w", email="w@example.com", hashed_password="x"))
+        with pytest.raises(RuntimeError):
+            await db.commit()
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, text
+
+from app.core.database import Base, create_engine_with_pool, create_session_factory
+from app.core.sqlite_writer import SerializedWriteSession, sqlite_write_queue
+from app.modules.auth.models import User
+
+
+@pytest_asyncio.fixture
+async def file_engine(tmp_path):
+    import app.modules.auth.models  # noqa: F401
+
+    engine = create_engine_with_pool(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_connections_use_wal_and_pragmas(file_engine):
+    async with file_engine.connect() as conn:
+        assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        assert (await conn.execute(text("PRAGMA synchronous"))).scalar() == 1  # NORMAL
+        assert (await conn.execute(text("PRAGMA busy_timeout"))).scalar() > 0
+
+
+@pytest.mark.asyncio
+async def test_writers_are_serialized_and_readers_are_not(file_engine):
+    session_factory = create_session_factory(file_engine)
+    events = []
+
+    async def writer(name: str, hold: float):
+        async with session_factory() as db:
+            assert isinstance(db, SerializedWriteSession)
+            db.add(User(username=name, email=f"{name}@example.com", hashed_password="x"))
+            await db.flush()
+            events.append(f"{name} start")
+            await asyncio.sleep(hold)
+            await db.commit()
+            events.append(f"{name} commit")
+
+    first = asyncio.create_task(writer("a", 0.05))
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(writer("b", 0))
+    await asyncio.sleep(0.01)
+
+    # A reader is not blocked by the pending writer
+    async with session_factory() as db:
+        await db.execute(select(User.id))
+    assert sqlite_write_queue.waiting == 1
+
+    await asyncio.gather(first, second)
+    assert events == ["a start", "a commit", "b start", "b commit"]
+
+
+@pytest.mark.asyncio
+async def test_nested_write_session_in_one_task_is_rejected(file_engine):
+    session_factory = create_session_factory(file_engine)
+
+    async def nested_writes():
+        async with session_factory() as outer:
+            outer.add(User(username="outer", email="outer@example.com", hashed_password="x"))
+            await outer.flush()
+            async with session_factory() as inner:
+                inner.add(User(username="inner", email="inner@example.com", hashed_password="x"))
+                with pytest.raises(RuntimeError, match="Nested write transaction"):
+                    await inner.flush()
+            await outer.commit()
+
+    # Fails fast instead of waiting on the lock held by the same task
+    await asyncio.wait_for(nested_writes(), 1)
+
+    # The outer session released the slot: another task gets it right away
+    await asyncio.wait_for(sqlite_write_queue.acquire(), 1)
+    sqlite_write_queue.release()
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import app.core.database as database
+import app.core.security as security
+from app.core.models import SchemaMarker
+from app.modules.auth.models import User
+
+
+@pytest.fixture
+def test_database(db_engine, monkeypatch):
+    monkeypatch.setattr(database, "engine", db_engine)
+    monkeypatch.setattr(
+        database, "AsyncSessionLocal",
+        async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    )
+    # Seeding hashes passwords; the cost is irrelevant here
+    monkeypatch.setattr(security, "get_password_hash", lambda password: "x")
+    return database.AsyncSessionLocal
+
+
+@pytest.mark.asyncio
+async def test_fast_startup_skips_initialized_database(test_database, query_counter):
+    assert await database.init_db(fast=True) is True
+
+    query_counter.reset()
+    assert await database.init_db(fast=True) is False
+    # Only the marker lookup
+    assert query_counter.count == 1
+
+    async with test_database() as db:
+        assert await db.scalar(select(func.count(User.id))) == 7
+        assert await db.scalar(select(SchemaMarker.fingerprint)) == database.schema_fingerprint()
+
+
+@pytest.mark.asyncio
+async def test_changed_models_trigger_full_initialization(test_database):
+    await database.init_db(fast=True)
+    async with test_database() as db:
+        marker = await db.get(SchemaMarker, 1)
+        marker.fingerprint = "outdated"
+        await db.commit()
+
+    assert await database.init_db(fast=True) is True
+
+
+@pytest.mark.asyncio
+async def test_full_mode_always_initializes(test_database):
+    await database.init_db()
+
+    assert await database.init_db() is True
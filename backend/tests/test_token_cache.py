@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app.core.events import event_bus
+from app.core.redis_manager import RedisManager
+from app.core.security import create_access_token
+from app.core.websocket_manager import WebSocketManager
+from app.modules.auth.events import UserUpdated
+from app.modules.auth.models import User
+from app.modules.auth.token_cache import (
+    AUTH_INVALIDATION_CHANNEL, AuthPrincipal, TokenCache, token_cache, verify_token
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+async def _user_with_token(db, **fields):
+    user = User(username="alice", email="alice@example.com", hashed_password="x", role="user", **fields)
+    db.add(user)
+    await db.commit()
+    return user, create_access_token({"sub": user.id})
+
+
+@pytest.mark.asyncio
+async def test_verified_token_skips_database(db_session, query_counter):
+    user, token = await _user_with_token(db_session)
+
+    query_counter.reset()
+    first = await verify_token(db_session, token)
+    assert query_counter.count == 1
+
+    query_counter.reset()
+    second = await verify_token(db_session, token)
+    assert query_counter.count == 0
+    assert first == second == AuthPrincipal(id=user.id, role="user", is_active=True, unit_id=None)
+
+
+@pytest.mark.asyncio
+async def test_invalid_token_is_rejected_without_query(db_session, query_counter):
+    query_counter.reset()
+    assert await verify_token(db_session, "not-a-jwt") is None
+    assert query_counter.count == 0
+
+
+@pytest.mark.asyncio
+async def test_user_updated_event_invalidates(db_session):
+    user, token = await _user_with_token(db_session)
+    await event_bus.subscribe(UserUpdated, token_cache._handle_user_event)
+    try:
+        await verify_token(db_session, token)
+        user.is_active = False
+        await db_session.commit()
+
+        await event_bus.publish(UserUpdated(user_id=user.id, changes={"is_active": False}))
+
+        principal = await verify_token(db_session, token)
+        assert principal.is_active is False
+    finally:
+        await event_bus.unsubscribe(UserUpdated, token_cache._handle_user_event)
+
+
+@pytest.mark.asyncio
+async def test_kick_user_invalidates(db_session):
+    user, token = await _user_with_token(db_session)
+    await verify_token(db_session, token)
+    assert len(token_cache) == 1
+
+    await WebSocketManager(redis=RedisManager.create_local_cluster(1)[0]).kick_user(user.id)
+
+    assert len(token_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_invalidation_reaches_other_workers():
+    this_worker, other_worker = RedisManager.create_local_cluster(2)
+    cache = TokenCache(ttl=60, max_size=10)
+    cache.put("t1", AuthPrincipal(id=1, role="user", is_active=True))
+    cache.put("t2", AuthPrincipal(id=2, role="user", is_active=True))
+    await this_worker.subscribe(AUTH_INVALIDATION_CHANNEL, cache._handle_invalidation)
+
+    await other_worker.publish(AUTH_INVALIDATION_CHANNEL, {"user_id": 1})
+    await asyncio.sleep(0)
+
+    assert cache.get("t1") is None
+    assert cache.get("t2") is not None
+
+
+def test_cache_is_bounded_and_expires():
+    cache = TokenCache(ttl=60, max_size=2)
+    for i in range(3):
+        cache.put(f"t{i}", AuthPrincipal(id=i, role="user", is_active=True))
+    assert len(cache) == 2
+    assert cache.get("t0") is None
+
+    # Never cached past the token's own expiry
+    expired = TokenCache(ttl=60, max_size=2)
+    expired.put("old", AuthPrincipal(id=1, role="user", is_active=True), token_exp=0)
+    assert expired.get("old") is None
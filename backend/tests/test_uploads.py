@@ -0,0 +1,52 @@
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+
+from app.core.uploads import UploadTooLarge, stream_upload
+
+
+def _upload(data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename="data.bin")
+
+
+@pytest.mark.asyncio
+async def test_stream_upload_writes_and_hashes(tmp_path):
+    data = os.urandom(300_000)
+    path = tmp_path / "unit" / "data.bin"
+
+    stored = await stream_upload(_upload(data), str(path), max_bytes=len(data), chunk_size=64 * 1024)
+
+    assert path.read_bytes() == data
+    assert stored.size == len(data)
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    # Only the final file remains
+    assert os.listdir(path.parent) == ["data.bin"]
+
+
+@pytest.mark.asyncio
+async def test_oversized_upload_is_rejected_while_streaming(tmp_path):
+    path = tmp_path / "data.bin"
+    upload = _upload(b"x" * 200_000)
+
+    with pytest.raises(UploadTooLarge) as exc:
+        await stream_upload(upload, str(path), max_bytes=100_000, chunk_size=64 * 1024)
+
+    assert exc.value.status_code == 413
+    # Reading stopped at the first chunk over the limit
+    assert upload.file.tell() < 200_000
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_upload_keeps_existing_file(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"old")
+
+    with pytest.raises(UploadTooLarge):
+        await stream_upload(_upload(b"new content"), str(path), max_bytes=4)
+
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["data.bin"]
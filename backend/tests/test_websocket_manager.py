@@ -0,0 +1,296 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.redis_manager import RedisManager
+from app.core.websocket_manager import WebSocketManager
+
+
+class FakeWebSocket:
+    """Minimal stand-in for starlette's WebSocket that records sent frames"""
+
+    def __init__(self) -> None:
+        self.sent: list = []
+        self.closed_code = None
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_json(self, data) -> None:
+        self.sent.append(json.loads(json.dumps(data)))
+
+    async def send_text(self, data: str) -> None:
+        self.sent.append(json.loads(data))
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        self.closed_code = code
+
+    def of_type(self, msg_type: str) -> list:
+        return [m for m in self.sent if m.get("type") == msg_type]
+
+
+class StalledWebSocket(FakeWebSocket):
+    """Socket whose peer never reads: every send blocks until released"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.release = asyncio.Event()
+
+    async def send_text(self, data: str) -> None:
+        await self.release.wait()
+        await super().send_text(data)
+
+
+async def _drain() -> None:
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+def _cluster(size: int) -> list:
+    return [WebSocketManager(redis=r) for r in RedisManager.create_local_cluster(size)]
+
+
+@pytest.mark.asyncio
+async def test_channel_broadcast_reaches_other_workers():
+    w1, w2, w3 = _cluster(3)
+    ws_a, ws_b = FakeWebSocket(), FakeWebSocket()
+    await w1.connect(ws_a, 7, 1)
+    await w2.connect(ws_b, 7, 2)
+    await _drain()
+
+    await w3.broadcast_to_channel(7, {"type": "new_message", "id": 1})
+    await _drain()
+
+    assert ws_a.of_type("new_message") == [{"type": "new_message", "id": 1}]
+    assert ws_b.of_type("new_message") == [{"type": "new_message", "id": 1}]
+
+
+@pytest.mark.asyncio
+async def test_local_delivery_is_not_duplicated_by_own_publish():
+    w1, w2 = _cluster(2)
+    ws = FakeWebSocket()
+    await w1.connect(ws, 3, 1)
+
+    await w1.broadcast_to_channel(3, {"type": "new_message", "id": 5})
+    await _drain()
+
+    assert len(ws.of_type("new_message")) == 1
+
+
+@pytest.mark.asyncio
+async def test_user_broadcast_reaches_other_workers():
+    w1, w2 = _cluster(2)
+    ws = FakeWebSocket()
+    await w2.register_user_connection(ws, 42)
+
+    await w1.broadcast_to_user(42, {"type": "new_message", "channel_id": 1})
+    await _drain()
+
+    assert ws.of_type("new_message") == [{"type": "new_message", "channel_id": 1}]
+
+
+@pytest.mark.asyncio
+async def test_topic_subscribed_only_while_local_listener_exists():
+    redis_a, redis_b = RedisManager.create_local_cluster(2)
+    w1, w2 = WebSocketManager(redis=redis_a), WebSocketManager(redis=redis_b)
+    ws = FakeWebSocket()
+    topic = "ws:channel:9"
+
+    await w1.connect(ws, 9, 1)
+    assert len(redis_a._local_subscribers[topic]) == 1
+
+    await w1.disconnect(ws, 9, 1)
+    assert topic not in redis_a._local_subscribers
+
+    # Nobody listens any more, publishing is a no-op
+    await w2.broadcast_to_channel(9, {"type": "new_message"})
+    await _drain()
+    assert ws.of_type("new_message") == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("recipients", [1, 50, 500])
+async def test_channel_broadcast_serializes_once(monkeypatch, recipients):
+    import app.core.websocket_manager as ws_module
+
+    calls = []
+    original = ws_module.encode_message
+
+    def counting_encode(message):
+        calls.append(message)
+        return original(message)
+
+    monkeypatch.setattr(ws_module, "encode_message", counting_encode)
+    manager = WebSocketManager(redis=RedisManager())
+    sockets = [FakeWebSocket() for _ in range(recipients)]
+    for i, ws in enumerate(sockets):
+        await manager.connect(ws, 1, i)
+    calls.clear()
+
+    await manager.broadcast_to_channel(1, {"type": "new_message", "content": "привет"})
+    await _drain()
+
+    assert len(calls) == 1
+    assert all(ws.of_type("new_message") == [{"type": "new_message", "content": "привет"}] for ws in sockets)
+
+
+@pytest.mark.asyncio
+async def test_stalled_client_does_not_block_broadcast():
+    manager = WebSocketManager(redis=RedisManager())
+    fast, stalled = FakeWebSocket(), StalledWebSocket()
+    await manager.connect(fast, 1, 1)
+    await manager.connect(stalled, 1, 2)
+
+    await asyncio.wait_for(manager.broadcast_to_channel(1, {"type": "new_message", "id": 1}), timeout=1)
+    await _drain()
+
+    assert fast.of_type("new_message") == [{"type": "new_message", "id": 1}]
+    assert stalled.of_type("new_message") == []
+
+
+@pytest.mark.asyncio
+async def test_pending_ephemeral_frames_are_coalesced():
+    manager = WebSocketManager(redis=RedisManager())
+    stalled = StalledWebSocket()
+    await manager.connect(stalled, 1, 1)
+    await _drain()
+
+    for i in range(10):
+        await manager.broadcast_to_channel(1, {"type": "typing", "user_id": 5, "is_typing": i % 2 == 0})
+    await manager.broadcast_to_channel(1, {"type": "new_message", "id": 1})
+    stalled.release.set()
+    await _drain()
+
+    assert stalled.of_type("typing") == [{"type": "typing", "user_id": 5, "is_typing": False}]
+    assert stalled.of_type("new_message") == [{"type": "new_message", "id": 1}]
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_evicted_after_queue_overflow():
+    manager = WebSocketManager(redis=RedisManager(), send_queue_size=3)
+    stalled = StalledWebSocket()
+    await manager.connect(stalled, 1, 1)
+
+    for i in range(5):
+        await manager.broadcast_to_channel(1, {"type": "new_message", "id": i})
+    await _drain()
+
+    assert stalled.closed_code == 1013
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_evicted_after_lag_threshold():
+    manager = WebSocketManager(redis=RedisManager(), max_send_lag=0.05)
+    stalled = StalledWebSocket()
+    await manager.connect(stalled, 1, 1)
+
+    await manager.broadcast_to_channel(1, {"type": "new_message", "id": 1})
+    await manager.broadcast_to_channel(1, {"type": "new_message", "id": 2})
+    await asyncio.sleep(0.1)
+    await manager.broadcast_to_channel(1, {"type": "new_message", "id": 3})
+    await _drain()
+
+    assert stalled.closed_code == 1013
+
+
+@pytest.mark.asyncio
+async def test_registry_tracks_per_user_refcounts():
+    manager = WebSocketManager(redis=RedisManager())
+    first, second, other = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    await manager.connect(first, 1, 10)
+    await manager.connect(second, 1, 10)
+    await manager.connect(other, 1, 20)
+    assert manager.get_online_count(1) == 2
+
+    await manager.disconnect(first, 1, 10)
+    assert manager.get_online_count(1) == 2
+
+    await manager.disconnect(second, 1, 10)
+    assert manager.get_online_count(1) == 1
+    assert 10 not in manager.user_channel_sockets
+
+    await manager.disconnect(other, 1, 20)
+    assert 1 not in manager.active_connections
+    assert manager._socket_index == {}
+
+
+@pytest.mark.asyncio
+async def test_kick_user_closes_only_that_users_sockets():
+    manager = WebSocketManager(redis=RedisManager())
+    channel_ws, user_ws, bystander = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    await manager.connect(channel_ws, 1, 10)
+    await manager.connect(bystander, 1, 20)
+    await manager.register_user_connection(user_ws, 10)
+
+    await manager.kick_user(10)
+
+    assert channel_ws.closed_code == 4003
+    assert user_ws.closed_code == 4003
+    assert bystander.closed_code is None
+
+
+@pytest.mark.asyncio
+async def test_multiplexed_socket_receives_tagged_channel_frames():
+    manager = WebSocketManager(redis=RedisManager())
+    mux, plain = FakeWebSocket(), FakeWebSocket()
+    await manager.connect_multiplexed(mux, 10)
+    await manager.join_channel(mux, 1, 10)
+    await manager.join_channel(mux, 2, 10)
+    await manager.connect(plain, 1, 20)
+    await _drain()
+
+    await manager.broadcast_to_channel(1, {"type": "new_message", "id": 1})
+    await manager.broadcast_to_channel(2, {"type": "new_message", "id": 2})
+    await manager.broadcast_to_user(10, {"type": "channel_created"})
+    await _drain()
+
+    assert mux.of_type("new_message") == [
+        {"type": "new_message", "id": 1, "channel_id": 1, "scope": "channel"},
+        {"type": "new_message", "id": 2, "channel_id": 2, "scope": "channel"},
+    ]
+    assert mux.of_type("channel_created") == [{"type": "channel_created"}]
+    assert plain.of_type("new_message") == [{"type": "new_message", "id": 1}]
+
+
+@pytest.mark.asyncio
+async def test_multiplexed_unsubscribe_keeps_user_stream():
+    manager = WebSocketManager(redis=RedisManager())
+    mux = FakeWebSocket()
+    await manager.connect_multiplexed(mux, 10)
+    await manager.join_channel(mux, 1, 10)
+
+    await manager.disconnect(mux, 1, 10)
+    await manager.broadcast_to_channel(1, {"type": "new_message", "id": 1})
+    await manager.broadcast_to_user(10, {"type": "channel_created"})
+    await _drain()
+
+    assert not manager.is_joined(mux, 1)
+    assert mux.of_type("new_message") == []
+    assert mux.of_type("channel_created") == [{"type": "channel_created"}]
+
+
+@pytest.mark.asyncio
+async def test_broadcast_to_users_reaches_all_workers_in_one_publish(monkeypatch):
+    w1, w2 = _cluster(2)
+    local, remote, second_remote = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    await w1.register_user_connection(local, 1)
+    await w2.register_user_connection(remote, 2)
+    await w2.register_user_connection(second_remote, 3)
+
+    publishes = []
+    original_publish = w1._redis.publish
+
+    async def counting_publish(channel, message):
+        publishes.append(channel)
+        await original_publish(channel, message)
+
+    monkeypatch.setattr(w1._redis, "publish", counting_publish)
+
+    await w1.broadcast_to_users(range(1, 101), {"type": "new_message", "channel_id": 5})
+    await _drain()
+
+    assert publishes == [WebSocketManager.USERS_TOPIC]
+    for ws in (local, remote, second_remote):
+        assert ws.of_type("new_message") == [{"type": "new_message", "channel_id": 5}]
+
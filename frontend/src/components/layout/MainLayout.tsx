@@ -406,6 +406,17 @@ const MainLayout: React.FC = () => {
         }
     }, [queryClient, user?.notify_sound, user?.notify_browser, t, addToast, navigate]);
 
+    const onArchiveJob = useCallback((data: { status: string; error: string | null }) => {
+        // Progress messages ("running") need no UI; only the outcome of a background paste is shown
+        if (data.status === 'completed') {
+            queryClient.invalidateQueries({ queryKey: ['archive', 'contents'] });
+            addToast({ type: 'success', title: t('common.success'), message: t('archive.paste_success'), duration: 3000 });
+        } else if (data.status === 'failed') {
+            queryClient.invalidateQueries({ queryKey: ['archive', 'contents'] });
+            addToast({ type: 'error', title: t('common.error'), message: t('archive.paste_error'), duration: 4000 });
+        }
+    }, [queryClient, addToast, t]);
+
     useGlobalWebSocket(token, {
         onChannelCreated,
         onMessageReceived,
@@ -415,7 +426,8 @@ const MainLayout: React.FC = () => {
         onTaskAssigned,
         onTaskReturned,
         onTaskSubmitted,
-        onTaskConfirmed
+        onTaskConfirmed,
+        onArchiveJob
     });
 
     useEffect(() => {
@@ -1102,9 +1102,14 @@ const ArchivePage: React.FC = () => {
                         target_unit_id: activeTab === 'mine' ? activeUser?.unit_id : currentUnitId,
                         is_private: activeTab === 'mine'
                     };
-                    await api.post('/archive/batch-action', payload);
-                    queryClient.invalidateQueries({ queryKey: ['archive', 'contents'] });
-                    updateToast(toastId, { type: 'success', title: t('common.success'), message: t('archive.paste_success'), duration: 3000 });
+                    const res = await api.post('/archive/batch-action', payload);
+                    if (res.data?.status === 'queued') {
+                        // Large batches run in the background; the result arrives over the WebSocket
+                        updateToast(toastId, { type: 'info', title: t('archive.pasting'), message: t('archive.paste_queued'), duration: 3000 });
+                    } else {
+                        queryClient.invalidateQueries({ queryKey: ['archive', 'contents'] });
+                        updateToast(toastId, { type: 'success', title: t('common.success'), message: t('archive.paste_success'), duration: 3000 });
+                    }
                     if (currentClipboard.action === 'cut') {
                         setClipboard(null);
                     }
@@ -1440,7 +1445,7 @@ const ArchivePage: React.FC = () => {
 
         const toastId = addToast({ type: 'info', title: t('archive.pasting'), message: t('archive.please_wait'), duration: Infinity });
         try {
-            await api.post('/archive/batch-action', {
+            const res = await api.post('/archive/batch-action', {
                 action: clipboard.action === 'cut' ? 'move' : 'copy',
                 item_ids: clipboard.items.map(i => i.id),
                 item_types: clipboard.items.map(i => i.type),
@@ -1449,8 +1454,12 @@ const ArchivePage: React.FC = () => {
                 is_private: activeTab === 'mine'
             });
 
-            queryClient.invalidateQueries({ queryKey: ['archive', 'contents'] });
-            updateToast(toastId, { type: 'success', title: t('common.success'), message: 'Элементы успешно вставлены', duration: 3000 });
+            if (res.data?.status === 'queued') {
+                updateToast(toastId, { type: 'info', title: t('archive.pasting'), message: t('archive.paste_queued'), duration: 3000 });
+            } else {
+                queryClient.invalidateQueries({ queryKey: ['archive', 'contents'] });
+                updateToast(toastId, { type: 'success', title: t('common.success'), message: 'Элементы успешно вставлены', duration: 3000 });
+            }
 
             if (clipboard.action === 'cut') {
                 setClipboard(null);
@@ -34,6 +34,7 @@ type WebSocketMessage =
     | { type: 'message_deleted'; message_id: number }
     | { type: 'read_receipt'; channel_id: number; user_id: number; last_read_id: number }
     | { type: 'user_presence'; user_id: number; status: 'online' | 'offline' }
+    | { type: 'presence_diff'; online: number[]; offline: number[] }
     | (Message & { type: 'new_message' })
     | (Message & { type?: never });
 
@@ -677,6 +678,20 @@ const ChatPage: React.FC = () => {
             return;
         }
 
+        if (data.type === 'presence_diff') {
+            const online = new Set(data.online);
+            const offline = new Set(data.offline);
+            const now = new Date().toISOString();
+            queryClient.setQueriesData({ queryKey: ['channel_members'] }, (old: unknown) => {
+                if (!old || !Array.isArray(old)) return old;
+                return old.map((m: User) =>
+                    online.has(m.id) ? { ...m, is_online: true }
+                        : offline.has(m.id) ? { ...m, is_online: false, last_seen: now } : m
+                );
+            });
+            return;
+        }
+
         if (data.type === 'reaction_added') {
             setMessages((prev) => prev.map(m => {
                 if (m.id === data.message_id) {
@@ -65,6 +65,13 @@ const AddressBookModal: React.FC<AddressBookModalProps> = ({ onClose, onSelectUs
                         }
                         return next;
                     });
+                } else if (data.type === 'presence_diff') {
+                    setOnlineUserIds(prev => {
+                        const next = new Set(prev);
+                        data.online.forEach((id: number) => next.add(id));
+                        data.offline.forEach((id: number) => next.delete(id));
+                        return next;
+                    });
                 }
             } catch (e) {
                 console.error('WS parse error', e);
@@ -13,6 +13,7 @@ interface GlobalWebSocketOptions {
     onTaskReturned?: (data: { task_id: number; title: string; sender_name: string }) => void;
     onTaskSubmitted?: (data: { task_id: number; title: string; sender_name: string }) => void;
     onTaskConfirmed?: (data: { task_id: number; title: string; sender_name: string }) => void;
+    onArchiveJob?: (data: { id: number; action: string; status: string; done: number; total: number; error: string | null }) => void;
 }
 
 // Singleton connection for global WebSocket to prevent duplicates in StrictMode
@@ -31,6 +32,7 @@ export const useGlobalWebSocket = (token: string | null, options: GlobalWebSocke
     const onTaskReturnedRef = useRef(options.onTaskReturned);
     const onTaskSubmittedRef = useRef(options.onTaskSubmitted);
     const onTaskConfirmedRef = useRef(options.onTaskConfirmed);
+    const onArchiveJobRef = useRef(options.onArchiveJob);
     const reconnectAttemptRef = useRef(0);
     const reconnectTimeoutRef = useRef<ReturnType<typeof setTimeout> | null>(null);
 
@@ -44,7 +46,8 @@ export const useGlobalWebSocket = (token: string | null, options: GlobalWebSocke
         onTaskReturnedRef.current = options.onTaskReturned;
         onTaskSubmittedRef.current = options.onTaskSubmitted;
         onTaskConfirmedRef.current = options.onTaskConfirmed;
-    }, [options.onChannelCreated, options.onMessageReceived, options.onChannelDeleted, options.onDocumentShared, options.onUserPresence, options.onTaskAssigned, options.onTaskReturned, options.onTaskSubmitted, options.onTaskConfirmed]);
+        onArchiveJobRef.current = options.onArchiveJob;
+    }, [options.onChannelCreated, options.onMessageReceived, options.onChannelDeleted, options.onDocumentShared, options.onUserPresence, options.onTaskAssigned, options.onTaskReturned, options.onTaskSubmitted, options.onTaskConfirmed, options.onArchiveJob]);
 
     useEffect(() => {
         if (!token) {
@@ -72,6 +75,14 @@ export const useGlobalWebSocket = (token: string | null, options: GlobalWebSocke
                     onDocumentSharedRef.current(data);
                 } else if (data.type === 'user_presence' && onUserPresenceRef.current) {
                     onUserPresenceRef.current(data);
+                } else if (data.type === 'presence_diff' && onUserPresenceRef.current) {
+                    // Batched presence: expand into per-user updates
+                    for (const userId of data.online) {
+                        onUserPresenceRef.current({ user_id: userId, status: 'online' });
+                    }
+                    for (const userId of data.offline) {
+                        onUserPresenceRef.current({ user_id: userId, status: 'offline' });
+                    }
                 } else if (data.type === 'new_task' && onTaskAssignedRef.current) {
                     onTaskAssignedRef.current(data);
                 } else if (data.type === 'task_returned' && onTaskReturnedRef.current) {
@@ -80,6 +91,8 @@ export const useGlobalWebSocket = (token: string | null, options: GlobalWebSocke
                     onTaskSubmittedRef.current(data);
                 } else if (data.type === 'task_confirmed' && onTaskConfirmedRef.current) {
                     onTaskConfirmedRef.current(data);
+                } else if (data.type === 'archive_job' && onArchiveJobRef.current) {
+                    onArchiveJobRef.current(data);
                 }
             } catch (error) {
                 console.error('❌ Failed to parse WebSocket message:', error);